@@ -0,0 +1,28 @@
+"""Store run labels in a columnar sidecar
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "002"
+down_revision: Union[str, None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "clustering_runs",
+        sa.Column("labels_path", sa.Text(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("clustering_runs") as batch_op:
+        batch_op.drop_column("labels_path")
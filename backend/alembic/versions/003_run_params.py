@@ -0,0 +1,28 @@
+"""Store clustering request parameters on runs
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "clustering_runs",
+        sa.Column("params", sa.JSON(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("clustering_runs") as batch_op:
+        batch_op.drop_column("params")
@@ -0,0 +1,33 @@
+"""Store a typed Parquet copy and column schema on datasets
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "datasets",
+        sa.Column("parquet_path", sa.Text(), nullable=True),
+    )
+    op.add_column(
+        "datasets",
+        sa.Column("column_schema", sa.JSON(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("datasets") as batch_op:
+        batch_op.drop_column("column_schema")
+        batch_op.drop_column("parquet_path")
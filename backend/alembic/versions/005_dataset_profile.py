@@ -0,0 +1,39 @@
+"""Store upload content hash and column profile on datasets
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "datasets",
+        sa.Column("content_hash", sa.String(length=64), nullable=True),
+    )
+    op.add_column(
+        "datasets",
+        sa.Column("profile", sa.JSON(), nullable=True),
+    )
+    op.create_index(
+        "ix_datasets_content_hash",
+        "datasets",
+        ["content_hash"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_datasets_content_hash", table_name="datasets")
+    with op.batch_alter_table("datasets") as batch_op:
+        batch_op.drop_column("profile")
+        batch_op.drop_column("content_hash")
@@ -1,59 +1,272 @@
+import asyncio
+import hmac
+import time
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
-from typing import List
-
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
-from fastapi.responses import FileResponse
-from sqlalchemy import select
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    File,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from sqlalchemy import select, text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import ClusterAssignment, ClusteringRun, Dataset
-from app.db.session import get_db
+from app.core import profiling
+from app.core.config import settings
+from app.db.models import ClusteringRun, Dataset
+from app.db.session import AsyncSessionLocal, get_db, pool_stats
 from app.schemas.clustering import (
     ClusterAssignmentResponse,
     ClusteringRequest,
     ClusteringRunListResponse,
     ClusteringRunResponse,
+    DendrogramData,
+    DistributionData,
+    JobListResponse,
+    JobResponse,
+    PredictRequest,
+    PredictResponse,
+    PointEncoding,
+    RecutRequest,
+    ScoreRequest,
+    ScatterData,
+    ScatterMode,
+    SegmentFormat,
     SegmentListResponse,
+    SweepRequest,
+    SweepResponse,
 )
 from app.schemas.dataset import DatasetListResponse, DatasetResponse
+from app.services import jobs
+from app.services.artifacts import model_registry
+from app.services.chart_data import dendrogram_data, distribution_data, scatter_data
+from app.services.charts import chart_etag, chart_key, get_cached_chart, run_version
+from app.services.cleanup import delete_dataset_rows, purge_files
 from app.services.clustering import (
     generate_dendrogram,
     generate_distribution_chart,
     generate_scatter_plot,
-    get_flat_clusters,
-    perform_hierarchical_clustering,
 )
 from app.services.io import (
-    load_csv,
-    save_dendrogram,
-    save_distribution_chart,
-    save_scatter_plot,
+    FileTooLargeError,
+    convert_to_parquet,
+    read_columns,
     save_uploaded_file,
 )
-from app.services.metrics import compile_metrics
-from app.services.preprocessing import (
-    apply_pca,
-    apply_preprocessing,
-    build_preprocessor,
-    detect_feature_types,
-    get_feature_config,
+from app.services.pipeline import run_sweep
+from app.services.rendering import RenderQueueFull, render, render_stats
+from app.services.results import (
+    StaleRunResultsError,
+    check_run_files,
+    load_linkage,
+    load_run_results,
+    load_segment_page,
+    stream_legacy_segments,
+    stream_segments,
 )
+from app.services.scoring import run_scoring_job
+from app.services.training import execute_training, request_for_recut, run_training_job
 
 router = APIRouter()
 
 
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _not_modified_since(request: Request, path: Path) -> bool:
+    header = request.headers.get("if-modified-since")
+    if not header or request.headers.get("if-none-match"):
+        return False
+    try:
+        since = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(path.stat().st_mtime) <= since
+
+
+def _cached_chart_response(request: Request, key: str, filename: str) -> Optional[Response]:
+    """Serve a chart from the chart cache, or ``None`` if it has not been rendered."""
+    path = get_cached_chart(key)
+    if path is None:
+        return None
+
+    headers = {"ETag": chart_etag(key), "Cache-Control": "no-cache"}
+    try:
+        if _etag_matches(request, headers["ETag"]) or _not_modified_since(request, path):
+            headers["Last-Modified"] = formatdate(path.stat().st_mtime, usegmt=True)
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    except FileNotFoundError:
+        return None
+
+    return FileResponse(path=str(path), media_type="image/png", filename=filename, headers=headers)
+
+
+def _render_busy(error: RenderQueueFull) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=str(error),
+        headers={"Retry-After": "1"},
+    )
+
+
+def _scatter_features(
+    run: ClusteringRun, x_feature: Optional[str], y_feature: Optional[str]
+) -> Tuple[str, str]:
+    """Resolve the scatter axes, defaulting to the run's first numeric features."""
+    numeric_features = run.feature_config.get("numeric_features", []) if run.feature_config else []
+
+    if not numeric_features:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No numeric features available for scatter plot",
+        )
+
+    if not x_feature:
+        x_feature = numeric_features[0]
+    if not y_feature:
+        y_feature = numeric_features[1] if len(numeric_features) > 1 else numeric_features[0]
+
+    if x_feature not in numeric_features or y_feature not in numeric_features:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Features {x_feature} and/or {y_feature} not found in numeric features",
+        )
+
+    return x_feature, y_feature
+
+
 @router.get("/", tags=["Health"])
 async def health_check():
     return {"status": "ok"}
 
 
+@router.get("/health/render", tags=["Health"])
+async def render_health():
+    """Queue depth and throughput of the chart rendering pool."""
+    return render_stats()
+
+
+@router.get("/health/db", tags=["Health"])
+async def db_health():
+    """Round-trip latency of the database and connection pool counters."""
+    start = time.perf_counter()
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SELECT 1"))
+    except (OSError, SQLAlchemyError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Database unavailable: {e}",
+        )
+
+    return {
+        "status": "ok",
+        "latency_ms": round(1000 * (time.perf_counter() - start), 2),
+        **pool_stats(),
+    }
+
+
+def require_profiling_admin(authorization: Optional[str] = Header(default=None)) -> None:
+    """
+    Guard the profile endpoints.
+
+    With ``PROFILING_SECRET`` set they need ``Authorization: Bearer <secret>``.
+    Without it they are open only while ``PROFILING_ENABLED`` is on, which is
+    meant for development.
+    """
+    secret = settings.PROFILING_SECRET
+    if not secret:
+        if settings.PROFILING_ENABLED:
+            return
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profiling is disabled",
+        )
+
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), secret.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing admin token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@router.get(
+    "/admin/profiles",
+    tags=["Admin"],
+    dependencies=[Depends(require_profiling_admin)],
+)
+async def list_profiles():
+    """Stored request profiles, newest first."""
+    profiles = await asyncio.to_thread(profiling.list_profiles)
+    return {"profiles": profiles, "total": len(profiles)}
+
+
+@router.get(
+    "/admin/profiles/{profile_id}",
+    tags=["Admin"],
+    dependencies=[Depends(require_profiling_admin)],
+)
+async def get_profile(profile_id: str):
+    """Metadata and file names of one request profile."""
+    profile = await asyncio.to_thread(profiling.get_profile, profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile {profile_id} not found",
+        )
+    return profile
+
+
+@router.get(
+    "/admin/profiles/{profile_id}/{filename}",
+    tags=["Admin"],
+    dependencies=[Depends(require_profiling_admin)],
+)
+async def download_profile_file(profile_id: str, filename: str):
+    """Download one file of a request profile."""
+    path = await asyncio.to_thread(profiling.profile_file, profile_id, filename)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"File {filename} not found in profile {profile_id}",
+        )
+    media_type = "text/plain" if path.suffix == ".txt" else "application/octet-stream"
+    return FileResponse(path=str(path), media_type=media_type, filename=f"{profile_id}-{filename}")
+
+
 @router.post(
     "/datasets/upload",
     response_model=DatasetResponse,
     status_code=status.HTTP_201_CREATED,
     tags=["Datasets"],
+    responses={
+        200: {"model": DatasetResponse, "description": "Identical file already uploaded"},
+    },
 )
 async def upload_dataset(
+    request: Request,
+    response: Response,
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db),
 ):
@@ -63,9 +276,60 @@ async def upload_dataset(
             detail="Only CSV files are allowed",
         )
 
-    file_path = save_uploaded_file(file.file, file.filename)
+    # Only a fast fail: FastAPI has already spooled the multipart body by the
+    # time the endpoint runs, so this saves the CSV profiling and Parquet
+    # conversion of an oversized upload, not reading it. save_uploaded_file
+    # enforces the limit on the bytes actually received.
+    try:
+        declared_length = int(request.headers.get("content-length", ""))
+    except ValueError:
+        declared_length = None
+    if declared_length and declared_length > settings.UPLOAD_MAX_BYTES + 1024 * 1024:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File exceeds the {settings.UPLOAD_MAX_BYTES} byte upload limit",
+        )
 
-    dataset = Dataset(name=file.filename, file_path=file_path)
+    try:
+        file_path, content_hash, profiler = await asyncio.to_thread(
+            save_uploaded_file, file.file, file.filename
+        )
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e),
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    result = await db.execute(
+        select(Dataset).where(Dataset.content_hash == content_hash).limit(1)
+    )
+    existing = result.scalar_one_or_none()
+    if existing:
+        Path(file_path).unlink(missing_ok=True)
+        response.status_code = status.HTTP_200_OK
+        return existing
+
+    # Type the CSV once with the profiled schema; datasets Arrow cannot write stay CSV-only.
+    try:
+        parquet_path, column_schema = await asyncio.to_thread(
+            convert_to_parquet, file_path, profiler.schema()
+        )
+    except ValueError:
+        parquet_path, column_schema = None, None
+
+    dataset = Dataset(
+        name=file.filename,
+        file_path=file_path,
+        parquet_path=parquet_path,
+        column_schema=column_schema,
+        content_hash=content_hash,
+        profile=profiler.profile(),
+    )
     db.add(dataset)
     await db.flush()
     await db.refresh(dataset)
@@ -91,11 +355,11 @@ async def list_datasets(db: AsyncSession = Depends(get_db)):
 )
 async def delete_dataset(
     dataset_id: int,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
 ):
     """Delete a dataset and all associated clustering runs and assignments."""
-    result = await db.execute(select(Dataset).where(Dataset.id == dataset_id))
-    dataset = result.scalar_one_or_none()
+    dataset = await db.get(Dataset, dataset_id)
 
     if not dataset:
         raise HTTPException(
@@ -103,37 +367,9 @@ async def delete_dataset(
             detail=f"Dataset with id {dataset_id} not found",
         )
 
-    # Delete associated clustering runs (cascade will handle assignments)
-    await db.execute(
-        select(ClusteringRun).where(ClusteringRun.dataset_id == dataset_id)
-    )
-    runs_result = await db.execute(
-        select(ClusteringRun).where(ClusteringRun.dataset_id == dataset_id)
-    )
-    runs = runs_result.scalars().all()
-
-    # Delete dendrogram files
-    for run in runs:
-        if run.dendrogram_path:
-            dendrogram_path = Path(run.dendrogram_path)
-            if dendrogram_path.exists():
-                dendrogram_path.unlink()
-
-    # Delete clustering runs and their assignments
-    for run in runs:
-        await db.execute(
-            select(ClusterAssignment).where(ClusterAssignment.run_id == run.id)
-        )
-        await db.delete(run)
-
-    # Delete the dataset file
-    dataset_file = Path(dataset.file_path)
-    if dataset_file.exists():
-        dataset_file.unlink()
-
-    # Delete the dataset record
-    await db.delete(dataset)
-    await db.flush()
+    deleted = await delete_dataset_rows(db, dataset)
+    # Runs after the response, once the session has committed.
+    background_tasks.add_task(purge_files, deleted["paths"], deleted["run_ids"])
 
     return {"message": "Dataset deleted successfully", "id": dataset_id}
 
@@ -143,9 +379,15 @@ async def delete_dataset(
     response_model=ClusteringRunResponse,
     status_code=status.HTTP_201_CREATED,
     tags=["Clustering"],
+    responses={
+        202: {"model": JobResponse, "description": "Training job queued"},
+    },
 )
 async def train_clustering(
     request: ClusteringRequest,
+    background: bool = Query(
+        False, description="Queue the fit as a background job and return 202"
+    ),
     db: AsyncSession = Depends(get_db),
 ):
     result = await db.execute(select(Dataset).where(Dataset.id == request.dataset_id))
@@ -157,97 +399,94 @@ async def train_clustering(
             detail=f"Dataset with id {request.dataset_id} not found",
         )
 
+    if background:
+        job = jobs.create_job("training")
+        jobs.schedule(run_training_job(job["job_id"], request))
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=JobResponse(**job).model_dump(mode="json"),
+        )
+
     try:
-        df = load_csv(dataset.file_path)
+        clustering_run = await execute_training(db, dataset, request)
     except FileNotFoundError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(e),
         )
-
-    if df.empty:
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Dataset is empty",
+            detail=str(e),
         )
 
-    numeric_cols, categorical_cols = detect_feature_types(df)
+    return clustering_run
 
-    if not numeric_cols and not categorical_cols:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="No valid features found in dataset",
-        )
 
-    preprocessor = build_preprocessor(numeric_cols, categorical_cols)
-    data = apply_preprocessing(df, preprocessor)
+@router.get("/clustering/jobs", response_model=JobListResponse, tags=["Clustering"])
+async def list_jobs():
+    job_list = jobs.list_jobs()
+    return JobListResponse(
+        jobs=[JobResponse(**job) for job in job_list],
+        total=len(job_list),
+    )
 
-    n_encoded_features = data.shape[1]
-    pca_variance = None
 
-    if request.use_pca and request.pca_components:
-        if request.pca_components < n_encoded_features:
-            data, pca_variance = apply_pca(data, request.pca_components)
-            n_encoded_features = data.shape[1]
+@router.get(
+    "/clustering/jobs/{job_id}",
+    response_model=JobResponse,
+    tags=["Clustering"],
+)
+async def get_job(job_id: str):
+    job = jobs.get_job(job_id)
 
-    if len(data) < request.n_clusters:
+    if not job:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Number of samples ({len(data)}) must be >= n_clusters ({request.n_clusters})",
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job with id {job_id} not found",
         )
 
-    linkage_matrix = perform_hierarchical_clustering(data, request.linkage.value)
-    labels = get_flat_clusters(linkage_matrix, request.n_clusters)
-
-    metrics = compile_metrics(data, labels, n_encoded_features)
-    feature_config = get_feature_config(
-        numeric_cols=numeric_cols,
-        categorical_cols=categorical_cols,
-        n_encoded_features=n_encoded_features,
-        use_pca=request.use_pca,
-        pca_components=request.pca_components if request.use_pca else None,
-        pca_variance=pca_variance,
-    )
+    return JobResponse(**job)
 
-    clustering_run = ClusteringRun(
-        dataset_id=request.dataset_id,
-        linkage=request.linkage.value,
-        n_clusters=request.n_clusters,
-        feature_config=feature_config,
-        metrics=metrics,
-        dendrogram_path=None,
-    )
-    db.add(clustering_run)
-    await db.flush()
-    await db.refresh(clustering_run)
 
-    fig = generate_dendrogram(
-        linkage_matrix,
-        dataset_id=request.dataset_id,
-        linkage_method=request.linkage.value,
-    )
-    dendrogram_path = save_dendrogram(fig, clustering_run.id)
-    clustering_run.dendrogram_path = dendrogram_path
+@router.get(
+    "/clustering/jobs/{job_id}/result",
+    tags=["Clustering"],
+    responses={
+        200: {
+            "content": {"application/vnd.apache.parquet": {}},
+            "description": "Labelled Parquet file of a batch scoring job",
+        }
+    },
+)
+async def get_job_result(job_id: str):
+    """Download the output of a finished batch scoring job."""
+    job = jobs.get_job(job_id)
 
-    assignments: List[ClusterAssignment] = []
-    for idx, label in enumerate(labels):
-        row_data = df.iloc[idx].to_dict()
-        for key, value in row_data.items():
-            if hasattr(value, "item"):
-                row_data[key] = value.item()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job with id {job_id} not found",
+        )
 
-        assignment = ClusterAssignment(
-            run_id=clustering_run.id,
-            row_index=idx,
-            cluster_label=int(label),
-            payload=row_data,
+    output_path = (job["result"] or {}).get("output_path")
+    if not output_path:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job {job_id} has no output (status: {job['status'].value})",
         )
-        assignments.append(assignment)
 
-    db.add_all(assignments)
-    await db.flush()
+    if not Path(output_path).exists():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scoring output file not found",
+        )
 
-    return clustering_run
+    return FileResponse(
+        path=output_path,
+        media_type="application/vnd.apache.parquet",
+        filename=Path(output_path).name,
+    )
 
 
 @router.get(
@@ -281,13 +520,216 @@ async def get_clustering_runs(
     )
 
 
+@router.post(
+    "/clustering/runs/{run_id}/recut",
+    response_model=ClusteringRunResponse,
+    status_code=status.HTTP_201_CREATED,
+    tags=["Clustering"],
+)
+async def recut_clustering_run(
+    run_id: int,
+    request: RecutRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """Cut an existing run's cached linkage tree at a new number of clusters."""
+    run = await db.get(ClusteringRun, run_id)
+
+    if not run:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Clustering run with id {run_id} not found",
+        )
+
+    dataset = await db.get(Dataset, run.dataset_id)
+
+    try:
+        clustering_run = await execute_training(
+            db, dataset, request_for_recut(run, request.n_clusters)
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e),
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    return clustering_run
+
+
+@router.post(
+    "/clustering/runs/{run_id}/predict",
+    response_model=PredictResponse,
+    tags=["Clustering"],
+)
+async def predict_clusters(
+    run_id: int,
+    request: PredictRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """Assign new records to the nearest cluster centroid of a fitted run."""
+    if len(request.records) > settings.PREDICT_MAX_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.PREDICT_MAX_BATCH} records per request",
+        )
+
+    run = await db.get(ClusteringRun, run_id)
+
+    if not run:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Clustering run with id {run_id} not found",
+        )
+
+    if not run.model_path:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No fitted model stored for this run; retrain it to enable scoring",
+        )
+
+    try:
+        model = await asyncio.to_thread(model_registry.get, run.model_path)
+    except FileNotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e),
+        )
+
+    columns = {
+        col: [record.get(col) for record in request.records]
+        for col in model.feature_cols
+        if any(col in record for record in request.records)
+    }
+    try:
+        labels, distances = model.predict(columns)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    result = PredictResponse(
+        run_id=run_id,
+        n_records=len(labels),
+        cluster_labels=labels.tolist(),
+        distances=distances.tolist(),
+    )
+    # Serialize directly; the generic response_model encoder dominates batch latency.
+    return Response(content=result.model_dump_json(), media_type="application/json")
+
+
+@router.post(
+    "/clustering/runs/{run_id}/score",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["Clustering"],
+)
+async def score_dataset(
+    run_id: int,
+    request: ScoreRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """Queue a job that labels every row of a dataset with a run's clusters."""
+    run = await db.get(ClusteringRun, run_id)
+
+    if not run:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Clustering run with id {run_id} not found",
+        )
+
+    if not run.model_path:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No fitted model stored for this run; retrain it to enable scoring",
+        )
+
+    dataset = await db.get(Dataset, request.dataset_id)
+
+    if not dataset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Dataset with id {request.dataset_id} not found",
+        )
+
+    feature_config = run.feature_config or {}
+    features = feature_config.get("numeric_features", []) + feature_config.get(
+        "categorical_features", []
+    )
+    # Legacy datasets without a recorded schema are checked by the job itself.
+    known = dataset.column_schema
+    missing = [col for col in features if known and col not in known]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Dataset is missing feature columns: {', '.join(missing)}",
+        )
+
+    job = jobs.create_job("scoring")
+    jobs.schedule(run_scoring_job(job["job_id"], run_id, dataset.id))
+    return JobResponse(**job)
+
+
+@router.post(
+    "/clustering/sweep",
+    response_model=SweepResponse,
+    tags=["Clustering"],
+)
+async def sweep_clustering(
+    request: SweepRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """Score a range of cluster counts from a single linkage tree."""
+    dataset = await db.get(Dataset, request.dataset_id)
+
+    if not dataset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Dataset with id {request.dataset_id} not found",
+        )
+
+    try:
+        result = await jobs.run_in_worker(
+            run_sweep, dataset.data_path, request, content_hash=dataset.content_hash
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e),
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    return SweepResponse(**result)
+
+
 @router.get(
     "/clustering/segments/{run_id}",
     response_model=SegmentListResponse,
     tags=["Clustering"],
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}},
+            "description": "Segments page, or one JSON object per line when format=ndjson",
+        }
+    },
 )
 async def get_cluster_segments(
     run_id: int,
+    after: Optional[int] = Query(
+        None, description="Return rows with row_index greater than this cursor"
+    ),
+    limit: int = Query(settings.SEGMENT_PAGE_SIZE, ge=1, le=settings.SEGMENT_PAGE_MAX),
+    cluster_label: Optional[int] = Query(None, description="Only rows in this cluster"),
+    columns: Optional[str] = Query(None, description="Comma-separated payload columns"),
+    format: SegmentFormat = Query(SegmentFormat.JSON),
     db: AsyncSession = Depends(get_db),
 ):
     result = await db.execute(select(ClusteringRun).where(ClusteringRun.id == run_id))
@@ -299,17 +741,67 @@ async def get_cluster_segments(
             detail=f"Clustering run with id {run_id} not found",
         )
 
-    result = await db.execute(
-        select(ClusterAssignment)
-        .where(ClusterAssignment.run_id == run_id)
-        .order_by(ClusterAssignment.row_index)
-    )
-    assignments = result.scalars().all()
+    dataset = await db.get(Dataset, run.dataset_id)
+    selected = [col.strip() for col in columns.split(",") if col.strip()] if columns else None
+
+    if selected and run.labels_path:
+        try:
+            available = read_columns(dataset.data_path)
+        except FileNotFoundError as e:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=str(e),
+            )
+        unknown = [col for col in selected if col not in available]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown columns: {', '.join(unknown)}",
+            )
+
+    if format == SegmentFormat.NDJSON:
+        if run.labels_path:
+            # Once the response has started a bad file can only cut the
+            # stream short, so check the files while an error can be sent.
+            try:
+                check_run_files(dataset.data_path, run.labels_path)
+            except FileNotFoundError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=str(e),
+                )
+            except StaleRunResultsError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=str(e),
+                )
+            body = stream_segments(
+                dataset.data_path, run.labels_path, after, cluster_label, selected
+            )
+        else:
+            body = stream_legacy_segments(run_id, after, cluster_label, selected)
+        return StreamingResponse(body, media_type="application/x-ndjson")
+
+    try:
+        rows, total, next_cursor = await load_segment_page(
+            db, run, after, limit, cluster_label, selected
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e),
+        )
+    except StaleRunResultsError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+        )
 
     return SegmentListResponse(
         run_id=run_id,
-        assignments=[ClusterAssignmentResponse.model_validate(a) for a in assignments],
-        total=len(assignments),
+        assignments=[ClusterAssignmentResponse(run_id=run_id, **row) for row in rows],
+        total=total,
+        next_cursor=next_cursor,
     )
 
 
@@ -325,8 +817,10 @@ async def get_cluster_segments(
 )
 async def get_dendrogram(
     run_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ):
+    """Get the dendrogram of a clustering run, rendering it on first request."""
     result = await db.execute(select(ClusteringRun).where(ClusteringRun.id == run_id))
     run = result.scalar_one_or_none()
 
@@ -336,24 +830,53 @@ async def get_dendrogram(
             detail=f"Clustering run with id {run_id} not found",
         )
 
-    if not run.dendrogram_path:
+    filename = f"dendrogram_run_{run_id}.png"
+    key = chart_key(run_id, "dendrogram", run_version(run))
+    cached = _cached_chart_response(request, key, filename)
+    if cached is not None:
+        return cached
+
+    # Runs trained before lazy rendering keep their pre-rendered image.
+    if run.dendrogram_path and Path(run.dendrogram_path).exists():
+        return FileResponse(
+            path=run.dendrogram_path,
+            media_type="image/png",
+            filename=filename,
+        )
+
+    dataset = await db.get(Dataset, run.dataset_id)
+    try:
+        linkage_matrix = load_linkage(dataset.file_path, run_id)
+    except FileNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Dendrogram not available for this run",
         )
 
-    path = Path(run.dendrogram_path)
-    if not path.exists():
+    try:
+        await render(
+            key,
+            generate_dendrogram,
+            linkage_matrix,
+            dataset_id=run.dataset_id,
+            linkage_method=run.linkage,
+        )
+    except RenderQueueFull as e:
+        raise _render_busy(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate dendrogram: {str(e)}",
+        )
+
+    response = _cached_chart_response(request, key, filename)
+    if response is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Dendrogram file not found",
         )
 
-    return FileResponse(
-        path=str(path),
-        media_type="image/png",
-        filename=f"dendrogram_run_{run_id}.png",
-    )
+    return response
 
 
 @router.get(
@@ -368,8 +891,16 @@ async def get_dendrogram(
 )
 async def get_scatter_plot(
     run_id: int,
+    request: Request,
     x_feature: str = None,
     y_feature: str = None,
+    mode: ScatterMode = Query(
+        ScatterMode.AUTO,
+        description="points (downsampled per cluster), binned (2D histogram) or auto",
+    ),
+    max_points: Optional[int] = Query(
+        None, ge=100, le=200000, description="Marker budget in points mode"
+    ),
     db: AsyncSession = Depends(get_db),
 ):
     """Get scatter plot visualization for a clustering run."""
@@ -382,62 +913,76 @@ async def get_scatter_plot(
             detail=f"Clustering run with id {run_id} not found",
         )
 
-    # Get assignments
-    assignments_result = await db.execute(
-        select(ClusterAssignment)
-        .where(ClusterAssignment.run_id == run_id)
-        .order_by(ClusterAssignment.row_index)
+    filename = f"scatter_plot_run_{run_id}.png"
+    key = chart_key(
+        run_id,
+        "scatter",
+        run_version(run),
+        x_feature=x_feature,
+        y_feature=y_feature,
+        mode=mode.value,
+        max_points=max_points or settings.SCATTER_MAX_POINTS,
+        binned_threshold=settings.SCATTER_BINNED_THRESHOLD,
+        bins=settings.SCATTER_BINS,
     )
-    assignments = assignments_result.scalars().all()
+    cached = _cached_chart_response(request, key, filename)
+    if cached is not None:
+        return cached
+
+    x_feature, y_feature = _scatter_features(run, x_feature, y_feature)
 
-    if not assignments:
+    # Get assignments
+    try:
+        labels, frame = await load_run_results(
+            db, run, columns=list(dict.fromkeys([x_feature, y_feature]))
+        )
+    except FileNotFoundError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="No cluster assignments found for this run",
+            detail=str(e),
         )
-
-    # Determine features
-    numeric_features = run.feature_config.get("numeric_features", []) if run.feature_config else []
-    
-    if not numeric_features:
+    except StaleRunResultsError as e:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="No numeric features available for scatter plot",
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
         )
 
-    if not x_feature:
-        x_feature = numeric_features[0]
-    if not y_feature:
-        y_feature = numeric_features[1] if len(numeric_features) > 1 else numeric_features[0]
-
-    if x_feature not in numeric_features or y_feature not in numeric_features:
+    if len(labels) == 0:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Features {x_feature} and/or {y_feature} not found in numeric features",
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No cluster assignments found for this run",
         )
 
     # Generate scatter plot
     try:
-        fig = generate_scatter_plot(assignments, x_feature, y_feature, run_id)
-        scatter_path = save_scatter_plot(fig, run_id)
+        await render(
+            key,
+            generate_scatter_plot,
+            pd.to_numeric(frame[x_feature], errors="coerce").to_numpy(),
+            pd.to_numeric(frame[y_feature], errors="coerce").to_numpy(),
+            np.asarray(labels),
+            x_feature,
+            y_feature,
+            run_id,
+            mode=mode.value,
+            max_points=max_points,
+        )
+    except RenderQueueFull as e:
+        raise _render_busy(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate scatter plot: {str(e)}",
         )
 
-    path = Path(scatter_path)
-    if not path.exists():
+    response = _cached_chart_response(request, key, filename)
+    if response is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Scatter plot file not found",
         )
 
-    return FileResponse(
-        path=str(path),
-        media_type="image/png",
-        filename=f"scatter_plot_run_{run_id}.png",
-    )
+    return response
 
 
 @router.get(
@@ -452,6 +997,7 @@ async def get_scatter_plot(
 )
 async def get_distribution_chart(
     run_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ):
     """Get distribution chart visualization for a clustering run."""
@@ -464,6 +1010,12 @@ async def get_distribution_chart(
             detail=f"Clustering run with id {run_id} not found",
         )
 
+    filename = f"distribution_run_{run_id}.png"
+    key = chart_key(run_id, "distribution", run_version(run))
+    cached = _cached_chart_response(request, key, filename)
+    if cached is not None:
+        return cached
+
     if not run.metrics or "cluster_sizes" not in run.metrics:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -474,24 +1026,152 @@ async def get_distribution_chart(
 
     # Generate distribution chart
     try:
-        fig = generate_distribution_chart(cluster_sizes, run_id)
-        distribution_path = save_distribution_chart(fig, run_id)
+        await render(key, generate_distribution_chart, cluster_sizes, run_id)
+    except RenderQueueFull as e:
+        raise _render_busy(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate distribution chart: {str(e)}",
         )
 
-    path = Path(distribution_path)
-    if not path.exists():
+    response = _cached_chart_response(request, key, filename)
+    if response is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Distribution chart file not found",
         )
 
-    return FileResponse(
-        path=str(path),
-        media_type="image/png",
-        filename=f"distribution_run_{run_id}.png",
+    return response
+
+
+@router.get(
+    "/clustering/dendrogram/{run_id}/data",
+    response_model=DendrogramData,
+    tags=["Clustering"],
+)
+async def get_dendrogram_data(
+    run_id: int,
+    max_leaves: int = Query(50, ge=2, le=500, description="Truncate to this many leaves"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get the dendrogram's link coordinates for client-side rendering."""
+    result = await db.execute(select(ClusteringRun).where(ClusteringRun.id == run_id))
+    run = result.scalar_one_or_none()
+
+    if not run:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Clustering run with id {run_id} not found",
+        )
+
+    dataset = await db.get(Dataset, run.dataset_id)
+    try:
+        linkage_matrix = load_linkage(dataset.file_path, run_id)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dendrogram data not available for this run",
+        )
+
+    return DendrogramData(
+        run_id=run_id,
+        linkage=run.linkage,
+        **dendrogram_data(linkage_matrix, max_leaves),
     )
 
+
+@router.get(
+    "/clustering/scatter/{run_id}/data",
+    response_model=ScatterData,
+    tags=["Clustering"],
+)
+async def get_scatter_data(
+    run_id: int,
+    x_feature: str = None,
+    y_feature: str = None,
+    max_points: Optional[int] = Query(
+        None, ge=100, le=200000, description="Point budget, sampled per cluster"
+    ),
+    encoding: PointEncoding = Query(
+        PointEncoding.JSON, description="json floats or base64 uint16 quantized coordinates"
+    ),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get per-cluster scatter points for client-side rendering."""
+    result = await db.execute(select(ClusteringRun).where(ClusteringRun.id == run_id))
+    run = result.scalar_one_or_none()
+
+    if not run:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Clustering run with id {run_id} not found",
+        )
+
+    x_feature, y_feature = _scatter_features(run, x_feature, y_feature)
+
+    try:
+        labels, frame = await load_run_results(
+            db, run, columns=list(dict.fromkeys([x_feature, y_feature]))
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e),
+        )
+    except StaleRunResultsError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+        )
+
+    if len(labels) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No cluster assignments found for this run",
+        )
+
+    try:
+        data = await asyncio.to_thread(
+            scatter_data,
+            pd.to_numeric(frame[x_feature], errors="coerce").to_numpy(),
+            pd.to_numeric(frame[y_feature], errors="coerce").to_numpy(),
+            labels,
+            max_points or settings.SCATTER_MAX_POINTS,
+            encoding == PointEncoding.UINT16,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    return ScatterData(run_id=run_id, x_feature=x_feature, y_feature=y_feature, **data)
+
+
+@router.get(
+    "/clustering/distribution/{run_id}/data",
+    response_model=DistributionData,
+    tags=["Clustering"],
+)
+async def get_distribution_data(
+    run_id: int,
+    db: AsyncSession = Depends(get_db),
+):
+    """Get cluster sizes and shares for client-side rendering."""
+    result = await db.execute(select(ClusteringRun).where(ClusteringRun.id == run_id))
+    run = result.scalar_one_or_none()
+
+    if not run:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Clustering run with id {run_id} not found",
+        )
+
+    if not run.metrics or "cluster_sizes" not in run.metrics:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Cluster metrics not available for this run",
+        )
+
+    return DistributionData(run_id=run_id, **distribution_data(run.metrics["cluster_sizes"]))
@@ -15,6 +15,67 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = "data"
     OUTPUT_DIR: str = "outputs"
 
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+
+    UPLOAD_MAX_BYTES: int = 5 * 1024**3
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+
+    CLUSTERING_MAX_WORKERS: int = 2
+    CLUSTERING_THREADS_PER_WORKER: int = 0
+    JOB_HISTORY_LIMIT: int = 100
+    ORPHAN_SWEEP_ON_STARTUP: bool = True
+
+    RENDER_MAX_WORKERS: int = 2
+    RENDER_MAX_QUEUE: int = 8
+
+    SCALABLE_AUTO_THRESHOLD: int = 10000
+    SCALABLE_MICRO_CLUSTERS: int = 1000
+    SCALABLE_BATCH_SIZE: int = 4096
+
+    ONEHOT_MAX_CATEGORIES: int = 0
+    ONEHOT_MIN_FREQUENCY: float = 0.0
+    PREPROCESS_FLOAT32: bool = True
+    PREPROCESS_CHUNK_SIZE: int = 100000
+
+    LINKAGE_CACHE_MAX_BYTES: int = 2 * 1024**3
+    FRAME_CACHE_MAX_BYTES: int = 256 * 1024**2
+    CHART_CACHE_MAX_BYTES: int = 512 * 1024**2
+    MODEL_REGISTRY_SIZE: int = 8
+    PREDICT_MAX_BATCH: int = 10000
+    SCORING_CHUNK_SIZE: int = 50000
+    SCORING_PARTITION_ROWS: int = 1000000
+
+    SCATTER_MAX_POINTS: int = 20000
+    SCATTER_BINNED_THRESHOLD: int = 100000
+    SCATTER_BINS: int = 200
+
+    GZIP_MIN_BYTES: int = 1000
+    METRICS_ENABLED: bool = True
+    PROFILING_ENABLED: bool = False
+    PROFILING_SECRET: str = ""
+    PROFILING_SIGNATURE_TTL_SECONDS: int = 300
+    PROFILING_MAX_PROFILES: int = 20
+    PROFILING_TRACEMALLOC_FRAMES: int = 10
+
+    SILHOUETTE_METHOD: str = "auto"
+    SILHOUETTE_EXACT_MAX_ROWS: int = 10000
+    SILHOUETTE_SAMPLE_SIZE: int = 5000
+    SILHOUETTE_RANDOM_STATE: int = 0
+    SILHOUETTE_WORKING_MEMORY_MB: int = 64
+
+    STORE_ASSIGNMENT_ROWS: bool = False
+    BULK_INSERT_CHUNK_SIZE: int = 5000
+    SEGMENT_PAGE_SIZE: int = 1000
+    SEGMENT_PAGE_MAX: int = 10000
+    SEGMENT_CHUNK_SIZE: int = 10000
+
     @property
     def upload_path(self) -> Path:
         path = Path(self.UPLOAD_DIR)
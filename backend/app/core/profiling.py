@@ -0,0 +1,293 @@
+"""Opt-in profiling of single requests.
+
+A profiled request runs under cProfile with tracemalloc tracing, and the
+results are written to ``OUTPUT_DIR/profiles/<id>/``:
+
+- ``profile.prof``: cProfile stats of the API process (``pstats`` format)
+- ``profile.txt``: the same stats, by cumulative time
+- ``allocations.snapshot`` and ``allocations.txt``: tracemalloc snapshot at
+  the end of the request, and its largest allocation sites
+- ``worker-<n>.prof``/``.txt``: stats of work the request ran in the clustering
+  process pool, such as a training fit
+- ``meta.json``: method, path, status, duration and memory peak
+
+Requests are profiled when ``PROFILING_ENABLED`` is set, or when they carry
+an ``X-Profile`` header signed with ``PROFILING_SECRET`` (see
+``sign_request``). With neither configured the middleware is not installed.
+One request is profiled at a time: cProfile and tracemalloc are per process,
+so while a request is being profiled other requests run unprofiled. The
+event loop is shared, though, so ``profile.prof`` also contains whatever
+other requests ran on it meanwhile.
+"""
+import asyncio
+import contextvars
+import cProfile
+import hashlib
+import hmac
+import io
+import json
+import marshal
+import pstats
+import re
+import shutil
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+# Not profiled even with PROFILING_ENABLED: profiling them would only fill
+# the profile directory with captures of the profile downloads.
+EXCLUDED_PREFIXES = ("/metrics", "/api/v1/admin/")
+
+PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+_capture: contextvars.ContextVar[Optional["ProfileCapture"]] = contextvars.ContextVar(
+    "profile_capture", default=None
+)
+_busy = False
+
+
+def profiles_dir() -> Path:
+    return settings.output_path / "profiles"
+
+
+def _signature(secret: str, timestamp: str, method: str, path: str) -> str:
+    message = f"{timestamp}\n{method.upper()}\n{path}".encode()
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def sign_request(secret: str, method: str, path: str, timestamp: Optional[int] = None) -> str:
+    """
+    Build the ``X-Profile`` header value for one request.
+
+    Args:
+        secret: The server's ``PROFILING_SECRET``
+        method: HTTP method of the request
+        path: Request path without the query string, e.g. ``/api/v1/clustering/train``
+        timestamp: Unix time of signing (now if omitted)
+
+    Returns:
+        ``<timestamp>.<hex HMAC-SHA256>``, valid for ``PROFILING_SIGNATURE_TTL_SECONDS``
+    """
+    timestamp = str(int(time.time() if timestamp is None else timestamp))
+    return f"{timestamp}.{_signature(secret, timestamp, method, path)}"
+
+
+def verify_signature(value: str, method: str, path: str) -> bool:
+    """Check an ``X-Profile`` header against ``PROFILING_SECRET``."""
+    secret = settings.PROFILING_SECRET
+    timestamp, _, signature = value.partition(".")
+    if not secret or not timestamp.isdigit() or not signature:
+        return False
+    if abs(time.time() - int(timestamp)) > settings.PROFILING_SIGNATURE_TTL_SECONDS:
+        return False
+    return hmac.compare_digest(signature, _signature(secret, timestamp, method, path))
+
+
+def _stats_text(stats: pstats.Stats, limit: int = 60) -> str:
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    return stream.getvalue()
+
+
+def _allocations_text(snapshot: tracemalloc.Snapshot, limit: int = 40) -> str:
+    top = snapshot.statistics("lineno")
+    lines = [f"Top {min(limit, len(top))} of {len(top)} allocation sites by size", ""]
+    for stat in top[:limit]:
+        lines.append(str(stat))
+        lines.extend(f"    {line}" for line in stat.traceback.format()[-3:])
+    return "\n".join(lines) + "\n"
+
+
+def profile_call(func: Callable[[], Any]) -> Tuple[Any, Dict]:
+    """Run ``func()`` under cProfile; used in pool workers, returns picklable stats."""
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func)
+    profiler.create_stats()
+    return result, profiler.stats
+
+
+def active_capture() -> Optional["ProfileCapture"]:
+    """The profile of the request running in this context, if it is being profiled."""
+    capture = _capture.get()
+    if capture is None or capture.finished:
+        return None
+    return capture
+
+
+class ProfileCapture:
+    """cProfile and tracemalloc state of one profiled request."""
+
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.created_at = datetime.now(timezone.utc)
+        self.profiler = cProfile.Profile()
+        self.worker_stats: List[Dict] = []
+        self.finished = False
+        self._owns_tracemalloc = False
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(settings.PROFILING_TRACEMALLOC_FRAMES)
+            self._owns_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._start = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self) -> None:
+        self.profiler.disable()
+        self.duration = time.perf_counter() - self._start
+        self.snapshot = tracemalloc.take_snapshot()
+        self.traced_peak = tracemalloc.get_traced_memory()[1]
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+        self.finished = True
+
+    def add_worker_stats(self, stats: Dict) -> None:
+        if not self.finished:
+            self.worker_stats.append(stats)
+
+    def save(self, status_code: int) -> Path:
+        """Write the capture's files and drop the oldest profiles beyond the limit."""
+        directory = profiles_dir() / self.id
+        directory.mkdir(parents=True)
+
+        self.profiler.dump_stats(directory / "profile.prof")
+        (directory / "profile.txt").write_text(_stats_text(pstats.Stats(self.profiler)))
+        self.snapshot.dump(str(directory / "allocations.snapshot"))
+        (directory / "allocations.txt").write_text(_allocations_text(self.snapshot))
+
+        for n, stats in enumerate(self.worker_stats, start=1):
+            path = directory / f"worker-{n}.prof"
+            with open(path, "wb") as f:
+                marshal.dump(stats, f)
+            (directory / f"worker-{n}.txt").write_text(_stats_text(pstats.Stats(str(path))))
+
+        meta = {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": status_code,
+            "created_at": self.created_at.isoformat(),
+            "duration_ms": round(1000 * self.duration, 1),
+            "traced_peak_bytes": self.traced_peak,
+            "worker_profiles": len(self.worker_stats),
+        }
+        (directory / "meta.json").write_text(json.dumps(meta, indent=2))
+        _prune(settings.PROFILING_MAX_PROFILES)
+        return directory
+
+
+def _prune(keep: int) -> None:
+    captures = sorted(
+        (p for p in profiles_dir().iterdir() if p.is_dir()),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    for directory in captures[max(1, keep):]:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Metadata of the stored profiles, newest first."""
+    if not profiles_dir().is_dir():
+        return []
+    profiles = []
+    for meta_path in profiles_dir().glob("*/meta.json"):
+        try:
+            profiles.append(json.loads(meta_path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda meta: meta["created_at"], reverse=True)
+
+
+def get_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    """Metadata and file names of one stored profile, or ``None``."""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    directory = profiles_dir() / profile_id
+    try:
+        meta = json.loads((directory / "meta.json").read_text())
+    except (OSError, ValueError):
+        return None
+    meta["files"] = sorted(p.name for p in directory.iterdir() if p.name != "meta.json")
+    return meta
+
+
+def profile_file(profile_id: str, filename: str) -> Optional[Path]:
+    """Path of one file of a stored profile, or ``None`` if there is no such file."""
+    meta = get_profile(profile_id)
+    if meta is None or filename not in meta["files"]:
+        return None
+    return profiles_dir() / profile_id / filename
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests that ask for it.
+
+    The profile id is returned in the ``X-Profile-Id`` response header. A
+    request that asked to be profiled while another one was being profiled
+    runs unprofiled and gets no such header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _wants_profile(self, scope) -> bool:
+        path = scope["path"]
+        if path.startswith(EXCLUDED_PREFIXES):
+            return False
+        if settings.PROFILING_ENABLED:
+            return True
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return verify_signature(value.decode("latin-1"), scope["method"], path)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        global _busy
+
+        if scope["type"] != "http" or _busy or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        capture = ProfileCapture(scope["method"], scope["path"])
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_ID_HEADER, capture.id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            capture.start()
+        except ValueError:
+            # Another profiler (e.g. a debugger's) is already active.
+            await self.app(scope, receive, send)
+            return
+
+        _busy = True
+        token = _capture.set(capture)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            capture.stop()
+            _capture.reset(token)
+            _busy = False
+            # Formatting the stats and the snapshot is slow; keep it off the loop.
+            await asyncio.to_thread(capture.save, status_code)
@@ -0,0 +1,281 @@
+"""Prometheus-style metrics and pipeline stage timing.
+
+Counters, gauges and histograms live in a process-local registry that
+``render_metrics`` serializes in the Prometheus text format for ``/metrics``.
+Pipeline code wraps its stages in ``stage(name)``; inside a
+``collect_stages()`` block the durations are collected into a dict, which
+the training pipeline returns from the worker process so the API process
+can record it.
+"""
+import contextvars
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+MEMORY_BUCKETS = tuple(float(2 ** power) for power in range(26, 36))  # 64 MiB to 32 GiB
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(c), s, n)) for key, (c, s, n) in self._values.items())
+
+        lines = []
+        names = (*self.labelnames, "le")
+        for key, (counts, total, count) in items:
+            for bound, bucket_count in zip(self.buckets, counts):
+                labels = _format_labels(names, (*key, _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_format_labels(names, (*key, '+Inf'))} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+_registry: List[_Metric] = []
+
+
+def _register(metric):
+    _registry.append(metric)
+    return metric
+
+
+HTTP_REQUESTS = _register(Counter(
+    "http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+))
+HTTP_LATENCY = _register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")
+))
+TRAIN_RUNS = _register(Counter(
+    "train_runs_total", "Clustering runs by mode and outcome.", ("mode", "outcome")
+))
+TRAIN_STAGE_SECONDS = _register(Histogram(
+    "train_stage_duration_seconds", "Training pipeline time per stage.", ("stage",),
+    buckets=STAGE_BUCKETS,
+))
+TRAIN_ROWS = _register(Counter("train_rows_total", "Rows clustered by training runs."))
+TRAIN_FEATURES = _register(Histogram(
+    "train_encoded_features", "Encoded features per training run.",
+    buckets=(2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000),
+))
+TRAIN_PEAK_RSS = _register(Histogram(
+    "train_peak_rss_bytes", "Peak resident memory of the worker per training run.",
+    buckets=MEMORY_BUCKETS,
+))
+CHART_RENDER_SECONDS = _register(Histogram(
+    "chart_render_duration_seconds", "Chart rendering time by chart type.", ("chart",),
+    buckets=STAGE_BUCKETS,
+))
+POOL_STATE = _register(Gauge(
+    "segmentation_pool_state", "Current state of the rendering and connection pools.",
+    ("pool", "field"),
+))
+JOBS = _register(Gauge("segmentation_jobs", "Tracked background jobs by status.", ("status",)))
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.header())
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+# Stage durations of the pipeline call currently running in this context.
+_stages: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "pipeline_stages", default=None
+)
+
+
+@contextmanager
+def collect_stages() -> Iterator[Dict[str, float]]:
+    """Collect the durations of every ``stage`` entered inside the block."""
+    timings: Dict[str, float] = {}
+    token = _stages.set(timings)
+    try:
+        yield timings
+    finally:
+        _stages.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage; repeated stages add up."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = _stages.get()
+        if timings is not None:
+            timings[name] = round(timings.get(name, 0.0) + time.perf_counter() - start, 4)
+
+
+def reset_peak_rss() -> bool:
+    """
+    Reset this process's peak RSS so ``peak_rss_bytes`` covers only what follows.
+
+    Returns:
+        Whether the reset worked (Linux only; elsewhere the peak is lifetime)
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident memory of this process since start or ``reset_peak_rss``."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+def observe_run(metrics: Dict, mode: str) -> None:
+    """Record a finished training run's stage timings, size and memory."""
+    TRAIN_RUNS.inc(mode=mode, outcome="succeeded")
+    for name, seconds in (metrics.get("stage_seconds") or {}).items():
+        TRAIN_STAGE_SECONDS.observe(seconds, stage=name)
+    TRAIN_ROWS.inc(metrics.get("n_samples", 0))
+    if metrics.get("n_encoded_features") is not None:
+        TRAIN_FEATURES.observe(metrics["n_encoded_features"])
+    if metrics.get("peak_rss_bytes"):
+        TRAIN_PEAK_RSS.observe(metrics["peak_rss_bytes"])
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts and latency per route.
+
+    Routes are labelled by their path template (``/clustering/runs/{run_id}``)
+    rather than the raw path, which keeps the number of series bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_REQUESTS.inc(method=method, route=path, status=str(status_code))
+            HTTP_LATENCY.observe(time.perf_counter() - start, method=method, route=path)
@@ -0,0 +1,85 @@
+"""Chunked bulk writes for high-volume tables.
+
+Cluster assignments are written without ORM objects: asyncpg ``COPY`` on
+PostgreSQL and batched ``executemany`` inserts everywhere else.
+"""
+import json
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import ClusterAssignment
+from app.services.io import frame_to_records
+
+ASSIGNMENT_COLUMNS = ("run_id", "row_index", "cluster_label", "payload")
+
+
+def _dump_payload(payload: Optional[Dict[str, Any]]) -> Optional[str]:
+    return json.dumps(payload) if payload is not None else None
+
+
+async def _copy_connection(db: AsyncSession):
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql" or bind.dialect.driver != "asyncpg":
+        return None
+
+    connection = await db.connection()
+    raw = await connection.get_raw_connection()
+    return raw.driver_connection
+
+
+async def bulk_insert_assignments(
+    db: AsyncSession,
+    run_id: int,
+    labels: Sequence[int],
+    frame: Optional[pd.DataFrame] = None,
+    chunk_size: Optional[int] = None,
+) -> int:
+    """
+    Insert the cluster assignments of a run in chunks.
+
+    Args:
+        db: Session whose transaction the rows are written in
+        run_id: Clustering run the assignments belong to
+        labels: Cluster label per row, in row order
+        frame: Source rows used as payloads; payloads are left empty if omitted
+        chunk_size: Rows per batch (defaults to ``BULK_INSERT_CHUNK_SIZE``)
+
+    Returns:
+        Number of rows written
+    """
+    chunk_size = chunk_size or settings.BULK_INSERT_CHUNK_SIZE
+    labels = np.asarray(labels, dtype=np.int64)
+    copy_conn = await _copy_connection(db)
+
+    for start in range(0, len(labels), chunk_size):
+        stop = min(start + chunk_size, len(labels))
+        if frame is not None:
+            payloads = frame_to_records(frame.iloc[start:stop])
+        else:
+            payloads = [None] * (stop - start)
+        rows = zip(range(start, stop), labels[start:stop].tolist(), payloads)
+
+        if copy_conn is not None:
+            await copy_conn.copy_records_to_table(
+                ClusterAssignment.__tablename__,
+                records=[
+                    (run_id, row_index, label, _dump_payload(payload))
+                    for row_index, label, payload in rows
+                ],
+                columns=ASSIGNMENT_COLUMNS,
+            )
+        else:
+            params = []
+            for row_index, label, payload in rows:
+                row = {"run_id": run_id, "row_index": row_index, "cluster_label": label}
+                if frame is not None:
+                    row["payload"] = payload
+                params.append(row)
+            await db.execute(insert(ClusterAssignment.__table__), params)
+
+    return len(labels)
@@ -13,14 +13,26 @@ class Dataset(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     file_path: Mapped[str] = mapped_column(Text, nullable=False)
+    parquet_path: Mapped[str] = mapped_column(Text, nullable=True)
+    column_schema: Mapped[dict] = mapped_column(JSON, nullable=True)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=True, index=True)
+    profile: Mapped[dict] = mapped_column(JSON, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
 
     clustering_runs: Mapped[List["ClusteringRun"]] = relationship(
-        "ClusteringRun", back_populates="dataset", cascade="all, delete-orphan"
+        "ClusteringRun",
+        back_populates="dataset",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
+    @property
+    def data_path(self) -> str:
+        """Typed Parquet copy of the upload if one exists, else the raw CSV."""
+        return self.parquet_path or self.file_path
+
 
 class ClusteringRun(Base):
     __tablename__ = "clustering_runs"
@@ -31,16 +43,22 @@ class ClusteringRun(Base):
     )
     linkage: Mapped[str] = mapped_column(String(50), nullable=False)
     n_clusters: Mapped[int] = mapped_column(Integer, nullable=False)
+    params: Mapped[dict] = mapped_column(JSON, nullable=True)
     feature_config: Mapped[dict] = mapped_column(JSON, nullable=True)
     metrics: Mapped[dict] = mapped_column(JSON, nullable=True)
     dendrogram_path: Mapped[str] = mapped_column(Text, nullable=True)
+    labels_path: Mapped[str] = mapped_column(Text, nullable=True)
+    model_path: Mapped[str] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
 
     dataset: Mapped["Dataset"] = relationship("Dataset", back_populates="clustering_runs")
     cluster_assignments: Mapped[List["ClusterAssignment"]] = relationship(
-        "ClusterAssignment", back_populates="clustering_run", cascade="all, delete-orphan"
+        "ClusterAssignment",
+        back_populates="clustering_run",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
 
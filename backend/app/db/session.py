@@ -1,15 +1,131 @@
-from typing import AsyncGenerator
+import time
+from typing import Any, AsyncGenerator, Dict
 
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import settings
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.ENV == "dev",
-    future=True,
+# Applied to every new SQLite connection; WAL lets readers run alongside a writer.
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "foreign_keys=ON",
+    "temp_store=MEMORY",
+    f"busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
 )
 
+_pool_counters = {
+    "connects": 0,
+    "checkouts": 0,
+    "waited_checkouts": 0,
+    "wait_seconds": 0.0,
+    "max_wait_seconds": 0.0,
+    "timeouts": 0,
+}
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a free connection."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            _pool_counters["timeouts"] += 1
+            self._record_wait(time.perf_counter() - start)
+            raise
+
+        # Time spent opening a new connection is not waiting for the pool.
+        if connection.info.get("connected_at", start) < start:
+            self._record_wait(time.perf_counter() - start)
+        return connection
+
+    @staticmethod
+    def _record_wait(waited: float) -> None:
+        # Handing out an idle connection takes microseconds.
+        if waited < 0.001:
+            return
+        _pool_counters["waited_checkouts"] += 1
+        _pool_counters["wait_seconds"] += waited
+        _pool_counters["max_wait_seconds"] = max(_pool_counters["max_wait_seconds"], waited)
+
+
+def _engine_options(database_url: str) -> Dict[str, Any]:
+    url = make_url(database_url)
+    options: Dict[str, Any] = {
+        "echo": settings.DB_ECHO,
+        "future": True,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # Each connection to an in-memory database is a separate database.
+        return options
+
+    options.update(
+        poolclass=InstrumentedPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    if url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE
+        }
+    return options
+
+
+engine = create_async_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL))
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def _on_connect(dbapi_connection, connection_record) -> None:
+    _pool_counters["connects"] += 1
+    connection_record.info["connected_at"] = time.perf_counter()
+    if engine.dialect.name == "sqlite":
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
+
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    _pool_counters["checkouts"] += 1
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Connection pool occupancy and checkout wait counters."""
+    pool = engine.pool
+    waited = _pool_counters["waited_checkouts"]
+    stats: Dict[str, Any] = {
+        "dialect": engine.dialect.name,
+        "pool": type(pool).__name__,
+        "connects": _pool_counters["connects"],
+        "checkouts": _pool_counters["checkouts"],
+        "waited_checkouts": waited,
+        "timeouts": _pool_counters["timeouts"],
+        "mean_wait_ms": (
+            round(1000 * _pool_counters["wait_seconds"] / waited, 3) if waited else None
+        ),
+        "max_wait_ms": round(1000 * _pool_counters["max_wait_seconds"], 3),
+    }
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update(
+            size=pool.size(),
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            in_use=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(0, pool.overflow()),
+        )
+    return stats
+
+
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
     class_=AsyncSession,
@@ -29,4 +145,3 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             raise
         finally:
             await session.close()
-
@@ -1,16 +1,30 @@
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.api.routes import router
+from app.core import telemetry
 from app.core.config import settings
+from app.core.profiling import ProfilingMiddleware
+from app.db.session import pool_stats
+from app.schemas.clustering import JobStatus
+from app.services import jobs, rendering
+from app.services.cleanup import sweep_orphaned_files
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     settings.upload_path
     settings.output_path
+    jobs.start_workers()
+    rendering.start_workers()
+    if settings.ORPHAN_SWEEP_ON_STARTUP:
+        jobs.schedule(sweep_orphaned_files())
     yield
+    rendering.shutdown_workers()
+    jobs.shutdown_workers()
 
 
 app = FastAPI(
@@ -22,5 +36,32 @@ app = FastAPI(
     redoc_url="/redoc",
 )
 
+# Chart data and segment pages are JSON number arrays that compress well.
+app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MIN_BYTES)
+if settings.PROFILING_ENABLED or settings.PROFILING_SECRET:
+    app.add_middleware(ProfilingMiddleware)
+if settings.METRICS_ENABLED:
+    # Added last so it wraps the other middleware and times the whole request.
+    app.add_middleware(telemetry.MetricsMiddleware)
+
 app.include_router(router, prefix="/api/v1")
 
+
+
+if settings.METRICS_ENABLED:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics() -> PlainTextResponse:
+        """Prometheus scrape endpoint."""
+        for pool, stats in (("db", pool_stats()), ("render", rendering.render_stats())):
+            for field, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    telemetry.POOL_STATE.set(value, pool=pool, field=field)
+
+        counts = {job_status.value: 0 for job_status in JobStatus}
+        for job in jobs.list_jobs():
+            counts[JobStatus(job["status"]).value] += 1
+        for job_status, count in counts.items():
+            telemetry.JOBS.set(count, status=job_status)
+
+        return PlainTextResponse(telemetry.render_metrics(), media_type=telemetry.CONTENT_TYPE)
@@ -1,8 +1,8 @@
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 
 class LinkageMethod(str, Enum):
@@ -12,24 +12,94 @@ class LinkageMethod(str, Enum):
     SINGLE = "single"
 
 
-class ClusteringRequest(BaseModel):
+class ClusteringMode(str, Enum):
+    EXACT = "exact"
+    SCALABLE = "scalable"
+    AUTO = "auto"
+
+
+# Everything that shapes a dataset's linkage tree; cutting it is separate.
+class LinkageTreeRequest(BaseModel):
     dataset_id: int
     linkage: LinkageMethod = LinkageMethod.WARD
-    n_clusters: int = Field(ge=2, le=15, default=3)
     use_pca: bool = False
     pca_components: Optional[int] = Field(default=None, ge=2)
+    mode: ClusteringMode = ClusteringMode.EXACT
+    n_micro_clusters: Optional[int] = Field(default=None, ge=16, le=20000)
+    max_categories: Optional[int] = Field(default=None, ge=2)
+    min_category_frequency: Optional[float] = Field(default=None, ge=0, lt=1)
+    out_of_core: bool = False
+
+
+class ClusteringRequest(LinkageTreeRequest):
+    n_clusters: int = Field(ge=2, le=15, default=3)
+
+
+class RecutRequest(BaseModel):
+    n_clusters: int = Field(ge=2, le=15)
+
+
+class PredictRequest(BaseModel):
+    records: List[Dict[str, Any]] = Field(min_length=1)
+
+
+class PredictResponse(BaseModel):
+    run_id: int
+    n_records: int
+    cluster_labels: List[int]
+    distances: List[float]
+
+
+class ScoreRequest(BaseModel):
+    dataset_id: int
+
+
+class SweepRequest(LinkageTreeRequest):
+    k_min: int = Field(ge=2, le=15, default=2)
+    k_max: int = Field(ge=2, le=15, default=10)
+
+    @model_validator(mode="after")
+    def check_k_range(self) -> "SweepRequest":
+        if self.k_min > self.k_max:
+            raise ValueError("k_min must be <= k_max")
+        return self
+
+
+class SweepPoint(BaseModel):
+    n_clusters: int
+    silhouette_score: Optional[float]
+    silhouette_ci: Optional[List[float]] = None
+    calinski_harabasz: Optional[float]
+    davies_bouldin: Optional[float]
+    inertia: float
+    merge_height: float
+    cluster_sizes: Dict[int, int]
+
+
+class SweepResponse(BaseModel):
+    dataset_id: int
+    linkage: str
+    clustering_mode: str
+    n_samples: int
+    silhouette_method: Optional[str]
+    silhouette_sample_size: Optional[int]
+    linkage_cache_hit: bool
+    best_k: Optional[int]
+    results: List[SweepPoint]
 
 
 class ClusteringRunResponse(BaseModel):
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, protected_namespaces=())
 
     id: int
     dataset_id: int
     linkage: str
     n_clusters: int
+    params: Optional[Dict[str, Any]] = None
     feature_config: Optional[Dict[str, Any]]
     metrics: Optional[Dict[str, Any]]
     dendrogram_path: Optional[str]
+    model_path: Optional[str] = None
     created_at: datetime
 
 
@@ -41,15 +111,99 @@ class ClusteringRunListResponse(BaseModel):
 class ClusterAssignmentResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
-    id: int
     run_id: int
     row_index: int
     cluster_label: int
     payload: Optional[Dict[str, Any]]
 
 
+class ScatterMode(str, Enum):
+    AUTO = "auto"
+    POINTS = "points"
+    BINNED = "binned"
+
+
+class PointEncoding(str, Enum):
+    JSON = "json"
+    UINT16 = "uint16"
+
+
+class DendrogramData(BaseModel):
+    run_id: int
+    linkage: str
+    n_leaves: int
+    truncated: bool
+    icoord: List[List[float]]
+    dcoord: List[List[float]]
+    color_list: List[str]
+    leaf_labels: List[str]
+
+
+class ScatterClusterPoints(BaseModel):
+    label: int
+    count: int
+    # Floats for the json encoding; base64 little-endian uint16 steps across
+    # the axis range for the uint16 encoding.
+    x: Union[List[float], str]
+    y: Union[List[float], str]
+
+
+class ScatterData(BaseModel):
+    run_id: int
+    x_feature: str
+    y_feature: str
+    encoding: PointEncoding
+    x_range: List[float]
+    y_range: List[float]
+    n_points: int
+    n_shown: int
+    clusters: List[ScatterClusterPoints]
+
+
+class ClusterShare(BaseModel):
+    label: int
+    count: int
+    fraction: float
+
+
+class DistributionData(BaseModel):
+    run_id: int
+    n_samples: int
+    clusters: List[ClusterShare]
+
+
+class SegmentFormat(str, Enum):
+    JSON = "json"
+    NDJSON = "ndjson"
+
+
 class SegmentListResponse(BaseModel):
     run_id: int
     assignments: List[ClusterAssignmentResponse]
     total: int
+    next_cursor: Optional[int] = None
+
 
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class JobResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: JobStatus
+    stage: Optional[str]
+    progress: float
+    run_id: Optional[int]
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+
+class JobListResponse(BaseModel):
+    jobs: List[JobResponse]
+    total: int
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict
 
@@ -18,6 +18,9 @@ class DatasetResponse(BaseModel):
     id: int
     name: str
     file_path: str
+    column_schema: Optional[Dict[str, str]] = None
+    content_hash: Optional[str] = None
+    profile: Optional[Dict[str, Any]] = None
     created_at: datetime
 
 
@@ -0,0 +1,282 @@
+"""Persisted model artifacts of clustering runs.
+
+Each run saves the fitted preprocessor, the optional PCA and the cluster
+centroids in the clustering space as one joblib file, so new rows can be
+scored without refitting. ``model_registry`` keeps recently used models
+loaded in memory as ``RunModel`` objects, ready to score.
+"""
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from scipy import sparse
+
+from app.core.config import settings
+from app.schemas.clustering import ClusteringRequest
+from app.services.metrics import cluster_centroids
+
+# Bump when the artifact layout changes; older artifacts are then rejected.
+MODEL_ARTIFACT_VERSION = 1
+
+
+def build_model_artifact(
+    fitted: Dict[str, Any], labels: np.ndarray, request: ClusteringRequest
+) -> Dict[str, Any]:
+    """
+    Collect what is needed to assign new rows to a run's clusters.
+
+    Args:
+        fitted: Fitted tree as returned by ``pipeline.fit_linkage``
+        labels: Final cluster label per row of ``fitted["data"]``
+        request: Clustering parameters of the run
+
+    Returns:
+        Picklable artifact dictionary
+    """
+    cluster_labels, centroids = cluster_centroids(fitted["data"], labels)
+    return {
+        "version": MODEL_ARTIFACT_VERSION,
+        "sklearn_version": sklearn.__version__,
+        "preprocessor": fitted["preprocessor"],
+        "pca": fitted["pca"],
+        "numeric_cols": list(fitted["numeric_cols"]),
+        "categorical_cols": list(fitted["categorical_cols"]),
+        "linkage": request.linkage.value,
+        "n_clusters": request.n_clusters,
+        "cluster_labels": cluster_labels.astype(np.int32),
+        "centroids": centroids,
+    }
+
+
+def model_path_for(run_id: int) -> Path:
+    model_dir = settings.output_path / "models"
+    model_dir.mkdir(parents=True, exist_ok=True)
+    return model_dir / f"run_{run_id}.joblib"
+
+
+def save_model(run_id: int, artifact: Dict[str, Any]) -> str:
+    path = model_path_for(run_id)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    joblib.dump(artifact, tmp_path)
+    tmp_path.replace(path)
+    return str(path)
+
+
+def load_model(model_path: str) -> Dict[str, Any]:
+    path = Path(model_path)
+    if not path.exists():
+        raise FileNotFoundError(f"Model file not found: {model_path}")
+
+    artifact = joblib.load(path)
+    version = artifact.get("version") if isinstance(artifact, dict) else None
+    if version != MODEL_ARTIFACT_VERSION:
+        raise ValueError(f"Unsupported model artifact version: {version}")
+
+    return artifact
+
+
+class RunModel:
+    """
+    A loaded model artifact that assigns rows to the nearest cluster centroid.
+
+    Scaling, one-hot encoding and PCA are all affine and act on each column
+    independently, so the whole transform is compiled once into a weight
+    matrix for the numeric columns, a lookup table per categorical column
+    and an offset. The compiled transform is checked against the fitted
+    pipeline and only used when they agree.
+    """
+
+    def __init__(self, artifact: Dict[str, Any]):
+        self.artifact = artifact
+        self.numeric_cols: List[str] = artifact["numeric_cols"]
+        self.categorical_cols: List[str] = artifact["categorical_cols"]
+        self.feature_cols = self.numeric_cols + self.categorical_cols
+        self.cluster_labels: np.ndarray = np.asarray(artifact["cluster_labels"])
+        self.centroids: np.ndarray = np.asarray(artifact["centroids"], dtype=float)
+        self._centroid_norms = (self.centroids ** 2).sum(axis=1)
+        self._categories = self._encoder_categories()
+        self.compiled = self._compile()
+
+    def _encoder_categories(self) -> List[pd.Index]:
+        if not self.categorical_cols:
+            return []
+        encoder = self.artifact["preprocessor"].named_transformers_["cat"][-1]
+        return [pd.Index(categories) for categories in encoder.categories_]
+
+    def _pipeline_transform(self, frame: pd.DataFrame) -> np.ndarray:
+        data = self.artifact["preprocessor"].transform(frame)
+        if sparse.issparse(data):
+            data = data.toarray()
+        if self.artifact["pca"] is not None:
+            data = self.artifact["pca"].transform(data)
+        return np.asarray(data, dtype=float)
+
+    def _probe_frame(self, rows: List[Tuple[Sequence[float], Sequence[Any]]]) -> pd.DataFrame:
+        frame = pd.DataFrame(
+            [list(numeric) + list(categorical) for numeric, categorical in rows],
+            columns=self.feature_cols,
+        )
+        frame[self.numeric_cols] = frame[self.numeric_cols].astype(float)
+        frame[self.categorical_cols] = frame[self.categorical_cols].astype(object)
+        return frame
+
+    def _compile(self) -> bool:
+        n_numeric = len(self.numeric_cols)
+        base_categories = [categories[0] for categories in self._categories]
+        base = ([0.0] * n_numeric, base_categories)
+
+        rows = [base]
+        for k in range(n_numeric):
+            rows.append((np.eye(n_numeric)[k], base_categories))
+        for j, categories in enumerate(self._categories):
+            # One row per known category plus a last row for unseen values.
+            for value in [*categories, "__unseen__"]:
+                probe = list(base_categories)
+                probe[j] = value
+                rows.append(([0.0] * n_numeric, probe))
+
+        try:
+            outputs = self._pipeline_transform(self._probe_frame(rows))
+        except Exception:
+            return False
+
+        self._offset = outputs[0]
+        self._numeric_weights = outputs[1:1 + n_numeric] - self._offset
+        self._tables = []
+        start = 1 + n_numeric
+        for categories in self._categories:
+            stop = start + len(categories) + 1
+            self._tables.append(outputs[start:stop] - self._offset)
+            start = stop
+
+        # Check additivity on mixed rows before trusting the tables.
+        rng = np.random.default_rng(0)
+        checks = [
+            (
+                rng.normal(size=n_numeric) * 10,
+                [categories[rng.integers(len(categories))] for categories in self._categories],
+            )
+            for _ in range(8)
+        ]
+        expected = self._pipeline_transform(self._probe_frame(checks))
+        numeric_checks = np.array([numeric for numeric, _ in checks])
+        columns = dict(zip(self.numeric_cols, numeric_checks.T))
+        for j, col in enumerate(self.categorical_cols):
+            columns[col] = [categorical[j] for _, categorical in checks]
+        return bool(np.allclose(self._compiled_transform(columns), expected, atol=1e-8))
+
+    def _compiled_transform(self, columns: Mapping[str, Sequence[Any]]) -> np.ndarray:
+        if self.numeric_cols:
+            numeric = np.column_stack(
+                [np.asarray(columns[col], dtype=float) for col in self.numeric_cols]
+            )
+            data = numeric @ self._numeric_weights + self._offset
+        else:
+            n_rows = len(columns[self.categorical_cols[0]])
+            data = np.tile(self._offset, (n_rows, 1))
+
+        for col, categories, table in zip(self.categorical_cols, self._categories, self._tables):
+            values = pd.Index(np.asarray(columns[col], dtype=object))
+            # get_indexer returns -1 for unseen values: the table's last row.
+            data = data + table[categories.get_indexer(values)]
+        return data
+
+    def transform(
+        self, columns: Mapping[str, Sequence[Any]], check_finite: bool = True
+    ) -> np.ndarray:
+        """
+        Map raw feature columns into the clustering space.
+
+        Args:
+            columns: Values per feature column, e.g. a DataFrame
+            check_finite: Reject rows with missing numeric values (otherwise
+                they come back as NaN rows)
+
+        Raises:
+            ValueError: If feature columns are missing or a numeric value is
+                missing or not a number
+        """
+        missing = [col for col in self.feature_cols if col not in columns]
+        if missing:
+            raise ValueError(f"Missing feature columns: {', '.join(missing)}")
+
+        try:
+            if self.compiled:
+                data = self._compiled_transform(columns)
+            else:
+                frame = pd.DataFrame({col: columns[col] for col in self.feature_cols})
+                frame[self.numeric_cols] = frame[self.numeric_cols].astype(float)
+                data = self._pipeline_transform(frame)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid feature values: {e}") from e
+
+        if check_finite and not np.isfinite(data).all():
+            raise ValueError("Numeric feature values must be present and finite")
+        return data
+
+    def assign(self, data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest centroid label and Euclidean distance for rows in the clustering space."""
+        sq_dist = (
+            (data ** 2).sum(axis=1)[:, None]
+            - 2 * data @ self.centroids.T
+            + self._centroid_norms[None, :]
+        )
+        nearest = sq_dist.argmin(axis=1)
+        distances = np.sqrt(np.maximum(sq_dist[np.arange(len(data)), nearest], 0.0))
+        return self.cluster_labels[nearest], distances
+
+    def predict(self, columns: Mapping[str, Sequence[Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Transform raw feature columns and assign each row to a cluster."""
+        return self.assign(self.transform(columns))
+
+
+class ModelRegistry:
+    """
+    In-process LRU of loaded run models, keyed by artifact path.
+
+    Entries are reloaded when the file's modification time changes, since a
+    run id (and so its model path) can be reused after the run is deleted.
+    """
+
+    def __init__(self, max_models: int):
+        self.max_models = max_models
+        self._models: "OrderedDict[str, Tuple[int, RunModel]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model_path: str) -> RunModel:
+        """Return the model at ``model_path``, loading it on a miss."""
+        try:
+            mtime_ns = Path(model_path).stat().st_mtime_ns
+        except FileNotFoundError:
+            self.discard(model_path)
+            raise FileNotFoundError(f"Model file not found: {model_path}")
+
+        with self._lock:
+            entry = self._models.get(model_path)
+            if entry is not None and entry[0] == mtime_ns:
+                self._models.move_to_end(model_path)
+                return entry[1]
+
+        model = RunModel(load_model(model_path))
+        with self._lock:
+            self._models[model_path] = (mtime_ns, model)
+            self._models.move_to_end(model_path)
+            while len(self._models) > max(1, self.max_models):
+                self._models.popitem(last=False)
+        return model
+
+    def discard(self, model_path: Optional[str]) -> None:
+        with self._lock:
+            self._models.pop(model_path, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+
+model_registry = ModelRegistry(settings.MODEL_REGISTRY_SIZE)
@@ -0,0 +1,84 @@
+"""Size-capped, content-addressed file caches.
+
+Entries are single files named by a content hash. Reads refresh the file's
+access time, leaving its modification time as the creation time, and writes
+evict the least recently used entries until the cache fits its byte budget.
+Several processes may share one cache directory: writes are atomic renames
+and eviction tolerates races.
+"""
+import hashlib
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+
+def content_key(*parts: Any) -> str:
+    """Hash JSON-serializable parts into a stable cache key."""
+    encoded = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class DiskCache:
+    def __init__(self, directory: Path, max_bytes: int, suffix: str):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> Optional[Path]:
+        """Return the entry for ``key`` and mark it as recently used."""
+        path = self.path_for(key)
+        try:
+            os.utime(path, (time.time(), path.stat().st_mtime))
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, write: Callable[[Path], None]) -> Path:
+        """Create the entry for ``key`` by calling ``write`` with a temporary path."""
+        path = self.path_for(key)
+        tmp_path = self.directory / f".{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        self.evict()
+        return path
+
+    def discard(self, key: str) -> None:
+        self.path_for(key).unlink(missing_ok=True)
+
+    def discard_prefix(self, prefix: str) -> None:
+        """Remove every entry whose key starts with ``prefix``."""
+        for path in self.directory.glob(f"{prefix}*{self.suffix}"):
+            path.unlink(missing_ok=True)
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits ``max_bytes``."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def _entries(self):
+        for path in self.directory.glob(f"*{self.suffix}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            yield path, stat.st_size, stat.st_atime
@@ -0,0 +1,123 @@
+"""Compact plotting data for client-side chart rendering.
+
+These helpers return the numbers behind the server-rendered PNG charts so the
+frontend can draw them itself. Point coordinates may be quantized to 16-bit
+integers and base64-encoded, which together with gzip keeps scatter payloads
+small.
+"""
+import base64
+from typing import Any, Dict, List
+
+import numpy as np
+from scipy.cluster.hierarchy import dendrogram
+
+from app.services.clustering import downsample_per_cluster
+
+_UINT16_MAX = np.iinfo(np.uint16).max
+
+
+def dendrogram_data(linkage_matrix: np.ndarray, max_leaves: int = 50) -> Dict[str, Any]:
+    """
+    Compute dendrogram segment coordinates without drawing them.
+
+    Uses the same truncation and colour threshold as ``generate_dendrogram``.
+    Each link ``i`` is drawn as the polyline through ``(icoord[i][k], dcoord[i][k])``.
+    """
+    truncate = linkage_matrix.shape[0] > max_leaves
+    tree = dendrogram(
+        linkage_matrix,
+        no_plot=True,
+        truncate_mode="lastp" if truncate else None,
+        p=max_leaves,
+        show_contracted=True,
+        color_threshold=0.7 * max(linkage_matrix[:, 2]),
+    )
+
+    return {
+        "icoord": tree["icoord"],
+        "dcoord": tree["dcoord"],
+        "color_list": tree["color_list"],
+        "leaf_labels": [str(label) for label in tree["ivl"]],
+        "n_leaves": int(linkage_matrix.shape[0] + 1),
+        "truncated": truncate,
+    }
+
+
+def quantize(values: np.ndarray, lower: float, upper: float) -> str:
+    """Encode values as base64 little-endian uint16 steps between ``lower`` and ``upper``."""
+    span = upper - lower
+    if span > 0:
+        steps = np.rint((values - lower) / span * _UINT16_MAX)
+    else:
+        steps = np.zeros(len(values))
+    return base64.b64encode(steps.astype("<u2").tobytes()).decode("ascii")
+
+
+def scatter_data(
+    x_values: np.ndarray,
+    y_values: np.ndarray,
+    labels: np.ndarray,
+    max_points: int,
+    quantized: bool = False,
+) -> Dict[str, Any]:
+    """
+    Per-cluster point arrays for a scatter plot, downsampled per cluster.
+
+    Args:
+        x_values: Values of the x feature, one per row
+        y_values: Values of the y feature, one per row
+        labels: Cluster label per row
+        max_points: Total point budget (see ``downsample_per_cluster``)
+        quantized: Encode coordinates with ``quantize`` instead of JSON floats
+
+    Returns:
+        Dictionary with the axis ranges, point counts and one entry per cluster
+    """
+    x_values = np.asarray(x_values, dtype=float)
+    y_values = np.asarray(y_values, dtype=float)
+    labels = np.asarray(labels)
+
+    valid = np.isfinite(x_values) & np.isfinite(y_values)
+    x_values, y_values, labels = x_values[valid], y_values[valid], labels[valid]
+    if not len(labels):
+        raise ValueError("No rows with numeric values for both features")
+
+    x_range = [float(x_values.min()), float(x_values.max())]
+    y_range = [float(y_values.min()), float(y_values.max())]
+    keep = downsample_per_cluster(labels, max_points)
+
+    clusters: List[Dict[str, Any]] = []
+    for label in np.unique(labels):
+        rows = keep[labels[keep] == label]
+        x, y = x_values[rows], y_values[rows]
+        clusters.append({
+            "label": int(label),
+            "count": int(np.count_nonzero(labels == label)),
+            "x": quantize(x, *x_range) if quantized else x.tolist(),
+            "y": quantize(y, *y_range) if quantized else y.tolist(),
+        })
+
+    return {
+        "encoding": "uint16" if quantized else "json",
+        "x_range": x_range,
+        "y_range": y_range,
+        "n_points": int(len(labels)),
+        "n_shown": int(len(keep)),
+        "clusters": clusters,
+    }
+
+
+def distribution_data(cluster_sizes: Dict[Any, int]) -> Dict[str, Any]:
+    sizes = {int(label): int(count) for label, count in cluster_sizes.items()}
+    total = sum(sizes.values())
+    return {
+        "n_samples": total,
+        "clusters": [
+            {
+                "label": label,
+                "count": count,
+                "fraction": count / total if total else 0.0,
+            }
+            for label, count in sorted(sizes.items())
+        ],
+    }
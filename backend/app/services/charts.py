@@ -0,0 +1,70 @@
+"""On-disk cache of rendered chart images.
+
+A run's results never change once it is saved, so a chart is fully
+determined by the run, the chart type and the request parameters. The
+cache key, and the ETag taken from it, is derived from exactly those, so a
+request is answered (or revalidated with ``304 Not Modified``) after one
+primary-key lookup of the run.
+"""
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+from app.services.cache import DiskCache, content_key
+
+# Bump when chart styling changes so stale images are not served.
+CHART_CACHE_VERSION = 1
+
+
+def chart_cache() -> DiskCache:
+    return DiskCache(
+        settings.output_path / "chart_cache",
+        max_bytes=settings.CHART_CACHE_MAX_BYTES,
+        suffix=".png",
+    )
+
+
+def run_version(run) -> str:
+    """
+    Tell a run apart from an earlier, deleted run that had the same id.
+
+    SQLite gives a deleted run's id to the next run, so keys and ETags built
+    from the id alone would match the old run's charts. The labels sidecar
+    path names the dataset upload, which is unique, and ``created_at``
+    separates runs of one dataset.
+
+    Args:
+        run: Clustering run (anything with ``created_at`` and ``labels_path``)
+    """
+    return content_key(run.created_at, run.labels_path)
+
+
+def chart_key(run_id: int, chart: str, version: str, **params: Any) -> str:
+    """Cache key of a chart; the run id prefix lets a run's charts be purged."""
+    digest = content_key("chart", CHART_CACHE_VERSION, run_id, version, chart, params)
+    return f"run_{run_id}_{chart}_{digest}"
+
+
+def chart_etag(key: str) -> str:
+    return f'"{key.rsplit("_", 1)[-1]}"'
+
+
+def get_cached_chart(key: str) -> Optional[Path]:
+    return chart_cache().get(key)
+
+
+def store_chart(key: str, fig) -> Path:
+    """Write a rendered figure into the cache."""
+    def write(tmp_path: Path) -> None:
+        fig.savefig(tmp_path, format="png", dpi=150, bbox_inches="tight", facecolor="white")
+
+    return chart_cache().put(key, write)
+
+
+def render_chart(key: str, generate: Callable[..., Any], *args: Any, **kwargs: Any) -> Path:
+    """Build a figure with ``generate(*args, **kwargs)`` and store it under ``key``."""
+    return store_chart(key, generate(*args, **kwargs))
+
+
+def purge_run_charts(run_id: int) -> None:
+    chart_cache().discard_prefix(f"run_{run_id}_")
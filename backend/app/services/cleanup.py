@@ -0,0 +1,184 @@
+"""Deletion of datasets and runs, and removal of the files they leave behind.
+
+Rows are deleted with set-based statements, so a run's assignments are never
+loaded into the session. The files of deleted rows (labels, linkage trees,
+models, dendrograms, cached charts and scoring outputs) are removed
+afterwards by ``purge_files``, which routes queue as a background task.
+``sweep_orphaned_files`` catches files whose purge never ran, for example
+because the process stopped in between.
+"""
+import asyncio
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Set
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import ClusterAssignment, ClusteringRun, Dataset
+from app.db.session import AsyncSessionLocal
+from app.services.artifacts import model_registry
+from app.services.charts import chart_cache, purge_run_charts
+from app.services.results import linkage_path_for
+
+# Files younger than this may belong to a run that is still being saved.
+ORPHAN_MIN_AGE_SECONDS = 600
+
+# One anchored pattern per kind of run file; group 1 is the run id. Dataset
+# file names are user-chosen and may contain "run_<n>" themselves, so the
+# sidecar pattern only looks at the suffix the run adds.
+_SIDECAR = re.compile(r"\.run_(\d+)\.(labels|linkage)\.npy$")
+_MODEL = re.compile(r"^run_(\d+)\.joblib$")
+_SCORES = re.compile(r"^run_(\d+)_[0-9a-f]+\.parquet$")
+_SCORES_PARTIAL = re.compile(r"^\.run_(\d+)_[0-9a-f]+\.(part\d+\.parquet|parquet\.tmp)$")
+_CHART = re.compile(r"^run_(\d+)_\w+\.png$")
+_LEGACY_CHART = re.compile(r"^(?:dendrogram|scatter_plot|distribution)_run_(\d+)\.png$")
+
+# Chart files written by the renderer before the chart cache existed.
+LEGACY_CHART_NAMES = (
+    "dendrogram_run_{}.png",
+    "scatter_plot_run_{}.png",
+    "distribution_run_{}.png",
+)
+
+
+def _scores_dir() -> Path:
+    return settings.output_path / "scores"
+
+
+async def delete_runs(db: AsyncSession, *criteria: Any) -> Dict[str, List[Any]]:
+    """
+    Delete the runs matching ``criteria`` together with their assignments.
+
+    Args:
+        db: Session to execute the deletes in; the caller commits
+        *criteria: ``WHERE`` clauses on ``ClusteringRun``
+
+    Returns:
+        Dictionary with the deleted ``run_ids`` and the ``paths`` of their
+        files, to pass to ``purge_files`` once the deletion is committed
+    """
+    result = await db.execute(
+        select(
+            ClusteringRun.id,
+            ClusteringRun.dendrogram_path,
+            ClusteringRun.labels_path,
+            ClusteringRun.model_path,
+            Dataset.file_path,
+        )
+        .join(Dataset, Dataset.id == ClusteringRun.dataset_id)
+        .where(*criteria)
+    )
+    run_ids, paths = [], []
+    for run_id, dendrogram_path, labels_path, model_path, dataset_path in result.all():
+        run_ids.append(run_id)
+        paths.extend(p for p in (dendrogram_path, labels_path, model_path) if p)
+        paths.append(str(linkage_path_for(dataset_path, run_id)))
+        model_registry.discard(model_path)
+
+    if run_ids:
+        # Spelled out rather than left to ON DELETE CASCADE, which SQLite
+        # only enforces with its foreign_keys pragma on.
+        await db.execute(
+            delete(ClusterAssignment)
+            .where(ClusterAssignment.run_id.in_(run_ids))
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            delete(ClusteringRun)
+            .where(ClusteringRun.id.in_(run_ids))
+            .execution_options(synchronize_session=False)
+        )
+
+    return {"run_ids": run_ids, "paths": paths}
+
+
+async def delete_dataset_rows(db: AsyncSession, dataset: Dataset) -> Dict[str, List[Any]]:
+    """
+    Delete a dataset, its runs and their assignments.
+
+    Returns:
+        Same dictionary as ``delete_runs``, with the dataset files added to ``paths``
+    """
+    deleted = await delete_runs(db, ClusteringRun.dataset_id == dataset.id)
+    await db.execute(
+        delete(Dataset)
+        .where(Dataset.id == dataset.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted["paths"].extend(p for p in (dataset.file_path, dataset.parquet_path) if p)
+    return deleted
+
+
+def purge_files(paths: Iterable[str], run_ids: Iterable[int] = ()) -> None:
+    """Remove deleted rows' files, cached charts and scoring outputs."""
+    for path in paths:
+        _unlink(Path(path))
+
+    for run_id in run_ids:
+        purge_run_charts(run_id)
+        for name in LEGACY_CHART_NAMES:
+            _unlink(settings.output_path / name.format(run_id))
+        for scores_path in _scores_dir().glob(f"run_{run_id}_*.parquet"):
+            _unlink(scores_path)
+
+
+def _unlink(path: Path) -> None:
+    try:
+        path.unlink(missing_ok=True)
+    except OSError:
+        # Left for the orphan sweep, e.g. a file still open elsewhere.
+        pass
+
+
+def _orphaned(
+    paths: Iterable[Path], pattern: "re.Pattern[str]", run_ids: Set[int], cutoff: float
+) -> List[Path]:
+    """Files among ``paths`` that ``pattern`` attributes to a run not in ``run_ids``."""
+    orphans = []
+    for path in paths:
+        match = pattern.search(path.name)
+        if match is None or int(match.group(1)) in run_ids:
+            continue
+        try:
+            if path.stat().st_mtime < cutoff:
+                orphans.append(path)
+        except FileNotFoundError:
+            continue
+    return orphans
+
+
+def _sweep(run_ids: Set[int]) -> int:
+    cutoff = time.time() - ORPHAN_MIN_AGE_SECONDS
+    candidates = [
+        (_MODEL, (settings.output_path / "models").glob("run_*.joblib")),
+        (_SCORES, _scores_dir().glob("run_*.parquet")),
+        (_SCORES_PARTIAL, _scores_dir().glob(".run_*")),
+        (_CHART, chart_cache().directory.glob("run_*.png")),
+        (_LEGACY_CHART, settings.output_path.glob("*_run_*.png")),
+        (_SIDECAR, settings.upload_path.glob("*.run_*.npy")),
+    ]
+    orphans = [
+        path
+        for pattern, paths in candidates
+        for path in _orphaned(paths, pattern, run_ids, cutoff)
+    ]
+    for path in orphans:
+        _unlink(path)
+    return len(orphans)
+
+
+async def sweep_orphaned_files() -> int:
+    """
+    Remove run files whose run no longer exists in the database.
+
+    Returns:
+        Number of files removed
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(ClusteringRun.id))
+        run_ids = set(result.scalars().all())
+
+    return await asyncio.to_thread(_sweep, run_ids)
@@ -1,24 +1,75 @@
-from typing import Tuple
+from typing import Optional, Tuple
 
 import matplotlib
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.patches import Patch
+from scipy import sparse
 from scipy.cluster.hierarchy import dendrogram, fcluster, linkage
+from sklearn.cluster import MiniBatchKMeans
 
-matplotlib.use("Agg")
+from app.core.config import settings
 
 
 def perform_hierarchical_clustering(
     data: np.ndarray, linkage_method: str
 ) -> np.ndarray:
+    if sparse.issparse(data):
+        # scipy's linkage needs dense input; exact mode is only used for small datasets.
+        data = data.toarray()
     linkage_matrix = linkage(data, method=linkage_method)
     return linkage_matrix
 
 
-def get_flat_clusters(linkage_matrix: np.ndarray, n_clusters: int) -> np.ndarray:
+def perform_scalable_clustering(
+    data: np.ndarray,
+    linkage_method: str,
+    n_micro_clusters: int,
+    batch_size: int = 4096,
+    random_state: int = 0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Two-stage clustering for datasets too large for a full linkage.
+
+    Rows are first compressed into micro-clusters with mini-batch k-means,
+    then the hierarchical linkage is built on the micro-cluster centroids.
+    Memory is bounded by the number of micro-clusters, not rows.
+
+    Args:
+        data: Preprocessed feature matrix
+        linkage_method: Linkage used on the centroids
+        n_micro_clusters: Number of micro-clusters to build
+        batch_size: Mini-batch size for k-means
+        random_state: Seed for reproducible micro-clusters
+
+    Returns:
+        Tuple of (linkage matrix over centroids, micro-cluster index per row)
+    """
+    kmeans = MiniBatchKMeans(
+        n_clusters=n_micro_clusters,
+        batch_size=batch_size,
+        n_init=3,
+        random_state=random_state,
+    )
+    micro_labels = kmeans.fit_predict(data)
+
+    # Drop centroids that ended up without rows and renumber the rest.
+    used, micro_labels = np.unique(micro_labels, return_inverse=True)
+    centroids = kmeans.cluster_centers_[used]
+
+    linkage_matrix = linkage(centroids, method=linkage_method)
+    return linkage_matrix, micro_labels
+
+
+def get_flat_clusters(
+    linkage_matrix: np.ndarray,
+    n_clusters: int,
+    micro_labels: Optional[np.ndarray] = None,
+) -> np.ndarray:
     labels = fcluster(linkage_matrix, n_clusters, criterion="maxclust")
     labels = labels - 1
+    if micro_labels is not None:
+        labels = labels[micro_labels]
     return labels
 
 
@@ -27,8 +78,11 @@ def generate_dendrogram(
     dataset_id: int,
     linkage_method: str,
     max_display: int = 50,
-) -> plt.Figure:
-    fig, ax = plt.subplots(figsize=(14, 8))
+) -> Figure:
+    # A standalone Figure is never registered with pyplot, so it is safe to
+    # render from any thread and is freed once the caller drops it.
+    fig = Figure(figsize=(14, 8))
+    ax = fig.add_subplot()
 
     dendrogram(
         linkage_matrix,
@@ -50,78 +104,175 @@ def generate_dendrogram(
     ax.set_ylabel("Distance", fontsize=11)
     ax.tick_params(axis="both", which="major", labelsize=9)
 
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
 
+def resolve_scatter_mode(mode: str, n_points: int) -> str:
+    """Pick ``points`` or ``binned`` rendering for ``mode="auto"``."""
+    if mode == "auto":
+        return "binned" if n_points > settings.SCATTER_BINNED_THRESHOLD else "points"
+    return mode
+
+
+def downsample_per_cluster(
+    labels: np.ndarray, max_points: int, random_state: int = 0
+) -> np.ndarray:
+    """
+    Pick at most ``max_points`` row indices, stratified by cluster.
+
+    Each cluster keeps a share proportional to its size, so relative
+    densities survive, plus a small floor so small clusters stay visible.
+    Rows are drawn uniformly within each cluster.
+
+    Returns:
+        Sorted indices into ``labels``
+    """
+    n_points = len(labels)
+    if n_points <= max_points:
+        return np.arange(n_points)
+
+    unique, inverse, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+    floor = np.minimum(sizes, max(1, min(50, max_points // (2 * len(unique)))))
+    remaining = max(0, max_points - int(floor.sum()))
+    spare = sizes - floor
+    allocation = floor + np.floor(remaining * spare / max(1, spare.sum())).astype(int)
+
+    rng = np.random.default_rng(random_state)
+    order = np.argsort(inverse, kind="stable")
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    picked = [
+        rng.choice(order[start:start + size], size=count, replace=False)
+        for start, size, count in zip(starts, sizes, allocation)
+    ]
+    return np.sort(np.concatenate(picked))
+
+
+def _cluster_colors(n_clusters: int) -> np.ndarray:
+    return matplotlib.colormaps["tab10"](np.linspace(0, 1, n_clusters))
+
+
+def _plot_points(ax, x_values, y_values, cluster_index, colors) -> None:
+    n_points = len(x_values)
+    ax.scatter(
+        x_values,
+        y_values,
+        c=colors[cluster_index],
+        alpha=0.6,
+        s=50 if n_points <= 2000 else max(4.0, 50 * 2000 / n_points),
+        edgecolors="black" if n_points <= 2000 else "none",
+        linewidths=0.5 if n_points <= 2000 else 0,
+        rasterized=n_points > 2000,
+    )
+
+
+def _plot_binned(ax, x_values, y_values, cluster_index, colors, bins: int) -> None:
+    """Draw a 2D histogram coloured by the dominant cluster of each bin."""
+    x_range = (x_values.min(), x_values.max())
+    y_range = (y_values.min(), y_values.max())
+
+    def bin_index(values, lower, upper):
+        span = upper - lower if upper > lower else 1.0
+        return np.clip(((values - lower) / span * bins).astype(int), 0, bins - 1)
+
+    cell = bin_index(y_values, *y_range) * bins + bin_index(x_values, *x_range)
+    n_clusters = len(colors)
+    counts = np.bincount(
+        cell * n_clusters + cluster_index, minlength=bins * bins * n_clusters
+    ).reshape(bins, bins, n_clusters)
+
+    totals = counts.sum(axis=2)
+    image = colors[counts.argmax(axis=2)].copy()
+    scale = np.log1p(totals) / np.log1p(totals.max())
+    image[..., 3] = np.where(totals > 0, 0.25 + 0.75 * scale, 0.0)
+
+    ax.imshow(
+        image,
+        origin="lower",
+        extent=[*x_range, *y_range],
+        aspect="auto",
+        interpolation="nearest",
+    )
+
+
 def generate_scatter_plot(
-    assignments: list,
+    x_values: np.ndarray,
+    y_values: np.ndarray,
+    labels: np.ndarray,
     x_feature: str,
     y_feature: str,
     run_id: int,
-) -> plt.Figure:
-    """Generate scatter plot visualization for cluster assignments."""
-    if not assignments:
+    mode: str = "auto",
+    max_points: Optional[int] = None,
+) -> Figure:
+    """
+    Generate scatter plot visualization for cluster assignments.
+
+    Args:
+        x_values: Values of the x feature, one per row
+        y_values: Values of the y feature, one per row
+        labels: Cluster label per row
+        x_feature: Name of the x feature
+        y_feature: Name of the y feature
+        run_id: Clustering run shown in the title
+        mode: ``points`` (downsampled markers), ``binned`` (2D histogram
+            coloured by dominant cluster) or ``auto``
+        max_points: Marker budget for ``points`` mode
+
+    Returns:
+        The rendered figure
+    """
+    if len(labels) == 0:
         raise ValueError("No assignments provided")
-    
-    # Extract data
-    data_points = []
-    cluster_labels = []
-    
-    for assignment in assignments:
-        payload = assignment.payload if assignment.payload else {}
-        cluster_label = assignment.cluster_label
-        
-        if payload and x_feature in payload and y_feature in payload:
-            try:
-                x_val = float(payload[x_feature])
-                y_val = float(payload[y_feature])
-                data_points.append([x_val, y_val])
-                cluster_labels.append(cluster_label)
-            except (ValueError, TypeError):
-                continue
-    
-    if not data_points:
+
+    x_values = np.asarray(x_values, dtype=float)
+    y_values = np.asarray(y_values, dtype=float)
+    labels = np.asarray(labels)
+
+    valid = np.isfinite(x_values) & np.isfinite(y_values)
+    if not valid.any():
         raise ValueError(f"Features {x_feature} and/or {y_feature} not found or not numeric")
-    
-    data_array = np.array(data_points)
-    unique_clusters = sorted(set(cluster_labels))
-    
-    fig, ax = plt.subplots(figsize=(12, 8))
-    
-    colors = plt.cm.tab10(np.linspace(0, 1, len(unique_clusters)))
-    
-    for i, cluster_id in enumerate(unique_clusters):
-        mask = np.array(cluster_labels) == cluster_id
-        ax.scatter(
-            data_array[mask, 0],
-            data_array[mask, 1],
-            c=[colors[i]],
-            label=f'Cluster {cluster_id + 1}',
-            alpha=0.6,
-            s=50,
-            edgecolors='black',
-            linewidth=0.5
-        )
-    
+
+    x_values, y_values, labels = x_values[valid], y_values[valid], labels[valid]
+    unique_clusters, cluster_index = np.unique(labels, return_inverse=True)
+    colors = _cluster_colors(len(unique_clusters))
+    n_points = len(labels)
+    mode = resolve_scatter_mode(mode, n_points)
+
+    fig = Figure(figsize=(12, 8))
+    ax = fig.add_subplot()
+
+    if mode == "binned":
+        _plot_binned(ax, x_values, y_values, cluster_index, colors, settings.SCATTER_BINS)
+        shown = f"{n_points:,} points, binned"
+    else:
+        keep = downsample_per_cluster(labels, max_points or settings.SCATTER_MAX_POINTS)
+        _plot_points(ax, x_values[keep], y_values[keep], cluster_index[keep], colors)
+        shown = f"{len(keep):,} of {n_points:,} points"
+
+    handles = [
+        Patch(facecolor=colors[i], label=f'Cluster {cluster_id + 1}')
+        for i, cluster_id in enumerate(unique_clusters)
+    ]
+
     ax.set_xlabel(x_feature, fontsize=12, fontweight='bold')
     ax.set_ylabel(y_feature, fontsize=12, fontweight='bold')
     ax.set_title(
-        f'Cluster Scatter Plot\nRun #{run_id} | X: {x_feature} vs Y: {y_feature}',
+        f'Cluster Scatter Plot\nRun #{run_id} | X: {x_feature} vs Y: {y_feature} | {shown}',
         fontsize=14,
         fontweight='bold'
     )
-    ax.legend(loc='best', framealpha=0.9)
+    ax.legend(handles=handles, loc='best', framealpha=0.9)
     ax.grid(True, alpha=0.3, linestyle='--')
-    
-    plt.tight_layout()
+
+    fig.tight_layout()
     return fig
 
 
 def generate_distribution_chart(
     cluster_sizes: dict,
     run_id: int,
-) -> plt.Figure:
+) -> Figure:
     """Generate distribution chart (pie and bar) for cluster sizes."""
     if not cluster_sizes:
         raise ValueError("No cluster sizes provided")
@@ -131,9 +282,10 @@ def generate_distribution_chart(
     sizes = [cluster_sizes[str(k)] for k in clusters]
     labels = [f'Cluster {k + 1}' for k in clusters]
     
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
+    fig = Figure(figsize=(14, 6))
+    ax1, ax2 = fig.subplots(1, 2)
     
-    colors = plt.cm.tab10(np.linspace(0, 1, len(clusters)))
+    colors = _cluster_colors(len(clusters))
     
     # Pie chart
     ax1.pie(
@@ -162,6 +314,6 @@ def generate_distribution_chart(
     fig.suptitle(f'Cluster Distribution Analysis - Run #{run_id}', 
                  fontsize=14, fontweight='bold', y=1.02)
     
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
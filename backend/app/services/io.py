@@ -1,61 +1,517 @@
+import hashlib
+import threading
 import uuid
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-from typing import BinaryIO
+from typing import Any, BinaryIO, Dict, Hashable, Iterator, List, Optional, Tuple
 
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 
 from app.core.config import settings
 
+# Numeric types a CSV column is widened through while it is profiled.
+# Booleans only combine with booleans.
+_NUMERIC_TYPES = [pa.int64(), pa.float64()]
 
-def save_uploaded_file(file: BinaryIO, filename: str) -> str:
-    upload_dir = settings.upload_path
-    unique_name = f"{uuid.uuid4().hex}_{filename}"
-    file_path = upload_dir / unique_name
 
-    with open(file_path, "wb") as buffer:
-        content = file.read()
-        buffer.write(content)
+class FileTooLargeError(ValueError):
+    """Raised when an upload exceeds ``UPLOAD_MAX_BYTES``."""
 
-    return str(file_path)
 
+def parquet_path_for(csv_path: str) -> Path:
+    return Path(csv_path).with_suffix(".parquet")
 
-def load_csv(file_path: str) -> pd.DataFrame:
+
+def _widen_type(values: pa.Array, current: pa.DataType) -> pa.DataType:
+    if pa.types.is_string(current) or values.null_count == len(values):
+        return current
+
+    if pa.types.is_boolean(current):
+        candidates = [pa.bool_()]
+    elif pa.types.is_null(current):
+        candidates = _NUMERIC_TYPES + [pa.bool_()]
+    else:
+        candidates = _NUMERIC_TYPES[_NUMERIC_TYPES.index(current):]
+
+    for candidate in candidates:
+        try:
+            pc.cast(values, candidate)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            continue
+        return candidate
+
+    return pa.string()
+
+
+def _record_ends(buffer: bytes) -> np.ndarray:
+    """Offsets of the newlines in ``buffer`` that are not inside a quoted field."""
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    # Only the parity of the running quote count matters, so uint8 may wrap.
+    outside_quotes = (np.cumsum(data == ord('"'), dtype=np.uint8) & 1) == 0
+    return np.flatnonzero((data == ord("\n")) & outside_quotes)
+
+
+class CsvProfiler:
+    """
+    Profile a CSV file from a stream of byte chunks.
+
+    Chunks are buffered until ``block_size`` bytes are pending, then cut at
+    the last record boundary (a newline outside quotes) and parsed with Arrow
+    as text. Each column keeps the narrowest of int64, float64, bool or
+    string that fits all of its values, so dates stay strings and empty
+    columns become float64, as with ``pd.read_csv``. Malformed records raise
+    ``ValueError``.
+    """
+
+    def __init__(self, block_size: int = 8 * 1024 * 1024):
+        self.block_size = block_size
+        self.columns: Optional[List[str]] = None
+        self.n_rows = 0
+        self.size_bytes = 0
+        self._types: List[pa.DataType] = []
+        self._null_counts: List[int] = []
+        self._pending: List[bytes] = []
+        self._pending_bytes = 0
+
+    def feed(self, chunk: bytes) -> None:
+        self._pending.append(chunk)
+        self._pending_bytes += len(chunk)
+        self.size_bytes += len(chunk)
+        if self._pending_bytes >= self.block_size:
+            self._parse_pending(final=False)
+
+    def finish(self) -> "CsvProfiler":
+        self._parse_pending(final=True)
+        if self.columns is None:
+            raise ValueError("CSV file has no header row")
+        return self
+
+    def _parse_pending(self, final: bool) -> None:
+        buffer = b"".join(self._pending)
+        if final:
+            block, rest = buffer, b""
+        else:
+            ends = _record_ends(buffer)
+            if not len(ends):
+                return
+            block, rest = buffer[:ends[-1] + 1], buffer[ends[-1] + 1:]
+
+        self._pending = [rest] if rest else []
+        self._pending_bytes = len(rest)
+
+        if self.columns is None:
+            ends = _record_ends(block)
+            header_end = ends[0] + 1 if len(ends) else len(block)
+            self._parse_header(block[:header_end])
+            block = block[header_end:]
+
+        if block.strip():
+            self._parse_records(block)
+
+    def _parse_header(self, header: bytes) -> None:
+        if not header.strip():
+            return
+        try:
+            table = pa_csv.read_csv(pa.py_buffer(header))
+        except pa.ArrowException as e:
+            raise ValueError(f"Invalid CSV header: {e}") from e
+
+        self.columns = table.column_names
+        self._types = [pa.null()] * len(self.columns)
+        self._null_counts = [0] * len(self.columns)
+
+    def _parse_records(self, block: bytes) -> None:
+        if self.columns is None:
+            raise ValueError("CSV file has no header row")
+        try:
+            table = pa_csv.read_csv(
+                pa.py_buffer(block),
+                read_options=pa_csv.ReadOptions(column_names=self.columns),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={name: pa.string() for name in self.columns},
+                    strings_can_be_null=True,
+                ),
+            )
+        except pa.ArrowException as e:
+            raise ValueError(f"Invalid CSV near row {self.n_rows + 1}: {e}") from e
+
+        self.n_rows += table.num_rows
+        for i, column in enumerate(table.columns):
+            self._null_counts[i] += column.null_count
+            self._types[i] = _widen_type(column, self._types[i])
+
+    def schema(self) -> pa.Schema:
+        return pa.schema(
+            [
+                pa.field(name, pa.float64() if pa.types.is_null(dtype) else dtype)
+                for name, dtype in zip(self.columns, self._types)
+            ]
+        )
+
+    def profile(self) -> Dict[str, Any]:
+        return {
+            "n_rows": self.n_rows,
+            "n_columns": len(self.columns),
+            "size_bytes": self.size_bytes,
+            "columns": {
+                field.name: {"dtype": str(field.type), "null_count": null_count}
+                for field, null_count in zip(self.schema(), self._null_counts)
+            },
+        }
+
+
+def save_uploaded_file(
+    file: BinaryIO,
+    filename: str,
+    max_bytes: Optional[int] = None,
+) -> Tuple[str, str, CsvProfiler]:
+    """
+    Stream an upload to disk in fixed-size chunks, hashing and profiling it.
+
+    Args:
+        file: Readable binary file object of the upload
+        filename: Original file name
+        max_bytes: Size limit (default: ``UPLOAD_MAX_BYTES``)
+
+    Returns:
+        Tuple of (saved path, SHA-256 of the contents, finished profiler)
+
+    Raises:
+        FileTooLargeError: If the upload exceeds ``max_bytes``
+        ValueError: If the upload is not a well-formed CSV file
+    """
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    unique_name = f"{uuid.uuid4().hex}_{Path(filename).name}"
+    file_path = settings.upload_path / unique_name
+
+    digest = hashlib.sha256()
+    profiler = CsvProfiler()
+
+    try:
+        with open(file_path, "wb") as buffer:
+            for chunk in iter(lambda: file.read(settings.UPLOAD_CHUNK_SIZE), b""):
+                if profiler.size_bytes + len(chunk) > max_bytes:
+                    raise FileTooLargeError(f"File exceeds the {max_bytes} byte upload limit")
+                if b"\0" in chunk:
+                    raise ValueError("File is not a text CSV file")
+                buffer.write(chunk)
+                digest.update(chunk)
+                profiler.feed(chunk)
+        profiler.finish()
+    except BaseException:
+        file_path.unlink(missing_ok=True)
+        raise
+
+    return str(file_path), digest.hexdigest(), profiler
+
+
+def _open_csv(csv_path: Path, column_types: Optional[Dict[str, pa.DataType]] = None):
+    return pa_csv.open_csv(
+        csv_path,
+        convert_options=pa_csv.ConvertOptions(
+            column_types=column_types, strings_can_be_null=True
+        ),
+    )
+
+
+def infer_csv_schema(csv_path: str) -> pa.Schema:
+    """Infer the column types of a whole CSV file; see ``CsvProfiler``."""
+    profiler = CsvProfiler()
+    with open(csv_path, "rb") as f:
+        for chunk in iter(lambda: f.read(settings.UPLOAD_CHUNK_SIZE), b""):
+            profiler.feed(chunk)
+    return profiler.finish().schema()
+
+
+def convert_to_parquet(
+    csv_path: str, schema: Optional[pa.Schema] = None
+) -> Tuple[str, Dict[str, str]]:
+    """
+    Convert an uploaded CSV file into a typed Parquet file next to it.
+
+    The CSV is streamed, so memory use does not grow with the file size.
+    Pass the ``schema`` from the upload's profile to skip inferring it again.
+
+    Returns:
+        Tuple of (Parquet path, column name to Arrow type name)
+
+    Raises:
+        ValueError: If the CSV cannot be parsed
+    """
+    path = Path(csv_path)
+    output_path = parquet_path_for(csv_path)
+    tmp_path = output_path.with_name(f".{output_path.name}.{uuid.uuid4().hex}.tmp")
+
+    try:
+        schema = schema or infer_csv_schema(csv_path)
+        reader = _open_csv(path, dict(zip(schema.names, schema.types)))
+        with pq.ParquetWriter(tmp_path, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+        tmp_path.replace(output_path)
+    except pa.ArrowException as e:
+        raise ValueError(f"Could not parse CSV file: {e}") from e
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    return str(output_path), {field.name: str(field.type) for field in schema}
+
+
+class FrameCache:
+    """In-process LRU of loaded DataFrames, bounded by their memory footprint."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._frames: "OrderedDict[Hashable, Tuple[pd.DataFrame, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[pd.DataFrame]:
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is None:
+                return None
+            self._frames.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, frame: pd.DataFrame) -> None:
+        size = int(frame.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._frames:
+                self.nbytes -= self._frames.pop(key)[1]
+            self._frames[key] = (frame, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._frames.popitem(last=False)
+                self.nbytes -= evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._frames.clear()
+            self.nbytes = 0
+
+
+frame_cache = FrameCache(settings.FRAME_CACHE_MAX_BYTES)
+
+
+def _is_parquet(path: Path) -> bool:
+    return path.suffix == ".parquet"
+
+
+def table_to_frame(table: pa.Table) -> pd.DataFrame:
+    """Convert an Arrow table to pandas with missing values as ``read_csv`` yields them."""
+    df = table.to_pandas()
+    # Arrow yields None for missing strings where read_csv yields NaN.
+    for field in table.schema:
+        if pa.types.is_string(field.type) and table.column(field.name).null_count:
+            df[field.name] = df[field.name].fillna(np.nan)
+    return df
+
+
+def _read_frame(path: Path, columns: Optional[List[str]]) -> pd.DataFrame:
+    if _is_parquet(path):
+        return table_to_frame(pq.read_table(path, columns=columns, memory_map=True))
+    return load_csv(str(path), columns=columns)
+
+
+def load_frame(file_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Load a dataset file (Parquet or CSV) through the in-process frame cache.
+
+    Cached frames are shared, so callers get a shallow copy and must not
+    modify column values in place.
+
+    Args:
+        file_path: Parquet or CSV file of the dataset
+        columns: Columns to load, in this order (all columns if omitted)
+
+    Returns:
+        The dataset rows
+    """
+    path = Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"Dataset file not found: {file_path}")
+
+    stat = path.stat()
+    version = (str(path), stat.st_size, stat.st_mtime_ns)
+
+    full = frame_cache.get((version, None))
+    if full is not None:
+        frame = full if columns is None else full[columns]
+        return frame.copy(deep=False)
+
+    key = (version, tuple(columns) if columns is not None else None)
+    frame = frame_cache.get(key)
+    if frame is None:
+        frame = _read_frame(path, columns)
+        frame_cache.put(key, frame)
+
+    return frame.copy(deep=False)
+
+
+def iter_frame_chunks(
+    file_path: str,
+    columns: Optional[List[str]] = None,
+    chunk_size: int = 10000,
+    dtype: Optional[Dict[str, Any]] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a dataset file (Parquet or CSV) in row chunks of at most ``chunk_size``.
+
+    ``dtype`` fixes the types of CSV columns, which ``read_csv`` would
+    otherwise infer per chunk; Parquet columns keep their stored types.
+    """
+    path = Path(file_path)
+    if not _is_parquet(path):
+        yield from iter_csv_chunks(
+            file_path, columns=columns, chunk_size=chunk_size, dtype=dtype
+        )
+        return
+
+    if not path.exists():
+        raise FileNotFoundError(f"Dataset file not found: {file_path}")
+
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+        yield table_to_frame(pa.Table.from_batches([batch]))
+
+
+def iter_frame_chunks_from(
+    file_path: str,
+    start_row: int,
+    columns: Optional[List[str]] = None,
+    chunk_size: int = 10000,
+) -> Iterator[Tuple[int, pd.DataFrame]]:
+    """
+    Yield ``(offset, rows)`` chunks of a dataset file, beginning near ``start_row``.
+
+    Parquet files are opened at the row group containing ``start_row``,
+    found from the row counts in the file metadata, so earlier row groups
+    are never read. CSV files have no such index and are read from the top,
+    skipping the chunks before ``start_row``.
+
+    Args:
+        file_path: Path of the dataset file
+        start_row: Index of the first row the caller needs
+        columns: Columns to read (all columns if omitted)
+        chunk_size: Maximum rows per chunk
+
+    Returns:
+        Iterator of (offset of the chunk's first row, rows), in row order
+    """
+    path = Path(file_path)
+    if not _is_parquet(path):
+        offset = 0
+        for chunk in iter_csv_chunks(file_path, columns=columns, chunk_size=chunk_size):
+            if offset + len(chunk) > start_row:
+                yield offset, chunk
+            offset += len(chunk)
+        return
+
+    if not path.exists():
+        raise FileNotFoundError(f"Dataset file not found: {file_path}")
+
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    metadata = parquet_file.metadata
+    offset = 0
+    first_group = metadata.num_row_groups
+    for i in range(metadata.num_row_groups):
+        group_rows = metadata.row_group(i).num_rows
+        if offset + group_rows > start_row:
+            first_group = i
+            break
+        offset += group_rows
+
+    row_groups = range(first_group, metadata.num_row_groups)
+    for batch in parquet_file.iter_batches(
+        batch_size=chunk_size, row_groups=row_groups, columns=columns
+    ):
+        yield offset, table_to_frame(pa.Table.from_batches([batch]))
+        offset += batch.num_rows
+
+
+def dataset_row_count(file_path: str) -> Optional[int]:
+    """Row count from a Parquet file's metadata; ``None`` for CSV files."""
+    path = Path(file_path)
+    if not _is_parquet(path):
+        return None
+    return pq.ParquetFile(path).metadata.num_rows
+
+
+def file_digest(file_path: str) -> str:
+    """Return the SHA-256 of a file's contents, memoized per size and mtime."""
     path = Path(file_path)
     if not path.exists():
         raise FileNotFoundError(f"CSV file not found: {file_path}")
 
-    df = pd.read_csv(path)
-    return df
+    stat = path.stat()
+    return _file_digest(str(file_path), stat.st_size, stat.st_mtime_ns)
+
+
+@lru_cache(maxsize=256)
+def _file_digest(file_path: str, size: int, mtime_ns: int) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
 
-def save_dendrogram(fig, run_id: int) -> str:
-    output_dir = settings.output_path
-    filename = f"dendrogram_run_{run_id}.png"
-    file_path = output_dir / filename
+def load_csv(file_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    path = Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"CSV file not found: {file_path}")
 
-    fig.savefig(file_path, dpi=150, bbox_inches="tight", facecolor="white")
+    df = pd.read_csv(path, usecols=columns)
+    if columns is not None:
+        df = df[columns]
+    return df
 
-    return str(file_path)
 
+def read_columns(file_path: str) -> List[str]:
+    """Return the column names of a dataset without reading its rows."""
+    path = Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"Dataset file not found: {file_path}")
 
-def save_scatter_plot(fig, run_id: int) -> str:
-    output_dir = settings.output_path
-    filename = f"scatter_plot_run_{run_id}.png"
-    file_path = output_dir / filename
+    if _is_parquet(path):
+        return pq.read_schema(path).names
+    return pd.read_csv(path, nrows=0).columns.tolist()
 
-    fig.savefig(file_path, dpi=150, bbox_inches="tight", facecolor="white")
-    plt.close(fig)
 
-    return str(file_path)
+def iter_csv_chunks(
+    file_path: str,
+    columns: Optional[List[str]] = None,
+    chunk_size: int = 10000,
+    dtype: Optional[Dict[str, Any]] = None,
+) -> Iterator[pd.DataFrame]:
+    """Read a CSV file in fixed-size row chunks."""
+    path = Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"CSV file not found: {file_path}")
 
+    with pd.read_csv(path, usecols=columns, chunksize=chunk_size, dtype=dtype) as reader:
+        for chunk in reader:
+            yield chunk[columns] if columns is not None else chunk
 
-def save_distribution_chart(fig, run_id: int) -> str:
-    output_dir = settings.output_path
-    filename = f"distribution_run_{run_id}.png"
-    file_path = output_dir / filename
 
-    fig.savefig(file_path, dpi=150, bbox_inches="tight", facecolor="white")
-    plt.close(fig)
+def frame_to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Convert a DataFrame to JSON-safe row dicts, one column at a time."""
+    names = [str(col) for col in df.columns]
+    columns = []
+    for col in df.columns:
+        series = df[col]
+        if series.hasnans:
+            series = series.astype(object).where(series.notna(), None)
+        columns.append(series.tolist())
 
-    return str(file_path)
+    return [dict(zip(names, row)) for row in zip(*columns)]
@@ -0,0 +1,179 @@
+"""Background job execution for CPU-bound clustering work.
+
+The sklearn/scipy pipeline runs in a process pool so the event loop stays
+responsive during a fit. Job state is kept in an in-memory registry, which
+assumes a single API process; progress written by pool workers goes through
+a shared manager dict.
+"""
+import asyncio
+import multiprocessing
+import os
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Set
+
+from app.core import profiling
+from app.core.config import settings
+from app.schemas.clustering import JobStatus
+
+_executor: Optional[ProcessPoolExecutor] = None
+_manager = None
+_progress: Optional[Dict[str, Any]] = None
+_jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_tasks: Set[asyncio.Task] = set()
+
+
+def _threads_per_worker() -> int:
+    if settings.CLUSTERING_THREADS_PER_WORKER > 0:
+        return settings.CLUSTERING_THREADS_PER_WORKER
+    return max(1, (os.cpu_count() or 1) // max(1, settings.CLUSTERING_MAX_WORKERS))
+
+
+def _init_worker(threads: int) -> None:
+    # Cap BLAS/OpenMP threads so parallel fits don't oversubscribe the cores.
+    from threadpoolctl import threadpool_limits
+
+    threadpool_limits(limits=threads)
+
+
+def start_workers() -> None:
+    """Start the clustering process pool and the shared progress store."""
+    global _executor, _manager, _progress
+
+    if _executor is not None:
+        return
+
+    context = multiprocessing.get_context("spawn")
+    _manager = context.Manager()
+    _progress = _manager.dict()
+    _executor = ProcessPoolExecutor(
+        max_workers=max(1, settings.CLUSTERING_MAX_WORKERS),
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(_threads_per_worker(),),
+    )
+
+
+def shutdown_workers() -> None:
+    """Stop the process pool, cancelling work that has not started yet."""
+    global _executor, _manager, _progress
+
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+    if _manager is not None:
+        _manager.shutdown()
+        _manager = None
+        _progress = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    if _executor is None:
+        start_workers()
+    return _executor
+
+
+async def run_in_worker(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a picklable, module-level function in the clustering process pool.
+
+    When the calling request is being profiled, the call is profiled in the
+    worker too and its stats are added to the request's profile.
+    """
+    loop = asyncio.get_running_loop()
+    call = partial(func, *args, **kwargs)
+    capture = profiling.active_capture()
+    if capture is None:
+        return await loop.run_in_executor(get_executor(), call)
+
+    result, stats = await loop.run_in_executor(
+        get_executor(), partial(profiling.profile_call, call)
+    )
+    capture.add_worker_stats(stats)
+    return result
+
+
+def report_progress(store: Dict[str, Any], job_id: str, stage: str, fraction: float) -> None:
+    """Record job progress; safe to call from pool workers."""
+    store[job_id] = {"stage": stage, "progress": round(float(fraction), 3)}
+
+
+def progress_callback(job_id: Optional[str]) -> Optional[Callable[[str, float], None]]:
+    """Return a picklable progress callback for ``job_id``, if it is a tracked job."""
+    if job_id is None:
+        return None
+    get_executor()
+    return partial(report_progress, _progress, job_id)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def create_job(kind: str) -> Dict[str, Any]:
+    """Register a new queued job and return its state."""
+    job_id = uuid.uuid4().hex
+    now = _now()
+    job = {
+        "job_id": job_id,
+        "kind": kind,
+        "status": JobStatus.QUEUED,
+        "run_id": None,
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+    _jobs[job_id] = job
+    report_progress(_progress_store(), job_id, "queued", 0.0)
+    _trim_history()
+    return get_job(job_id)
+
+
+def update_job(job_id: str, **fields: Any) -> None:
+    job = _jobs.get(job_id)
+    if job is None:
+        return
+    job.update(fields)
+    job["updated_at"] = _now()
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    job = _jobs.get(job_id)
+    if job is None:
+        return None
+
+    state = dict(job)
+    state.update(_progress_store().get(job_id, {"stage": None, "progress": 0.0}))
+    return state
+
+
+def list_jobs() -> List[Dict[str, Any]]:
+    return [get_job(job_id) for job_id in reversed(_jobs)]
+
+
+def schedule(coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+    """Run a coroutine in the background, keeping a reference until it finishes."""
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+def _progress_store() -> Dict[str, Any]:
+    get_executor()
+    return _progress
+
+
+def _trim_history() -> None:
+    finished = (JobStatus.SUCCEEDED, JobStatus.FAILED)
+    excess = len(_jobs) - settings.JOB_HISTORY_LIMIT
+    for job_id in [j for j, job in _jobs.items() if job["status"] in finished]:
+        if excess <= 0:
+            break
+        del _jobs[job_id]
+        _progress_store().pop(job_id, None)
+        excess -= 1
@@ -1,17 +1,300 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
-from sklearn.metrics import silhouette_score
+from scipy import sparse
+from sklearn.metrics import pairwise_distances
+
+from app.core.config import settings
+
+# Two-sided 95% normal quantile used for the sampled silhouette interval.
+_Z_95 = 1.959964
+
+
+def _block_rows(n_samples: int, working_memory_mb: int) -> int:
+    bytes_per_row = max(1, n_samples) * 8
+    return max(1, (working_memory_mb * 1024 * 1024) // bytes_per_row)
+
+
+def _membership(label_sets: np.ndarray) -> Tuple[sparse.csr_matrix, list]:
+    """One-hot membership of every label set, stacked column-wise."""
+    n_samples = label_sets.shape[1]
+    columns = []
+    groups = []
+    offset = 0
+    for labels in label_sets:
+        _, inverse = np.unique(labels, return_inverse=True)
+        counts = np.bincount(inverse)
+        columns.append(inverse + offset)
+        groups.append((offset, inverse, counts))
+        offset += len(counts)
+
+    membership = sparse.csr_matrix(
+        (
+            np.ones(n_samples * len(label_sets)),
+            (np.tile(np.arange(n_samples), len(label_sets)), np.concatenate(columns)),
+        ),
+        shape=(n_samples, offset),
+    )
+    return membership, groups
+
+
+def silhouette_values(
+    data: np.ndarray,
+    labels: np.ndarray,
+    rows: Optional[np.ndarray] = None,
+    working_memory_mb: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Exact silhouette coefficients for ``rows``, computed in distance blocks.
+
+    Distances from a block of rows to every sample are reduced to per-cluster
+    sums straight away, so at most ``working_memory_mb`` of the distance
+    matrix exists at any time. ``labels`` may hold several label sets as
+    columns of an ``(n_samples, n_sets)`` array; each distance block is then
+    shared by all of them.
+
+    Args:
+        data: Feature matrix (dense or sparse)
+        labels: Cluster label per sample, or one column per label set
+        rows: Indices of the samples to score (all samples if omitted)
+        working_memory_mb: Memory budget for one distance block
+
+    Returns:
+        Silhouette coefficient per requested row (one column per label set
+        when ``labels`` is two-dimensional)
+    """
+    working_memory_mb = working_memory_mb or settings.SILHOUETTE_WORKING_MEMORY_MB
+    n_samples = data.shape[0]
+    rows = np.arange(n_samples) if rows is None else np.asarray(rows)
+    labels = np.asarray(labels)
+    label_sets = labels.T if labels.ndim == 2 else labels[None, :]
+
+    membership, groups = _membership(label_sets)
+    membership_t = membership.T.tocsr()
+
+    values = np.empty((len(rows), len(groups)))
+    block = _block_rows(n_samples, working_memory_mb)
+
+    for start in range(0, len(rows), block):
+        idx = rows[start:start + block]
+        distances = pairwise_distances(data[idx], data)
+        all_sums = np.asarray(membership_t @ distances.T).T
+        positions = np.arange(len(idx))
+
+        for j, (offset, inverse, counts) in enumerate(groups):
+            cluster_sums = all_sums[:, offset:offset + len(counts)]
+            own = inverse[idx]
+            own_counts = counts[own]
+
+            a = cluster_sums[positions, own] / np.maximum(own_counts - 1, 1)
+            mean_other = cluster_sums / counts
+            mean_other[positions, own] = np.inf
+            b = mean_other.min(axis=1)
+
+            with np.errstate(invalid="ignore", divide="ignore"):
+                scores = (b - a) / np.maximum(a, b)
+            scores[own_counts == 1] = 0.0
+            values[start:start + len(idx), j] = np.nan_to_num(scores)
+
+    return values if labels.ndim == 2 else values[:, 0]
+
+
+def _stratified_sample(
+    strata: np.ndarray, sample_size: int, rng: np.random.Generator
+) -> Dict[int, np.ndarray]:
+    unique, counts = np.unique(strata, return_counts=True)
+    allocation = np.maximum(2, np.round(sample_size * counts / counts.sum()).astype(int))
+    allocation = np.minimum(allocation, counts)
+
+    return {
+        int(label): rng.choice(np.flatnonzero(strata == label), size=size, replace=False)
+        for label, size in zip(unique, allocation)
+    }
+
+
+def estimate_silhouettes(
+    data: np.ndarray,
+    label_sets: np.ndarray,
+    strata: Optional[np.ndarray] = None,
+    method: Optional[str] = None,
+    sample_size: Optional[int] = None,
+    random_state: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Compute silhouette scores for several label sets, exactly or from a sample.
+
+    The sampled estimate draws a stratified sample and scores it against
+    all samples, so each sampled coefficient is exact and the stratified
+    mean is an unbiased estimate of the full score with a 95% confidence
+    interval. One sample and one pass of distance blocks serve every label
+    set.
+
+    Args:
+        data: Feature matrix
+        label_sets: ``(n_samples, n_sets)`` array of cluster labels
+        strata: Labels to stratify the sample by (default: the last label set)
+        method: ``exact``, ``sampled`` or ``auto`` (default: ``SILHOUETTE_METHOD``)
+        sample_size: Target sample size for the sampled method
+        random_state: Seed for the sample
+
+    Returns:
+        One dictionary with ``score``, ``method``, ``sample_size`` and ``ci``
+        per label set
+    """
+    method = method or settings.SILHOUETTE_METHOD
+    sample_size = sample_size or settings.SILHOUETTE_SAMPLE_SIZE
+    random_state = settings.SILHOUETTE_RANDOM_STATE if random_state is None else random_state
+    label_sets = np.asarray(label_sets)
+    n_samples = data.shape[0]
+
+    if method == "auto":
+        method = "exact" if n_samples <= settings.SILHOUETTE_EXACT_MAX_ROWS else "sampled"
+    if method == "sampled" and sample_size >= n_samples:
+        method = "exact"
+
+    if method == "exact":
+        values = silhouette_values(data, label_sets)
+        return [
+            {"score": float(score), "method": "exact", "sample_size": int(n_samples), "ci": None}
+            for score in values.mean(axis=0)
+        ]
+
+    strata = label_sets[:, -1] if strata is None else np.asarray(strata)
+    rng = np.random.default_rng(random_state)
+    sample = _stratified_sample(strata, sample_size, rng)
+    rows = np.concatenate(list(sample.values()))
+    values = silhouette_values(data, label_sets, rows=rows)
+
+    estimate = np.zeros(label_sets.shape[1])
+    variance = np.zeros(label_sets.shape[1])
+    offset = 0
+    for label, members in sample.items():
+        stratum = values[offset:offset + len(members)]
+        offset += len(members)
+
+        population = int(np.count_nonzero(strata == label))
+        weight = population / n_samples
+        estimate += weight * stratum.mean(axis=0)
+        if len(members) > 1:
+            fpc = 1.0 - len(members) / population
+            variance += weight ** 2 * fpc * stratum.var(axis=0, ddof=1) / len(members)
+
+    margins = _Z_95 * np.sqrt(variance)
+    return [
+        {
+            "score": float(score),
+            "method": "sampled",
+            "sample_size": int(len(rows)),
+            "ci": [float(score - margin), float(score + margin)],
+        }
+        for score, margin in zip(estimate, margins)
+    ]
+
+
+def estimate_silhouette(
+    data: np.ndarray,
+    labels: np.ndarray,
+    method: Optional[str] = None,
+    sample_size: Optional[int] = None,
+    random_state: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Silhouette score of a single labelling; see ``estimate_silhouettes``."""
+    labels = np.asarray(labels)
+    return estimate_silhouettes(
+        data,
+        labels[:, None],
+        method=method,
+        sample_size=sample_size,
+        random_state=random_state,
+    )[0]
+
+
+def cluster_centroids(data: np.ndarray, labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mean of each cluster's rows.
+
+    Returns:
+        Tuple of (sorted cluster labels, one centroid row per label)
+    """
+    n_samples = data.shape[0]
+    unique, inverse = np.unique(labels, return_inverse=True)
+    counts = np.bincount(inverse)
+    membership = sparse.csr_matrix(
+        (np.ones(n_samples), (inverse, np.arange(n_samples))),
+        shape=(len(unique), n_samples),
+    )
+
+    sums = membership @ data
+    return unique, (sums.toarray() if sparse.issparse(sums) else sums) / counts[:, None]
+
+
+def cluster_dispersion_scores(data: np.ndarray, labels: np.ndarray) -> Dict[str, float]:
+    """
+    Calinski-Harabasz, Davies-Bouldin and inertia from per-cluster sums.
+
+    All three need only cluster centroids and each row's distance to its own
+    centroid, so they cost O(n * d) and work on sparse matrices too.
+    """
+    n_samples = data.shape[0]
+    _, inverse = np.unique(labels, return_inverse=True)
+    counts = np.bincount(inverse)
+    n_clusters = len(counts)
+    membership = sparse.csr_matrix(
+        (np.ones(n_samples), (inverse, np.arange(n_samples))),
+        shape=(n_clusters, n_samples),
+    )
+
+    sums = membership @ data
+    centroids = (sums.toarray() if sparse.issparse(sums) else sums) / counts[:, None]
+    row_norms = np.asarray(
+        data.multiply(data).sum(axis=1) if sparse.issparse(data) else (data ** 2).sum(axis=1)
+    ).ravel()
+    cross = np.asarray(data @ centroids.T)[np.arange(n_samples), inverse]
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    sq_dist = np.maximum(row_norms - 2 * cross + centroid_norms[inverse], 0.0)
+
+    inertia = float(sq_dist.sum())
+    overall = np.asarray(data.mean(axis=0)).ravel()
+    between = float((counts * ((centroids - overall) ** 2).sum(axis=1)).sum())
+
+    if n_clusters < 2 or n_clusters >= n_samples:
+        calinski_harabasz = None
+        davies_bouldin = None
+    else:
+        if inertia == 0:
+            calinski_harabasz = 1.0
+        else:
+            dof = (n_samples - n_clusters) / (n_clusters - 1)
+            calinski_harabasz = float(between * dof / inertia)
+        scatter = np.bincount(inverse, weights=np.sqrt(sq_dist)) / counts
+        separation = pairwise_distances(centroids)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratios = (scatter[:, None] + scatter[None, :]) / separation
+        ratios[~np.isfinite(ratios)] = 0.0
+        np.fill_diagonal(ratios, 0.0)
+        davies_bouldin = float(ratios.max(axis=1).mean())
+
+    return {
+        "calinski_harabasz": calinski_harabasz,
+        "davies_bouldin": davies_bouldin,
+        "inertia": inertia,
+    }
 
 
 def calculate_silhouette(data: np.ndarray, labels: np.ndarray) -> Optional[float]:
+    result = calculate_silhouette_details(data, labels)
+    return result["score"] if result else None
+
+
+def calculate_silhouette_details(
+    data: np.ndarray, labels: np.ndarray
+) -> Optional[Dict[str, Any]]:
     unique_labels = np.unique(labels)
-    if len(unique_labels) < 2 or len(unique_labels) >= len(data):
+    if len(unique_labels) < 2 or len(unique_labels) >= data.shape[0]:
         return None
 
     try:
-        score = silhouette_score(data, labels)
-        return float(score)
+        return estimate_silhouette(data, labels)
     except Exception:
         return None
 
@@ -26,16 +309,20 @@ def compile_metrics(
     labels: np.ndarray,
     n_encoded_features: int,
 ) -> Dict[str, Any]:
-    silhouette = calculate_silhouette(data, labels)
+    silhouette = calculate_silhouette_details(data, labels)
     cluster_sizes = calculate_cluster_sizes(labels)
 
     metrics = {
         "n_samples": int(len(labels)),
         "n_clusters": int(len(np.unique(labels))),
         "n_encoded_features": n_encoded_features,
-        "silhouette_score": silhouette,
+        "silhouette_score": silhouette["score"] if silhouette else None,
         "cluster_sizes": cluster_sizes,
     }
 
-    return metrics
+    if silhouette:
+        metrics["silhouette_method"] = silhouette["method"]
+        metrics["silhouette_sample_size"] = silhouette["sample_size"]
+        metrics["silhouette_ci"] = silhouette["ci"]
 
+    return metrics
@@ -0,0 +1,539 @@
+"""CPU-bound clustering pipeline.
+
+Everything in this module is synchronous and free of database access so it
+can be shipped to the clustering worker pool (see ``app.services.jobs``).
+"""
+import pickle
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+from scipy import sparse
+
+from app.core.config import settings
+from app.core.telemetry import collect_stages, peak_rss_bytes, reset_peak_rss, stage
+from app.schemas.clustering import (
+    ClusteringMode,
+    ClusteringRequest,
+    LinkageTreeRequest,
+    SweepRequest,
+)
+from app.services.clustering import (
+    get_flat_clusters,
+    perform_hierarchical_clustering,
+    perform_scalable_clustering,
+)
+from app.services.artifacts import build_model_artifact
+from app.services.cache import DiskCache, content_key
+from app.services.io import file_digest, iter_frame_chunks, load_frame
+from app.services.metrics import (
+    calculate_cluster_sizes,
+    cluster_dispersion_scores,
+    compile_metrics,
+    estimate_silhouettes,
+)
+from app.services.preprocessing import (
+    apply_pca,
+    apply_preprocessing,
+    build_preprocessor,
+    categorical_encoding_info,
+    detect_feature_types,
+    encoded_matrix_info,
+    fit_incremental_pca,
+    fit_preprocessor_incremental,
+    get_feature_config,
+    transform_chunks,
+)
+
+ProgressCallback = Callable[[str, float], None]
+
+# Bump when the cached tree layout or the preprocessing it depends on changes.
+LINKAGE_CACHE_VERSION = 3
+
+
+def _report(progress: Optional[ProgressCallback], stage: str, fraction: float) -> None:
+    if progress is not None:
+        progress(stage, fraction)
+
+
+def resolve_clustering_mode(request: LinkageTreeRequest, n_samples: int) -> ClusteringMode:
+    """Pick exact or scalable clustering for a dataset of ``n_samples`` rows."""
+    mode = request.mode
+    if mode == ClusteringMode.AUTO:
+        exact = n_samples <= settings.SCALABLE_AUTO_THRESHOLD
+        mode = ClusteringMode.EXACT if exact else ClusteringMode.SCALABLE
+
+    # Micro-clustering only pays off when it actually compresses the data.
+    n_micro_clusters = request.n_micro_clusters or settings.SCALABLE_MICRO_CLUSTERS
+    if mode == ClusteringMode.SCALABLE and n_samples <= n_micro_clusters:
+        mode = ClusteringMode.EXACT
+
+    return mode
+
+
+def resolve_encoding(request: LinkageTreeRequest) -> Tuple[Optional[int], Optional[float]]:
+    """One-hot cardinality limits of a request, falling back to the settings."""
+    max_categories = request.max_categories or settings.ONEHOT_MAX_CATEGORIES or None
+    min_frequency = request.min_category_frequency
+    if min_frequency is None:
+        min_frequency = settings.ONEHOT_MIN_FREQUENCY
+    return max_categories, min_frequency or None
+
+
+def feature_dtype() -> type:
+    return np.float32 if settings.PREPROCESS_FLOAT32 else np.float64
+
+
+def linkage_cache() -> DiskCache:
+    return DiskCache(
+        settings.output_path / "linkage_cache",
+        max_bytes=settings.LINKAGE_CACHE_MAX_BYTES,
+        suffix=".joblib",
+    )
+
+
+def linkage_cache_key(
+    file_path: str, request: LinkageTreeRequest, content_hash: Optional[str] = None
+) -> str:
+    """
+    Key a linkage tree by dataset content and every setting it depends on.
+
+    ``content_hash`` is the upload hash stored on the dataset; the file is
+    only hashed here for datasets uploaded before it was recorded.
+    """
+    return content_key(
+        "linkage",
+        LINKAGE_CACHE_VERSION,
+        content_hash or file_digest(file_path),
+        request.linkage.value,
+        request.use_pca,
+        request.pca_components if request.use_pca else None,
+        request.mode.value,
+        request.n_micro_clusters or settings.SCALABLE_MICRO_CLUSTERS,
+        *resolve_encoding(request),
+        np.dtype(feature_dtype()).name,
+        request.out_of_core,
+    )
+
+
+def _feature_columns(frame) -> Tuple[List[str], List[str]]:
+    if frame is None or frame.empty:
+        raise ValueError("Dataset is empty")
+
+    numeric_cols, categorical_cols = detect_feature_types(frame)
+    if not numeric_cols and not categorical_cols:
+        raise ValueError("No valid features found in dataset")
+    return numeric_cols, categorical_cols
+
+
+def _scan_feature_columns(file_path: str, chunk_size: int) -> Tuple[List[str], List[str]]:
+    """
+    Type the feature columns of a dataset from all of its rows, chunk by chunk.
+
+    A CSV column can read as numbers in the first chunks and hold text
+    further down. Such a column is categorical, as it is when the whole file
+    is loaded at once, so it counts as numeric only if every chunk reads it
+    as numbers.
+    """
+    columns: List[str] = []
+    numeric, categorical = set(), set()
+    for chunk in iter_frame_chunks(file_path, chunk_size=chunk_size):
+        if chunk.empty:
+            continue
+        chunk_numeric, chunk_categorical = detect_feature_types(chunk)
+        if not columns:
+            columns = list(chunk.columns)
+            numeric = set(chunk_numeric)
+        numeric.intersection_update(chunk_numeric)
+        categorical.update(chunk_categorical)
+
+    if not columns:
+        raise ValueError("Dataset is empty")
+
+    numeric_cols = [col for col in columns if col in numeric - categorical]
+    categorical_cols = [col for col in columns if col in categorical]
+    if not numeric_cols and not categorical_cols:
+        raise ValueError("No valid features found in dataset")
+    return numeric_cols, categorical_cols
+
+
+def preprocess_in_memory(
+    file_path: str,
+    request: LinkageTreeRequest,
+    progress: Optional[ProgressCallback] = None,
+) -> Dict[str, Any]:
+    """
+    Load a whole dataset and encode it, with optional PCA.
+
+    Returns:
+        Dictionary with the clustering ``data``, the fitted ``preprocessor``
+        and ``pca``, the feature columns, ``pca_variance`` and ``encoding``
+        details for the feature config
+    """
+    _report(progress, "loading", 0.05)
+    with stage("load"):
+        df = load_frame(file_path)
+    numeric_cols, categorical_cols = _feature_columns(df)
+
+    _report(progress, "preprocessing", 0.2)
+    max_categories, min_frequency = resolve_encoding(request)
+    dtype = feature_dtype()
+    with stage("preprocess"):
+        preprocessor = build_preprocessor(
+            numeric_cols, categorical_cols, max_categories, min_frequency, dtype
+        )
+        data = apply_preprocessing(df, preprocessor, dtype)
+    del df
+    encoding = {
+        "max_categories": max_categories,
+        "min_category_frequency": min_frequency,
+        "categorical_encoding": categorical_encoding_info(preprocessor, categorical_cols),
+        "encoded_matrix": encoded_matrix_info(data),
+    }
+
+    pca = None
+    pca_variance = None
+    if request.use_pca and request.pca_components:
+        if request.pca_components < data.shape[1]:
+            with stage("pca"):
+                data, pca_variance, pca = apply_pca(data, request.pca_components)
+
+    return {
+        "data": data,
+        "preprocessor": preprocessor,
+        "pca": pca,
+        "numeric_cols": numeric_cols,
+        "categorical_cols": categorical_cols,
+        "pca_variance": pca_variance,
+        "encoding": encoding,
+    }
+
+
+def preprocess_out_of_core(
+    file_path: str,
+    request: LinkageTreeRequest,
+    progress: Optional[ProgressCallback] = None,
+) -> Dict[str, Any]:
+    """
+    Encode a dataset chunk by chunk, never loading it whole.
+
+    A first pass types the feature columns from every chunk. The scaler and
+    category vocabularies are then fitted in one pass and PCA with
+    ``IncrementalPCA`` in another. A last pass writes the encoded rows (or
+    their PCA projection) into the clustering matrix, which is then the only
+    full-size array in memory.
+
+    Returns:
+        Same dictionary as ``preprocess_in_memory``
+    """
+    chunk_size = settings.PREPROCESS_CHUNK_SIZE
+    _report(progress, "loading", 0.05)
+    numeric_cols, categorical_cols = _scan_feature_columns(file_path, chunk_size)
+
+    columns = numeric_cols + categorical_cols
+    # Read categories as text in every chunk, not as numbers in some of them.
+    dtype_by_column = {col: str for col in categorical_cols}
+
+    def chunks():
+        return iter_frame_chunks(
+            file_path, columns=columns, chunk_size=chunk_size, dtype=dtype_by_column
+        )
+
+    _report(progress, "preprocessing", 0.15)
+    max_categories, min_frequency = resolve_encoding(request)
+    dtype = feature_dtype()
+    with stage("preprocess"):
+        preprocessor, categorical_encoding, n_rows = fit_preprocessor_incremental(
+            chunks(), numeric_cols, categorical_cols, max_categories, min_frequency, dtype
+        )
+    n_encoded_features = len(numeric_cols) + sum(
+        info["encoded_columns"] for info in categorical_encoding.values()
+    )
+
+    pca = None
+    pca_variance = None
+    if request.use_pca and request.pca_components and (
+        request.pca_components < n_encoded_features
+    ):
+        _report(progress, "pca", 0.25)
+        n_components = min(request.pca_components, n_rows)
+        with stage("pca"):
+            pca = fit_incremental_pca(
+                transform_chunks(chunks(), preprocessor, dtype), n_components
+            )
+        pca_variance = float(np.sum(pca.explained_variance_ratio_))
+
+        _report(progress, "encoding", 0.35)
+        with stage("encode"):
+            data = np.empty((n_rows, n_components), dtype=dtype)
+            offset = 0
+            for batch in transform_chunks(chunks(), preprocessor, dtype):
+                data[offset:offset + batch.shape[0]] = pca.transform(batch.toarray())
+                offset += batch.shape[0]
+    else:
+        _report(progress, "encoding", 0.35)
+        with stage("encode"):
+            data = sparse.vstack(
+                list(transform_chunks(chunks(), preprocessor, dtype)), format="csr"
+            )
+            # Same rule as ColumnTransformer's default sparse_threshold.
+            if data.nnz >= 0.3 * n_rows * n_encoded_features:
+                data = data.toarray()
+
+    encoding = {
+        "max_categories": max_categories,
+        "min_category_frequency": min_frequency,
+        "categorical_encoding": categorical_encoding,
+        "encoded_matrix": encoded_matrix_info(data),
+        "out_of_core": {"chunk_size": chunk_size},
+    }
+
+    return {
+        "data": data,
+        "preprocessor": preprocessor,
+        "pca": pca,
+        "numeric_cols": numeric_cols,
+        "categorical_cols": categorical_cols,
+        "pca_variance": pca_variance,
+        "encoding": encoding,
+    }
+
+
+def fit_linkage(
+    file_path: str,
+    request: LinkageTreeRequest,
+    progress: Optional[ProgressCallback] = None,
+) -> Dict[str, Any]:
+    """
+    Preprocess a dataset and build its linkage tree.
+
+    The result does not depend on ``request.n_clusters``, so it can be cut
+    at any number of clusters.
+
+    Returns:
+        Dictionary with the clustering ``data``, ``linkage_matrix``,
+        ``micro_labels`` (scalable mode only), the fitted ``preprocessor`` and
+        ``pca`` (``None`` without PCA), ``mode`` and the feature details
+    """
+    preprocess = preprocess_out_of_core if request.out_of_core else preprocess_in_memory
+    features = preprocess(file_path, request, progress)
+    data = features.pop("data")
+
+    _report(progress, "clustering", 0.45)
+    mode = resolve_clustering_mode(request, data.shape[0])
+    micro_labels = None
+
+    with stage("linkage"):
+        if mode == ClusteringMode.SCALABLE:
+            linkage_matrix, micro_labels = perform_scalable_clustering(
+                data,
+                request.linkage.value,
+                request.n_micro_clusters or settings.SCALABLE_MICRO_CLUSTERS,
+                batch_size=settings.SCALABLE_BATCH_SIZE,
+            )
+        else:
+            linkage_matrix = perform_hierarchical_clustering(data, request.linkage.value)
+
+    return {
+        "data": data,
+        "linkage_matrix": linkage_matrix,
+        "micro_labels": micro_labels,
+        "mode": mode.value,
+        "n_encoded_features": data.shape[1],
+        **features,
+    }
+
+
+def load_or_fit_linkage(
+    file_path: str,
+    request: LinkageTreeRequest,
+    progress: Optional[ProgressCallback] = None,
+    content_hash: Optional[str] = None,
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Return the linkage tree for a dataset, from the cache when possible.
+
+    Returns:
+        Tuple of (fitted tree as returned by ``fit_linkage``, cache hit flag)
+    """
+    cache = linkage_cache()
+    key = linkage_cache_key(file_path, request, content_hash)
+
+    path = cache.get(key)
+    if path is not None:
+        try:
+            with stage("cache_load"):
+                return joblib.load(path, mmap_mode="r"), True
+        except (EOFError, OSError, ValueError, KeyError, pickle.UnpicklingError):
+            # A truncated or foreign file is a miss; refit and overwrite it.
+            cache.discard(key)
+
+    fitted = fit_linkage(file_path, request, progress)
+    with stage("cache_store"):
+        cache.put(key, lambda tmp_path: joblib.dump(fitted, tmp_path))
+    return fitted, False
+
+
+def run_training_pipeline(
+    file_path: str,
+    request: ClusteringRequest,
+    progress: Optional[ProgressCallback] = None,
+    content_hash: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Load a dataset, preprocess it and build the hierarchical clustering.
+
+    Args:
+        file_path: Dataset file (Parquet copy or uploaded CSV)
+        request: Clustering parameters
+        progress: Optional callback receiving ``(stage, fraction)`` updates
+        content_hash: Upload hash of the dataset, used to key the linkage cache
+
+    Returns:
+        Dictionary with ``labels``, ``linkage_matrix``, ``metrics``,
+        ``feature_config`` and the ``model`` artifact to persist. ``metrics``
+        includes the seconds spent per stage (``stage_seconds``) and the
+        worker's peak RSS during the run (``peak_rss_bytes``)
+
+    Raises:
+        FileNotFoundError: If the dataset file is missing
+        ValueError: If the dataset cannot be clustered with these parameters
+    """
+    reset_peak_rss()
+    with collect_stages() as timings:
+        result = _train(file_path, request, progress, content_hash)
+
+    result["metrics"]["stage_seconds"] = timings
+    result["metrics"]["peak_rss_bytes"] = peak_rss_bytes()
+    return result
+
+
+def _train(
+    file_path: str,
+    request: ClusteringRequest,
+    progress: Optional[ProgressCallback],
+    content_hash: Optional[str],
+) -> Dict[str, Any]:
+    fitted, cache_hit = load_or_fit_linkage(file_path, request, progress, content_hash)
+    data = fitted["data"]
+    # The tree is small; copy it out of the read-only cache mapping for scipy.
+    linkage_matrix = np.array(fitted["linkage_matrix"])
+
+    if data.shape[0] < request.n_clusters:
+        raise ValueError(
+            f"Number of samples ({data.shape[0]}) must be >= n_clusters ({request.n_clusters})"
+        )
+    if linkage_matrix.shape[0] + 1 < request.n_clusters:
+        raise ValueError(
+            f"Only {linkage_matrix.shape[0] + 1} micro-clusters were formed, "
+            f"fewer than n_clusters ({request.n_clusters})"
+        )
+
+    with stage("cut"):
+        labels = get_flat_clusters(linkage_matrix, request.n_clusters, fitted["micro_labels"])
+
+    _report(progress, "metrics", 0.7)
+    with stage("metrics"):
+        metrics = compile_metrics(data, labels, fitted["n_encoded_features"])
+    metrics["clustering_mode"] = fitted["mode"]
+    metrics["linkage_cache_hit"] = cache_hit
+    if fitted["micro_labels"] is not None:
+        metrics["n_micro_clusters"] = int(linkage_matrix.shape[0] + 1)
+    feature_config = get_feature_config(
+        numeric_cols=fitted["numeric_cols"],
+        categorical_cols=fitted["categorical_cols"],
+        n_encoded_features=fitted["n_encoded_features"],
+        use_pca=request.use_pca,
+        pca_components=request.pca_components if request.use_pca else None,
+        pca_variance=fitted["pca_variance"],
+        encoding=fitted["encoding"],
+    )
+
+    with stage("model"):
+        model = build_model_artifact(fitted, labels, request)
+
+    return {
+        "labels": np.asarray(labels),
+        "linkage_matrix": linkage_matrix,
+        "metrics": metrics,
+        "feature_config": feature_config,
+        "model": model,
+    }
+
+
+def run_sweep(
+    file_path: str,
+    request: SweepRequest,
+    progress: Optional[ProgressCallback] = None,
+    content_hash: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Score every cut of one linkage tree between ``k_min`` and ``k_max``.
+
+    The tree is fitted (or loaded from the cache) once. All cuts share one
+    silhouette sample, stratified by the finest cut, and one pass of
+    distance blocks; Calinski-Harabasz, Davies-Bouldin and inertia come from
+    per-cluster sums.
+
+    Args:
+        file_path: Dataset file (Parquet copy or uploaded CSV)
+        request: Tree parameters and the range of cluster counts
+        progress: Optional callback receiving ``(stage, fraction)`` updates
+        content_hash: Upload hash of the dataset, used to key the linkage cache
+
+    Returns:
+        Dictionary matching ``SweepResponse`` with one result per cluster count
+
+    Raises:
+        FileNotFoundError: If the dataset file is missing
+        ValueError: If the dataset cannot be clustered with these parameters
+    """
+    fitted, cache_hit = load_or_fit_linkage(file_path, request, progress, content_hash)
+    data = fitted["data"]
+    linkage_matrix = np.array(fitted["linkage_matrix"])
+    n_leaves = linkage_matrix.shape[0] + 1
+
+    ks = [
+        k for k in range(request.k_min, request.k_max + 1)
+        if k < data.shape[0] and k <= n_leaves
+    ]
+    if not ks:
+        raise ValueError(
+            f"No cluster count in [{request.k_min}, {request.k_max}] fits "
+            f"{data.shape[0]} samples"
+        )
+
+    _report(progress, "cutting", 0.6)
+    label_sets = np.column_stack(
+        [get_flat_clusters(linkage_matrix, k, fitted["micro_labels"]) for k in ks]
+    )
+
+    _report(progress, "metrics", 0.7)
+    silhouettes = estimate_silhouettes(data, label_sets)
+
+    results = []
+    for j, k in enumerate(ks):
+        labels = label_sets[:, j]
+        results.append({
+            "n_clusters": k,
+            "silhouette_score": silhouettes[j]["score"],
+            "silhouette_ci": silhouettes[j]["ci"],
+            **cluster_dispersion_scores(data, labels),
+            # Height of the merge that would join two of these k clusters.
+            "merge_height": float(linkage_matrix[n_leaves - k, 2]),
+            "cluster_sizes": calculate_cluster_sizes(labels),
+        })
+
+    best = max(results, key=lambda row: row["silhouette_score"])
+
+    return {
+        "dataset_id": request.dataset_id,
+        "linkage": request.linkage.value,
+        "clustering_mode": fitted["mode"],
+        "n_samples": int(data.shape[0]),
+        "silhouette_method": silhouettes[0]["method"],
+        "silhouette_sample_size": silhouettes[0]["sample_size"],
+        "linkage_cache_hit": cache_hit,
+        "best_k": best["n_clusters"],
+        "results": results,
+    }
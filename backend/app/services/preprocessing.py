@@ -1,12 +1,17 @@
-from typing import Dict, List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
+from scipy import sparse
+from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.compose import ColumnTransformer
-from sklearn.decomposition import PCA
+from sklearn.decomposition import PCA, IncrementalPCA
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 
+# Shared column of grouped categories, named like OneHotEncoder's own.
+INFREQUENT_CATEGORY = "infrequent_sklearn"
+
 
 def detect_feature_types(df: pd.DataFrame) -> Tuple[List[str], List[str]]:
     numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
@@ -16,8 +21,29 @@ def detect_feature_types(df: pd.DataFrame) -> Tuple[List[str], List[str]]:
 
 
 def build_preprocessor(
-    numeric_cols: List[str], categorical_cols: List[str]
+    numeric_cols: List[str],
+    categorical_cols: List[str],
+    max_categories: Optional[int] = None,
+    min_frequency: Optional[float] = None,
+    dtype: type = np.float64,
 ) -> ColumnTransformer:
+    """
+    Scale numeric columns and one-hot encode categorical ones.
+
+    The one-hot output is sparse; the combined matrix stays sparse when it is
+    mostly zeros. Grouping is off unless a limit is given: then categories
+    rarer than ``min_frequency`` (a fraction of the rows), or beyond the
+    ``max_categories - 1`` most frequent ones, share one "infrequent" column,
+    which unseen values map to as well. Without grouping every category gets
+    its own column and unseen values encode as all zeros.
+
+    Args:
+        numeric_cols: Columns to standardize
+        categorical_cols: Columns to one-hot encode
+        max_categories: Most encoded columns per categorical column
+        min_frequency: Smallest share of rows a category needs for its own column
+        dtype: Output dtype of the encoder
+    """
     transformers = []
 
     if numeric_cols:
@@ -27,8 +53,18 @@ def build_preprocessor(
         transformers.append(("num", numeric_transformer, numeric_cols))
 
     if categorical_cols:
+        grouped = bool(max_categories or min_frequency)
         categorical_transformer = Pipeline(
-            steps=[("onehot", OneHotEncoder(handle_unknown="ignore", sparse_output=False))]
+            steps=[(
+                "onehot",
+                OneHotEncoder(
+                    handle_unknown="infrequent_if_exist" if grouped else "ignore",
+                    sparse_output=True,
+                    max_categories=max_categories or None,
+                    min_frequency=min_frequency or None,
+                    dtype=dtype,
+                ),
+            )]
         )
         transformers.append(("cat", categorical_transformer, categorical_cols))
 
@@ -41,19 +77,266 @@ def build_preprocessor(
 
 
 def apply_preprocessing(
-    df: pd.DataFrame, preprocessor: ColumnTransformer
-) -> np.ndarray:
+    df: pd.DataFrame, preprocessor: ColumnTransformer, dtype: type = np.float64
+) -> Union[np.ndarray, sparse.csr_matrix]:
     transformed = preprocessor.fit_transform(df)
-    return transformed
+    if sparse.issparse(transformed):
+        return sparse.csr_matrix(transformed, dtype=dtype)
+    return transformed.astype(dtype, copy=False)
 
 
-def apply_pca(data: np.ndarray, n_components: int) -> Tuple[np.ndarray, float]:
+def apply_pca(
+    data: Union[np.ndarray, sparse.csr_matrix], n_components: int
+) -> Tuple[np.ndarray, float, PCA]:
     n_components = min(n_components, data.shape[1], data.shape[0])
-    pca = PCA(n_components=n_components)
-    transformed = pca.fit_transform(data)
+    if sparse.issparse(data) and n_components < min(data.shape):
+        # ARPACK centers sparse input implicitly instead of densifying it.
+        pca = PCA(n_components=n_components, svd_solver="arpack", random_state=0)
+    else:
+        data = data.toarray() if sparse.issparse(data) else data
+        pca = PCA(n_components=n_components)
+    transformed = pca.fit_transform(data).astype(data.dtype, copy=False)
     explained_variance = float(np.sum(pca.explained_variance_ratio_))
 
-    return transformed, explained_variance
+    return transformed, explained_variance, pca
+
+
+def encoded_matrix_info(data: Union[np.ndarray, sparse.spmatrix]) -> Dict[str, Any]:
+    """Layout and memory footprint of an encoded feature matrix."""
+    n_rows, n_cols = data.shape
+    dense_nbytes = n_rows * n_cols * data.dtype.itemsize
+    if sparse.issparse(data):
+        nbytes = data.data.nbytes + data.indices.nbytes + data.indptr.nbytes
+        density = data.nnz / max(1, n_rows * n_cols)
+    else:
+        nbytes = data.nbytes
+        density = float(np.count_nonzero(data)) / max(1, data.size)
+
+    return {
+        "format": "sparse" if sparse.issparse(data) else "dense",
+        "dtype": str(data.dtype),
+        "shape": [int(n_rows), int(n_cols)],
+        "nbytes": int(nbytes),
+        "dense_nbytes": int(dense_nbytes),
+        "density": round(float(density), 4),
+    }
+
+
+def categorical_encoding_info(
+    preprocessor: ColumnTransformer, categorical_cols: List[str]
+) -> Dict[str, Any]:
+    """Encoded columns per categorical feature and how many categories were grouped."""
+    if not categorical_cols:
+        return {}
+
+    encoder = preprocessor.named_transformers_["cat"][-1]
+    try:
+        infrequent = encoder.infrequent_categories_
+    except AttributeError:
+        # Only defined when max_categories or min_frequency is set.
+        infrequent = [None] * len(categorical_cols)
+    info = {}
+    for col, categories, grouped in zip(categorical_cols, encoder.categories_, infrequent):
+        n_grouped = 0 if grouped is None else len(grouped)
+        info[col] = {
+            "n_categories": int(len(categories)),
+            "n_infrequent": int(n_grouped),
+            "encoded_columns": int(len(categories) - n_grouped + (1 if n_grouped else 0)),
+        }
+    return info
+
+
+class FrequentCategoryGrouper(BaseEstimator, TransformerMixin):
+    """
+    Replace categories outside a fixed vocabulary with ``INFREQUENT_CATEGORY``.
+
+    The out-of-core fit counts categories chunk by chunk, so it decides which
+    ones to group itself instead of leaving that to ``OneHotEncoder``.
+
+    Args:
+        vocabularies: Kept categories per column, or ``None`` for columns
+            that keep all of them
+    """
+
+    def __init__(self, vocabularies: Optional[List[Optional[List[Any]]]] = None):
+        self.vocabularies = vocabularies
+
+    def fit(self, X: pd.DataFrame, y=None) -> "FrequentCategoryGrouper":
+        return self
+
+    def transform(self, X: pd.DataFrame) -> pd.DataFrame:
+        frame = pd.DataFrame(X).copy()
+        for col, vocabulary in zip(frame.columns, self.vocabularies):
+            if vocabulary is not None:
+                frame[col] = frame[col].where(frame[col].isin(vocabulary), INFREQUENT_CATEGORY)
+        return frame
+
+
+def _infrequent_mask(
+    counts: np.ndarray,
+    n_rows: int,
+    max_categories: Optional[int],
+    min_frequency: Optional[float],
+) -> np.ndarray:
+    # Same rules as OneHotEncoder's own infrequent category detection.
+    infrequent = np.zeros(len(counts), dtype=bool)
+    if min_frequency:
+        infrequent = counts < min_frequency * n_rows
+
+    n_columns = len(counts) - infrequent.sum() + 1
+    if max_categories and max_categories < n_columns:
+        n_frequent = max_categories - 1
+        if n_frequent == 0:
+            infrequent[:] = True
+        else:
+            infrequent[np.argsort(counts, kind="mergesort")[:-n_frequent]] = True
+    return infrequent
+
+
+def fit_preprocessor_incremental(
+    chunks: Iterable[pd.DataFrame],
+    numeric_cols: List[str],
+    categorical_cols: List[str],
+    max_categories: Optional[int] = None,
+    min_frequency: Optional[float] = None,
+    dtype: type = np.float64,
+) -> Tuple[ColumnTransformer, Dict[str, Any], int]:
+    """
+    Fit the preprocessor of ``build_preprocessor`` in one pass over row chunks.
+
+    The scaler is fitted with ``partial_fit`` and category counts are summed
+    per chunk, so only one chunk is in memory at a time. Categories are
+    grouped by the same rules as the in-memory fit.
+
+    Args:
+        chunks: Row chunks holding at least the feature columns
+        numeric_cols: Columns to standardize
+        categorical_cols: Columns to one-hot encode
+        max_categories: Most encoded columns per categorical column
+        min_frequency: Smallest share of rows a category needs for its own column
+        dtype: Output dtype of the encoder
+
+    Returns:
+        Tuple of (fitted preprocessor, per-column categorical encoding info, row count)
+
+    Raises:
+        ValueError: If there are no rows
+    """
+    scaler = StandardScaler()
+    counts = {col: pd.Series(dtype=float) for col in categorical_cols}
+    first = None
+    n_rows = 0
+
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        if first is None:
+            first = chunk
+        n_rows += len(chunk)
+        if numeric_cols:
+            scaler.partial_fit(chunk[numeric_cols].astype(float))
+        for col in categorical_cols:
+            counts[col] = counts[col].add(chunk[col].value_counts(dropna=False), fill_value=0)
+
+    if first is None:
+        raise ValueError("Dataset is empty")
+
+    categories, vocabularies, encoding_info = [], [], {}
+    for col in categorical_cols:
+        col_counts = counts[col]
+        missing = [value for value in col_counts.index if pd.isna(value)]
+        present = col_counts.index.difference(missing, sort=False).sort_values()
+        # OneHotEncoder keeps missing values as the last category.
+        col_counts = col_counts.reindex([*present, *missing])
+
+        infrequent = _infrequent_mask(
+            col_counts.to_numpy(), n_rows, max_categories, min_frequency
+        )
+        kept = [value for value, grouped in zip(col_counts.index, infrequent) if not grouped]
+        kept_present = [value for value in kept if not pd.isna(value)]
+        kept_missing = [value for value in kept if pd.isna(value)]
+        if infrequent.any():
+            categories.append([*kept_present, INFREQUENT_CATEGORY, *kept_missing])
+            vocabularies.append(kept)
+        else:
+            categories.append(kept)
+            vocabularies.append(None)
+
+        encoding_info[col] = {
+            "n_categories": int(len(col_counts)),
+            "n_infrequent": int(infrequent.sum()),
+            "encoded_columns": int(len(categories[-1])),
+        }
+
+    transformers = []
+    if numeric_cols:
+        transformers.append(("num", Pipeline(steps=[("scaler", StandardScaler())]), numeric_cols))
+    if categorical_cols:
+        steps = []
+        if any(vocabulary is not None for vocabulary in vocabularies):
+            steps.append(("group", FrequentCategoryGrouper(vocabularies)))
+        steps.append((
+            "onehot",
+            OneHotEncoder(
+                categories=categories,
+                handle_unknown="ignore",
+                sparse_output=True,
+                dtype=dtype,
+            ),
+        ))
+        transformers.append(("cat", Pipeline(steps=steps), categorical_cols))
+
+    # Fitting on one chunk sets up the column layout; the encoder's categories
+    # are fixed and the scaler is swapped for the one fitted on every chunk.
+    preprocessor = ColumnTransformer(transformers=transformers, remainder="drop")
+    preprocessor.fit(first)
+    if numeric_cols:
+        preprocessor.named_transformers_["num"].steps[-1] = ("scaler", scaler)
+
+    return preprocessor, encoding_info, n_rows
+
+
+def fit_incremental_pca(
+    batches: Iterable[Union[np.ndarray, sparse.spmatrix]], n_components: int
+) -> IncrementalPCA:
+    """
+    Fit PCA batch by batch with ``IncrementalPCA``.
+
+    Batches are densified one at a time. ``partial_fit`` needs at least
+    ``n_components`` rows per call, so short batches (usually the last one)
+    are merged into their neighbour instead of being fitted alone.
+
+    Raises:
+        ValueError: If there are fewer than ``n_components`` rows in total
+    """
+    pca = IncrementalPCA(n_components=n_components)
+    pending: List[np.ndarray] = []
+    pending_rows = 0
+
+    for batch in batches:
+        dense = batch.toarray() if sparse.issparse(batch) else np.asarray(batch)
+        if pending_rows >= n_components and dense.shape[0] >= n_components:
+            pca.partial_fit(np.vstack(pending))
+            pending, pending_rows = [], 0
+        pending.append(dense)
+        pending_rows += dense.shape[0]
+
+    if pending_rows < n_components:
+        raise ValueError(f"PCA needs at least {n_components} rows, got {pending_rows}")
+    pca.partial_fit(np.vstack(pending))
+
+    return pca
+
+
+def transform_chunks(
+    chunks: Iterable[pd.DataFrame],
+    preprocessor: ColumnTransformer,
+    dtype: type = np.float64,
+) -> Iterator[sparse.csr_matrix]:
+    """Encode row chunks with a fitted preprocessor as CSR matrices."""
+    for chunk in chunks:
+        if not chunk.empty:
+            yield sparse.csr_matrix(preprocessor.transform(chunk), dtype=dtype)
 
 
 def get_feature_config(
@@ -63,6 +346,7 @@ def get_feature_config(
     use_pca: bool,
     pca_components: int = None,
     pca_variance: float = None,
+    encoding: Optional[Dict[str, Any]] = None,
 ) -> Dict:
     config = {
         "numeric_features": numeric_cols,
@@ -76,5 +360,8 @@ def get_feature_config(
         config["pca_components"] = pca_components
         config["pca_explained_variance"] = pca_variance
 
+    if encoding:
+        config.update(encoding)
+
     return config
 
@@ -0,0 +1,152 @@
+"""Process pool for rendering matplotlib charts.
+
+Rendering is CPU-bound and would otherwise block the event loop, so charts
+are drawn in a small pool of spawned workers that import matplotlib and
+build the font cache once at start-up. The pool takes a bounded number of
+renders; beyond that ``render`` raises ``RenderQueueFull`` so the API can
+answer ``429`` instead of letting requests pile up. Concurrent requests for
+the same chart share one render.
+"""
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.telemetry import CHART_RENDER_SECONDS
+from app.services.charts import render_chart
+
+_executor: Optional[ProcessPoolExecutor] = None
+_inflight: Dict[str, "asyncio.Future[Path]"] = {}
+_stats = {"completed": 0, "failed": 0, "rejected": 0, "render_seconds": 0.0}
+
+
+class RenderQueueFull(RuntimeError):
+    """Raised when every render slot and queue slot is taken."""
+
+
+def _init_worker() -> None:
+    # Load the Agg backend, fonts and chart code before the first request.
+    import matplotlib
+
+    matplotlib.use("Agg")
+    from matplotlib import font_manager
+
+    font_manager.findfont(font_manager.FontProperties(family="sans-serif", weight="bold"))
+    import app.services.clustering  # noqa: F401
+
+
+def _warm() -> None:
+    pass
+
+
+def start_workers() -> None:
+    """Start the rendering pool and spawn all of its workers."""
+    global _executor
+
+    if _executor is not None:
+        return
+
+    workers = max(1, settings.RENDER_MAX_WORKERS)
+    _executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    )
+    # Workers are otherwise spawned on first use.
+    for _ in range(workers):
+        _executor.submit(_warm)
+
+
+def shutdown_workers() -> None:
+    """Stop the rendering pool, cancelling renders that have not started."""
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+    _inflight.clear()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    if _executor is None:
+        start_workers()
+    return _executor
+
+
+def _capacity() -> int:
+    return max(1, settings.RENDER_MAX_WORKERS) + max(0, settings.RENDER_MAX_QUEUE)
+
+
+def _timed_render(key: str, generate: Callable[..., Any], *args: Any, **kwargs: Any):
+    start = time.perf_counter()
+    path = render_chart(key, generate, *args, **kwargs)
+    return path, time.perf_counter() - start
+
+
+async def _run(key: str, chart: str, call: partial) -> Path:
+    loop = asyncio.get_running_loop()
+    try:
+        path, seconds = await loop.run_in_executor(get_executor(), call)
+    except Exception:
+        _stats["failed"] += 1
+        raise
+    finally:
+        _inflight.pop(key, None)
+
+    _stats["completed"] += 1
+    _stats["render_seconds"] += seconds
+    CHART_RENDER_SECONDS.observe(seconds, chart=chart)
+    return path
+
+
+async def render(key: str, generate: Callable[..., Any], *args: Any, **kwargs: Any) -> Path:
+    """
+    Render a chart into the chart cache in the rendering pool.
+
+    Args:
+        key: Chart cache key (see ``charts.chart_key``)
+        generate: Picklable, module-level function returning a ``Figure``
+        *args: Positional arguments for ``generate``
+        **kwargs: Keyword arguments for ``generate``
+
+    Returns:
+        Path of the cached image
+
+    Raises:
+        RenderQueueFull: If the pool and its queue are saturated
+    """
+    task = _inflight.get(key)
+    if task is None:
+        if len(_inflight) >= _capacity():
+            _stats["rejected"] += 1
+            raise RenderQueueFull("Chart rendering is busy, retry shortly")
+        call = partial(_timed_render, key, generate, *args, **kwargs)
+        chart = generate.__name__.removeprefix("generate_")
+        task = asyncio.ensure_future(_run(key, chart, call))
+        _inflight[key] = task
+
+    # Shield the shared render from one waiting client disconnecting.
+    return await asyncio.shield(task)
+
+
+def render_stats() -> Dict[str, Any]:
+    """Queue depth and throughput of the rendering pool."""
+    workers = max(1, settings.RENDER_MAX_WORKERS)
+    in_flight = len(_inflight)
+    completed = _stats["completed"]
+    return {
+        "workers": workers,
+        "max_queue": max(0, settings.RENDER_MAX_QUEUE),
+        "in_flight": in_flight,
+        "queued": max(0, in_flight - workers),
+        "completed": completed,
+        "failed": _stats["failed"],
+        "rejected": _stats["rejected"],
+        "mean_render_ms": (
+            round(1000 * _stats["render_seconds"] / completed, 1) if completed else None
+        ),
+    }
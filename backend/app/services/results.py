@@ -0,0 +1,340 @@
+"""Columnar storage of clustering run results.
+
+A run's labels are saved as an int32 ``.npy`` sidecar next to its dataset
+file, and its linkage tree as a second sidecar for chart data. Row payloads
+are read from the dataset on demand instead of being copied into the
+database for every run.
+"""
+import asyncio
+import json
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import ClusterAssignment, ClusteringRun, Dataset
+from app.db.session import AsyncSessionLocal
+from app.services.io import (
+    dataset_row_count,
+    frame_to_records,
+    iter_frame_chunks,
+    iter_frame_chunks_from,
+    load_frame,
+)
+
+
+class StaleRunResultsError(ValueError):
+    """Raised when a dataset file no longer has the rows a run was fitted on."""
+
+
+def labels_path_for(dataset_path: str, run_id: int) -> Path:
+    path = Path(dataset_path)
+    return path.with_name(f"{path.name}.run_{run_id}.labels.npy")
+
+
+def save_labels(dataset_path: str, run_id: int, labels: np.ndarray) -> str:
+    path = labels_path_for(dataset_path, run_id)
+    np.save(path, np.asarray(labels, dtype=np.int32))
+    return str(path)
+
+
+def load_labels(labels_path: str) -> np.ndarray:
+    path = Path(labels_path)
+    if not path.exists():
+        raise FileNotFoundError(f"Labels file not found: {labels_path}")
+
+    return np.load(path, mmap_mode="r")
+
+
+def linkage_path_for(dataset_path: str, run_id: int) -> Path:
+    path = Path(dataset_path)
+    return path.with_name(f"{path.name}.run_{run_id}.linkage.npy")
+
+
+def save_linkage(dataset_path: str, run_id: int, linkage_matrix: np.ndarray) -> str:
+    path = linkage_path_for(dataset_path, run_id)
+    np.save(path, np.asarray(linkage_matrix, dtype=np.float64))
+    return str(path)
+
+
+def load_linkage(dataset_path: str, run_id: int) -> np.ndarray:
+    path = linkage_path_for(dataset_path, run_id)
+    if not path.exists():
+        raise FileNotFoundError(f"Linkage file not found: {path}")
+
+    return np.load(path)
+
+
+def read_run_results(
+    dataset_path: str,
+    labels_path: str,
+    columns: Optional[List[str]] = None,
+) -> Tuple[np.ndarray, pd.DataFrame]:
+    """
+    Join stored labels with the rows of the source dataset.
+
+    Args:
+        dataset_path: Path of the dataset the run was fitted on
+        labels_path: Path of the run's labels sidecar
+        columns: Dataset columns to read (all columns if omitted)
+
+    Returns:
+        Tuple of (labels, dataset rows) aligned by row index
+
+    Raises:
+        FileNotFoundError: If the labels or dataset file is missing
+        StaleRunResultsError: If the dataset's row count differs from the labels
+    """
+    labels = load_labels(labels_path)
+    frame = load_frame(dataset_path, columns=columns)
+
+    if len(frame) != len(labels):
+        raise StaleRunResultsError("Dataset file no longer matches the stored run labels")
+
+    return labels, frame
+
+
+async def load_run_results(
+    db: AsyncSession,
+    run: ClusteringRun,
+    columns: Optional[List[str]] = None,
+) -> Tuple[np.ndarray, pd.DataFrame]:
+    """
+    Load a run's labels and row payloads.
+
+    Runs created before labels were stored as sidecars fall back to the
+    payloads kept on their ``ClusterAssignment`` rows.
+    """
+    if run.labels_path:
+        dataset = await db.get(Dataset, run.dataset_id)
+        return read_run_results(dataset.data_path, run.labels_path, columns)
+
+    result = await db.execute(
+        select(ClusterAssignment.cluster_label, ClusterAssignment.payload)
+        .where(ClusterAssignment.run_id == run.id)
+        .order_by(ClusterAssignment.row_index)
+    )
+    rows = result.all()
+
+    labels = np.array([row.cluster_label for row in rows], dtype=np.int32)
+    frame = pd.DataFrame([row.payload or {} for row in rows])
+    if columns is not None:
+        frame = frame.reindex(columns=columns)
+
+    return labels, frame
+
+
+def check_run_files(dataset_path: str, labels_path: str) -> None:
+    """
+    Check that a run's labels sidecar and dataset exist and still line up.
+
+    Streaming responses call this before they start, while an error status
+    can still be sent. CSV datasets have no stored row count, so only their
+    presence is checked.
+
+    Raises:
+        FileNotFoundError: If the labels or dataset file is missing
+        StaleRunResultsError: If the dataset's row count differs from the labels
+    """
+    for path in (labels_path, dataset_path):
+        if not Path(path).exists():
+            raise FileNotFoundError(f"Run results file not found: {Path(path).name}")
+
+    n_rows = dataset_row_count(dataset_path)
+    if n_rows is not None and n_rows != len(load_labels(labels_path)):
+        raise StaleRunResultsError("Dataset file no longer matches the stored run labels")
+
+
+def iter_run_results(
+    dataset_path: str,
+    labels_path: str,
+    columns: Optional[List[str]] = None,
+) -> Iterator[Tuple[int, np.ndarray, pd.DataFrame]]:
+    """
+    Yield ``(offset, labels, rows)`` chunks of a run in row order.
+
+    Only one chunk of the dataset is held in memory at a time.
+    """
+    labels = load_labels(labels_path)
+    offset = 0
+
+    for chunk in iter_frame_chunks(
+        dataset_path, columns=columns, chunk_size=settings.SEGMENT_CHUNK_SIZE
+    ):
+        stop = offset + len(chunk)
+        if stop > len(labels):
+            raise StaleRunResultsError("Dataset file no longer matches the stored run labels")
+        yield offset, np.asarray(labels[offset:stop]), chunk
+        offset = stop
+
+    if offset != len(labels):
+        raise StaleRunResultsError("Dataset file no longer matches the stored run labels")
+
+
+def _segment_rows(
+    row_indices: np.ndarray, labels: np.ndarray, frame: pd.DataFrame
+) -> List[Dict[str, Any]]:
+    return [
+        {"row_index": int(row_index), "cluster_label": int(label), "payload": payload}
+        for row_index, label, payload in zip(row_indices, labels, frame_to_records(frame))
+    ]
+
+
+def read_segment_page(
+    dataset_path: str,
+    labels_path: str,
+    after: Optional[int],
+    limit: int,
+    cluster_label: Optional[int] = None,
+    columns: Optional[List[str]] = None,
+) -> Tuple[List[Dict[str, Any]], int, Optional[int]]:
+    """
+    Read one keyset page of a run's segments from its sidecar.
+
+    Args:
+        dataset_path: Path of the dataset the run was fitted on
+        labels_path: Path of the run's labels sidecar
+        after: Return rows with ``row_index`` greater than this cursor
+        limit: Maximum number of rows to return
+        cluster_label: Only return rows assigned to this cluster
+        columns: Payload columns to include (all columns if omitted)
+
+    Returns:
+        Tuple of (rows, total matching rows, cursor for the next page)
+    """
+    labels = load_labels(labels_path)
+    if cluster_label is None:
+        matching = np.arange(len(labels))
+    else:
+        matching = np.flatnonzero(labels == cluster_label)
+
+    start = 0 if after is None else int(np.searchsorted(matching, after, side="right"))
+    page = matching[start:start + limit]
+    next_cursor = int(page[-1]) if start + limit < len(matching) else None
+
+    rows: List[Dict[str, Any]] = []
+    if len(page):
+        n_rows = dataset_row_count(dataset_path)
+        if n_rows is not None and n_rows != len(labels):
+            raise StaleRunResultsError("Dataset file no longer matches the stored run labels")
+
+        first, last = int(page[0]), int(page[-1])
+        for offset, chunk in iter_frame_chunks_from(
+            dataset_path, first, columns=columns, chunk_size=settings.SEGMENT_CHUNK_SIZE
+        ):
+            stop = offset + len(chunk)
+            if stop > len(labels):
+                raise StaleRunResultsError("Dataset file no longer matches the stored run labels")
+            wanted = page[(page >= offset) & (page < stop)]
+            positions = wanted - offset
+            rows.extend(_segment_rows(wanted, labels[wanted], chunk.iloc[positions]))
+            if stop > last:
+                break
+
+    return rows, len(matching), next_cursor
+
+
+def stream_segments(
+    dataset_path: str,
+    labels_path: str,
+    after: Optional[int] = None,
+    cluster_label: Optional[int] = None,
+    columns: Optional[List[str]] = None,
+) -> Iterator[str]:
+    """Yield a run's segments as NDJSON, one dataset chunk at a time."""
+    for offset, chunk_labels, chunk in iter_run_results(dataset_path, labels_path, columns):
+        row_indices = np.arange(offset, offset + len(chunk))
+        mask = np.ones(len(chunk), dtype=bool)
+        if cluster_label is not None:
+            mask &= chunk_labels == cluster_label
+        if after is not None:
+            mask &= row_indices > after
+        if not mask.any():
+            continue
+
+        rows = _segment_rows(row_indices[mask], chunk_labels[mask], chunk[mask])
+        yield "".join(json.dumps(row) + "\n" for row in rows)
+
+
+def _legacy_filters(run_id: int, after: Optional[int], cluster_label: Optional[int]) -> list:
+    filters = [ClusterAssignment.run_id == run_id]
+    if after is not None:
+        filters.append(ClusterAssignment.row_index > after)
+    if cluster_label is not None:
+        filters.append(ClusterAssignment.cluster_label == cluster_label)
+    return filters
+
+
+def _legacy_row(row, columns: Optional[List[str]]) -> Dict[str, Any]:
+    payload = row.payload or {}
+    if columns is not None:
+        payload = {col: payload.get(col) for col in columns}
+    return {"row_index": row.row_index, "cluster_label": row.cluster_label, "payload": payload}
+
+
+async def load_segment_page(
+    db: AsyncSession,
+    run: ClusteringRun,
+    after: Optional[int],
+    limit: int,
+    cluster_label: Optional[int] = None,
+    columns: Optional[List[str]] = None,
+) -> Tuple[List[Dict[str, Any]], int, Optional[int]]:
+    """Load one keyset page of a run's segments; see ``read_segment_page``."""
+    if run.labels_path:
+        dataset = await db.get(Dataset, run.dataset_id)
+        return await asyncio.to_thread(
+            read_segment_page,
+            dataset.data_path,
+            run.labels_path,
+            after,
+            limit,
+            cluster_label,
+            columns,
+        )
+
+    total = await db.scalar(
+        select(func.count())
+        .select_from(ClusterAssignment)
+        .where(*_legacy_filters(run.id, None, cluster_label))
+    )
+    result = await db.execute(
+        select(
+            ClusterAssignment.row_index,
+            ClusterAssignment.cluster_label,
+            ClusterAssignment.payload,
+        )
+        .where(*_legacy_filters(run.id, after, cluster_label))
+        .order_by(ClusterAssignment.row_index)
+        .limit(limit + 1)
+    )
+    rows = [_legacy_row(row, columns) for row in result.all()]
+    next_cursor = rows[limit - 1]["row_index"] if len(rows) > limit else None
+
+    return rows[:limit], total, next_cursor
+
+
+async def stream_legacy_segments(
+    run_id: int,
+    after: Optional[int] = None,
+    cluster_label: Optional[int] = None,
+    columns: Optional[List[str]] = None,
+) -> AsyncIterator[str]:
+    """Stream the payload rows of a pre-sidecar run as NDJSON."""
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(
+            select(
+                ClusterAssignment.row_index,
+                ClusterAssignment.cluster_label,
+                ClusterAssignment.payload,
+            )
+            .where(*_legacy_filters(run_id, after, cluster_label))
+            .order_by(ClusterAssignment.row_index)
+            .execution_options(yield_per=settings.SEGMENT_CHUNK_SIZE)
+        )
+        async for partition in result.partitions():
+            yield "".join(json.dumps(_legacy_row(row, columns)) + "\n" for row in partition)
@@ -0,0 +1,217 @@
+"""Batch scoring of whole datasets against a fitted clustering run.
+
+The input's Parquet row groups are split into partitions of roughly
+``SCORING_PARTITION_ROWS`` rows, which the clustering worker pool scores in
+parallel. Each partition is streamed in chunks of ``SCORING_CHUNK_SIZE``
+rows into its own part file, and the parts are then concatenated row group
+by row group. Memory use depends on the chunk size and the number of
+workers, never on the size of the input.
+"""
+import asyncio
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.core.config import settings
+from app.db.models import ClusteringRun, Dataset
+from app.db.session import AsyncSessionLocal
+from app.schemas.clustering import JobStatus
+from app.services import jobs
+from app.services.artifacts import model_registry
+from app.services.io import convert_to_parquet, table_to_frame
+
+LABEL_COLUMN = "cluster_label"
+DISTANCE_COLUMN = "distance"
+
+
+def scores_path_for(run_id: int, job_id: str) -> Path:
+    scores_dir = settings.output_path / "scores"
+    scores_dir.mkdir(parents=True, exist_ok=True)
+    return scores_dir / f"run_{run_id}_{job_id}.parquet"
+
+
+def output_schema(input_schema: pa.Schema) -> pa.Schema:
+    """Input columns followed by the assigned label and centroid distance."""
+    fields = [f for f in input_schema if f.name not in (LABEL_COLUMN, DISTANCE_COLUMN)]
+    return pa.schema(
+        [*fields, pa.field(LABEL_COLUMN, pa.int32()), pa.field(DISTANCE_COLUMN, pa.float64())]
+    )
+
+
+def plan_partitions(parquet_path: str, partition_rows: int) -> List[Tuple[int, int]]:
+    """Group consecutive row groups into ``[start, stop)`` ranges of about ``partition_rows``."""
+    metadata = pq.ParquetFile(parquet_path).metadata
+    partitions = []
+    start, rows = 0, 0
+    for i in range(metadata.num_row_groups):
+        rows += metadata.row_group(i).num_rows
+        if rows >= partition_rows:
+            partitions.append((start, i + 1))
+            start, rows = i + 1, 0
+    if start < metadata.num_row_groups or not partitions:
+        partitions.append((start, metadata.num_row_groups))
+    return partitions
+
+
+def score_partition(
+    model_path: str,
+    parquet_path: str,
+    row_groups: Tuple[int, int],
+    part_path: str,
+    chunk_size: int,
+) -> Dict[str, Any]:
+    """
+    Score a range of row groups and write them, labelled, to ``part_path``.
+
+    Rows with missing numeric features get label ``-1`` and a null distance.
+
+    Returns:
+        Dictionary with ``n_rows`` and per-label ``cluster_sizes``
+    """
+    model = model_registry.get(model_path)
+    parquet_file = pq.ParquetFile(parquet_path, memory_map=True)
+    missing = [col for col in model.feature_cols if col not in parquet_file.schema_arrow.names]
+    if missing:
+        raise ValueError(f"Missing feature columns: {', '.join(missing)}")
+
+    schema = output_schema(parquet_file.schema_arrow)
+    counts: Dict[int, int] = {}
+    n_rows = 0
+
+    with pq.ParquetWriter(part_path, schema) as writer:
+        batches = parquet_file.iter_batches(
+            batch_size=chunk_size, row_groups=list(range(*row_groups))
+        )
+        for batch in batches:
+            table = pa.Table.from_batches([batch])
+            data = model.transform(
+                table_to_frame(table.select(model.feature_cols)), check_finite=False
+            )
+            valid = np.isfinite(data).all(axis=1)
+            labels = np.full(len(data), -1, dtype=np.int32)
+            distances = np.full(len(data), np.nan)
+            if valid.any():
+                labels[valid], distances[valid] = model.assign(data[valid])
+
+            table = table.drop(
+                [name for name in (LABEL_COLUMN, DISTANCE_COLUMN) if name in table.column_names]
+            )
+            table = table.append_column(LABEL_COLUMN, pa.array(labels, pa.int32()))
+            table = table.append_column(
+                DISTANCE_COLUMN, pa.array(distances, pa.float64(), from_pandas=True)
+            )
+            writer.write_table(table)
+
+            n_rows += len(labels)
+            unique, unique_counts = np.unique(labels, return_counts=True)
+            for label, count in zip(unique.tolist(), unique_counts.tolist()):
+                counts[label] = counts.get(label, 0) + count
+
+    return {"n_rows": n_rows, "cluster_sizes": counts}
+
+
+def merge_parts(part_paths: List[str], output_path: str) -> None:
+    """Concatenate part files into one Parquet file, one row group at a time."""
+    schema = pq.ParquetFile(part_paths[0]).schema_arrow
+    tmp_path = Path(output_path).with_name(f".{Path(output_path).name}.tmp")
+    try:
+        with pq.ParquetWriter(tmp_path, schema) as writer:
+            for part_path in part_paths:
+                part = pq.ParquetFile(part_path)
+                for i in range(part.num_row_groups):
+                    writer.write_table(part.read_row_group(i))
+        tmp_path.replace(output_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+async def _ensure_parquet(dataset_id: int) -> str:
+    """Return the dataset's Parquet copy, converting legacy CSV-only datasets first."""
+    async with AsyncSessionLocal() as db:
+        dataset = await db.get(Dataset, dataset_id)
+        if dataset is None:
+            raise ValueError(f"Dataset with id {dataset_id} not found")
+
+        if not dataset.parquet_path:
+            dataset.parquet_path, dataset.column_schema = await jobs.run_in_worker(
+                convert_to_parquet, dataset.file_path
+            )
+            await db.commit()
+
+        return dataset.parquet_path
+
+
+async def run_scoring_job(job_id: str, run_id: int, dataset_id: int) -> None:
+    """Background entry point for a queued batch scoring job."""
+    jobs.update_job(job_id, status=JobStatus.RUNNING)
+    progress = jobs.progress_callback(job_id)
+    output_path = scores_path_for(run_id, job_id)
+    part_paths: List[str] = []
+    tasks: List[asyncio.Future] = []
+
+    try:
+        async with AsyncSessionLocal() as db:
+            run = await db.get(ClusteringRun, run_id)
+            if run is None or not run.model_path:
+                raise ValueError(f"Clustering run {run_id} has no fitted model")
+            model_path = run.model_path
+
+        progress("loading", 0.02)
+        parquet_path = await _ensure_parquet(dataset_id)
+        partitions = plan_partitions(parquet_path, settings.SCORING_PARTITION_ROWS)
+        total_rows = max(1, pq.ParquetFile(parquet_path).metadata.num_rows)
+
+        part_paths = [
+            str(output_path.with_name(f".{output_path.stem}.part{i}.parquet"))
+            for i in range(len(partitions))
+        ]
+        tasks = [
+            asyncio.ensure_future(
+                jobs.run_in_worker(
+                    score_partition,
+                    model_path,
+                    parquet_path,
+                    row_groups,
+                    part_path,
+                    settings.SCORING_CHUNK_SIZE,
+                )
+            )
+            for row_groups, part_path in zip(partitions, part_paths)
+        ]
+
+        n_rows = 0
+        cluster_sizes: Dict[int, int] = {}
+        for task in asyncio.as_completed(tasks):
+            part = await task
+            n_rows += part["n_rows"]
+            for label, count in part["cluster_sizes"].items():
+                cluster_sizes[label] = cluster_sizes.get(label, 0) + count
+            progress("scoring", 0.05 + 0.85 * n_rows / total_rows)
+
+        progress("writing", 0.95)
+        await asyncio.to_thread(merge_parts, part_paths, str(output_path))
+    except Exception as e:
+        # Let partitions still running finish before their parts are removed.
+        await asyncio.gather(*tasks, return_exceptions=True)
+        output_path.unlink(missing_ok=True)
+        jobs.update_job(job_id, status=JobStatus.FAILED, error=str(e))
+        return
+    finally:
+        for part_path in part_paths:
+            Path(part_path).unlink(missing_ok=True)
+
+    progress("done", 1.0)
+    jobs.update_job(
+        job_id,
+        status=JobStatus.SUCCEEDED,
+        run_id=run_id,
+        result={
+            "dataset_id": dataset_id,
+            "n_rows": n_rows,
+            "cluster_sizes": dict(sorted(cluster_sizes.items())),
+            "output_path": str(output_path),
+        },
+    )
@@ -0,0 +1,132 @@
+"""Orchestration of clustering runs: worker-pool fit plus persistence."""
+import time
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import telemetry
+from app.core.config import settings
+from app.db.bulk import bulk_insert_assignments
+from app.db.models import ClusteringRun, Dataset
+from app.db.session import AsyncSessionLocal
+from app.schemas.clustering import ClusteringRequest, JobStatus
+from app.services import jobs
+from app.services.artifacts import save_model
+from app.services.pipeline import run_training_pipeline
+from app.services.results import save_labels, save_linkage
+
+
+async def execute_training(
+    db: AsyncSession,
+    dataset: Dataset,
+    request: ClusteringRequest,
+    job_id: Optional[str] = None,
+) -> ClusteringRun:
+    """
+    Fit a clustering run in the worker pool and persist its results.
+
+    Args:
+        db: Database session the run is written to (not committed)
+        dataset: Dataset to cluster
+        request: Clustering parameters
+        job_id: Background job to report progress to, if any
+
+    Returns:
+        The persisted clustering run, whose ``metrics`` record the seconds spent
+        per pipeline stage, including ``persist`` for writing the results
+    """
+    progress = jobs.progress_callback(job_id)
+    try:
+        result = await jobs.run_in_worker(
+            run_training_pipeline,
+            dataset.data_path,
+            request,
+            progress,
+            content_hash=dataset.content_hash,
+        )
+    except Exception:
+        telemetry.TRAIN_RUNS.inc(mode=request.mode.value, outcome="failed")
+        raise
+
+    _report(progress, "persisting", 0.85)
+    persist_start = time.perf_counter()
+    clustering_run = ClusteringRun(
+        dataset_id=dataset.id,
+        linkage=request.linkage.value,
+        n_clusters=request.n_clusters,
+        params=request.model_dump(mode="json"),
+        feature_config=result["feature_config"],
+        metrics=result["metrics"],
+        dendrogram_path=None,
+    )
+    db.add(clustering_run)
+    await db.flush()
+    await db.refresh(clustering_run)
+
+    clustering_run.labels_path = save_labels(
+        dataset.file_path, clustering_run.id, result["labels"]
+    )
+    # The dendrogram is rendered from this on first request, not here.
+    save_linkage(dataset.file_path, clustering_run.id, result["linkage_matrix"])
+    clustering_run.model_path = save_model(clustering_run.id, result["model"])
+    if settings.STORE_ASSIGNMENT_ROWS:
+        # The API reads labels from the sidecar; these rows are only for
+        # consumers querying the database directly.
+        await bulk_insert_assignments(db, clustering_run.id, result["labels"])
+
+    metrics = dict(result["metrics"])
+    metrics["stage_seconds"] = {
+        **metrics["stage_seconds"],
+        "persist": round(time.perf_counter() - persist_start, 4),
+    }
+    clustering_run.metrics = metrics
+    telemetry.observe_run(metrics, metrics["clustering_mode"])
+
+    return clustering_run
+
+
+def request_for_recut(run: ClusteringRun, n_clusters: int) -> ClusteringRequest:
+    """Rebuild the request that produced ``run`` with a different cluster count."""
+    if run.params:
+        params = dict(run.params)
+    else:
+        feature_config = run.feature_config or {}
+        params = {
+            "dataset_id": run.dataset_id,
+            "linkage": run.linkage,
+            "use_pca": feature_config.get("pca_applied", False),
+            "pca_components": feature_config.get("pca_components"),
+        }
+
+    params["n_clusters"] = n_clusters
+    return ClusteringRequest(**params)
+
+
+async def run_training_job(job_id: str, request: ClusteringRequest) -> None:
+    """Background entry point for a queued training job."""
+    jobs.update_job(job_id, status=JobStatus.RUNNING)
+
+    async with AsyncSessionLocal() as db:
+        try:
+            result = await db.execute(
+                select(Dataset).where(Dataset.id == request.dataset_id)
+            )
+            dataset = result.scalar_one_or_none()
+            if not dataset:
+                raise ValueError(f"Dataset with id {request.dataset_id} not found")
+
+            clustering_run = await execute_training(db, dataset, request, job_id)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            jobs.update_job(job_id, status=JobStatus.FAILED, error=str(e))
+            return
+
+    _report(jobs.progress_callback(job_id), "done", 1.0)
+    jobs.update_job(job_id, status=JobStatus.SUCCEEDED, run_id=clustering_run.id)
+
+
+def _report(progress, stage: str, fraction: float) -> None:
+    if progress is not None:
+        progress(stage, fraction)
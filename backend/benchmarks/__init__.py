@@ -0,0 +1,5 @@
+"""Performance benchmarks for the segmentation pipeline.
+
+Run from ``backend/`` with ``python -m benchmarks.run`` and compare two
+result files with ``python -m benchmarks.compare``.
+"""
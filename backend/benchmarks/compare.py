@@ -0,0 +1,112 @@
+"""Compare two benchmark result files.
+
+Usage, from ``backend/``::
+
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json
+
+Benchmarks are matched on name, row count and cardinality. The exit status
+is 1 if any benchmark got slower (or, with ``--memory``, used more memory)
+by more than ``--threshold``, so the comparison can gate CI.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+Key = Tuple[str, int, int]
+
+
+def load_results(path: Path) -> Tuple[Dict[str, Any], Dict[Key, Dict[str, Any]]]:
+    payload = json.loads(path.read_text())
+    results = {
+        (row["benchmark"], row["n_rows"], row["cardinality"]): row
+        for row in payload["results"]
+    }
+    return payload["meta"], results
+
+
+def _ratio(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    if not before or after is None:
+        return None
+    return after / before
+
+
+def _change(ratio: Optional[float]) -> str:
+    return "n/a" if ratio is None else f"{(ratio - 1) * 100:+.1f}%"
+
+
+def compare(
+    baseline: Dict[Key, Dict[str, Any]],
+    current: Dict[Key, Dict[str, Any]],
+    metric: str,
+    threshold: float,
+    memory: bool,
+) -> Tuple[List[List[str]], int]:
+    """
+    Line up the benchmarks present in both files.
+
+    Returns:
+        Tuple of (table rows, number of regressions)
+    """
+    rows = []
+    regressions = 0
+    for key in sorted(baseline.keys() & current.keys()):
+        before, after = baseline[key], current[key]
+        time_ratio = _ratio(before.get(metric), after.get(metric))
+        memory_ratio = _ratio(before.get("peak_rss_bytes"), after.get("peak_rss_bytes"))
+
+        regressed = time_ratio is not None and time_ratio > 1 + threshold
+        if memory and memory_ratio is not None and memory_ratio > 1 + threshold:
+            regressed = True
+        regressions += regressed
+
+        name, n_rows, cardinality = key
+        rows.append([
+            name,
+            str(n_rows),
+            str(cardinality),
+            f"{before.get(metric, float('nan')):.4f}",
+            f"{after.get(metric, float('nan')):.4f}",
+            _change(time_ratio),
+            _change(memory_ratio),
+            "REGRESSION" if regressed else "",
+        ])
+    return rows, regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("current", type=Path)
+    parser.add_argument("--metric", default="seconds_min",
+                        choices=["seconds_min", "seconds_median", "seconds_max"])
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown counted as a regression (default 0.2)")
+    parser.add_argument("--memory", action="store_true",
+                        help="also count peak RSS growth above the threshold as a regression")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    baseline_meta, baseline = load_results(args.baseline)
+    current_meta, current = load_results(args.current)
+    for label, meta in (("baseline", baseline_meta), ("current", current_meta)):
+        print(f"{label:<9} {meta.get('git_commit') or '?'}  {meta.get('created_at')}  "
+              f"numpy {meta['packages'].get('numpy')}  scipy {meta['packages'].get('scipy')}  "
+              f"scikit-learn {meta['packages'].get('scikit-learn')}")
+
+    rows, regressions = compare(baseline, current, args.metric, args.threshold, args.memory)
+    header = ["benchmark", "rows", "card", "before s", "after s", "time", "peak rss", ""]
+    widths = [max(len(row[i]) for row in [header, *rows]) for i in range(len(header))]
+    print()
+    for row in [header, *rows]:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+    unmatched = len(baseline.keys() ^ current.keys())
+    if unmatched:
+        print(f"\n{unmatched} benchmarks appear in only one of the files")
+    print(f"\n{regressions} regressions above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Synthetic customer datasets shaped like ``sample_data/ethiopian_supermarket_customers.csv``."""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REGIONS = [
+    "Addis Ababa", "Dire Dawa", "Hawassa", "Bahir Dar",
+    "Mekelle", "Gondar", "Adama", "Jimma",
+]
+TIERS = ["Bronze", "Silver", "Gold", "Platinum"]
+FREQUENCIES = ["Daily", "Weekly", "Monthly"]
+
+# Latent segments: (age mean, income mean, spending score mean, tier weights,
+# visit frequency weights). Rows are drawn around them so the clusters are real.
+SEGMENTS = [
+    (26, 42000, 72, [0.2, 0.4, 0.3, 0.1], [0.5, 0.4, 0.1]),
+    (34, 78000, 84, [0.0, 0.1, 0.4, 0.5], [0.6, 0.3, 0.1]),
+    (45, 52000, 42, [0.3, 0.5, 0.2, 0.0], [0.1, 0.3, 0.6]),
+    (55, 95000, 58, [0.0, 0.2, 0.4, 0.4], [0.2, 0.5, 0.3]),
+    (30, 30000, 25, [0.6, 0.3, 0.1, 0.0], [0.1, 0.2, 0.7]),
+]
+
+
+def region_names(cardinality: int) -> list:
+    """The sample's eight regions, extended with numbered ones up to ``cardinality``."""
+    if cardinality <= len(REGIONS):
+        return REGIONS[:cardinality]
+    return REGIONS + [f"Region {i}" for i in range(len(REGIONS) + 1, cardinality + 1)]
+
+
+def make_customers(n_rows: int, cardinality: int = 8, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate a customer table with the sample dataset's columns.
+
+    Args:
+        n_rows: Number of customers
+        cardinality: Number of distinct ``region`` values. Region frequencies
+            follow a Zipf-like curve, so high cardinalities have a long tail
+            of rare values, as real location columns do
+        seed: Random seed; the same arguments always give the same table
+
+    Returns:
+        DataFrame with ``customer_id``, ``age``, ``annual_income``,
+        ``spending_score``, ``gender``, ``region``, ``membership_tier`` and
+        ``visit_frequency``
+    """
+    rng = np.random.default_rng(seed)
+    segment = rng.integers(0, len(SEGMENTS), size=n_rows)
+
+    age = np.empty(n_rows)
+    income = np.empty(n_rows)
+    spending = np.empty(n_rows)
+    tier = np.empty(n_rows, dtype=object)
+    frequency = np.empty(n_rows, dtype=object)
+    for i, (age_mean, income_mean, spending_mean, tier_p, frequency_p) in enumerate(SEGMENTS):
+        rows = segment == i
+        n = int(rows.sum())
+        age[rows] = rng.normal(age_mean, 5, n)
+        income[rows] = rng.normal(income_mean, income_mean * 0.12, n)
+        spending[rows] = rng.normal(spending_mean, 8, n)
+        tier[rows] = rng.choice(TIERS, size=n, p=tier_p)
+        frequency[rows] = rng.choice(FREQUENCIES, size=n, p=frequency_p)
+
+    regions = region_names(cardinality)
+    weights = 1.0 / np.arange(1, len(regions) + 1)
+
+    return pd.DataFrame({
+        "customer_id": np.arange(1, n_rows + 1),
+        "age": np.clip(age, 18, 80).round().astype(np.int64),
+        "annual_income": (np.clip(income, 8000, None) / 1000).round().astype(np.int64) * 1000,
+        "spending_score": np.clip(spending, 1, 100).round().astype(np.int64),
+        "gender": rng.choice(["Male", "Female"], size=n_rows),
+        "region": rng.choice(regions, size=n_rows, p=weights / weights.sum()),
+        "membership_tier": tier,
+        "visit_frequency": frequency,
+    })
+
+
+def write_customers_csv(path: Path, n_rows: int, cardinality: int = 8, seed: int = 0) -> Path:
+    """Write ``make_customers(n_rows, cardinality, seed)`` to a CSV file."""
+    make_customers(n_rows, cardinality, seed).to_csv(path, index=False)
+    return path
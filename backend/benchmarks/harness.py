@@ -0,0 +1,104 @@
+"""Timing, memory measurement and run metadata for the benchmarks."""
+import gc
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from importlib import metadata
+from typing import Any, Callable, Dict, Tuple
+
+from app.core.telemetry import peak_rss_bytes, reset_peak_rss
+
+PACKAGES = ("numpy", "scipy", "scikit-learn", "pandas", "pyarrow", "matplotlib", "sqlalchemy")
+
+
+def measure(
+    func: Callable[..., Any], *args: Any, repeat: int = 3, trace: bool = True, **kwargs: Any
+) -> Tuple[Dict[str, Any], Any]:
+    """
+    Time ``func(*args, **kwargs)`` and record its memory peaks.
+
+    The timed calls run without tracemalloc, which slows allocation-heavy
+    code down. One more call then runs under tracemalloc to find the peak of
+    Python and NumPy allocations.
+
+    Args:
+        func: Function to benchmark
+        *args: Positional arguments for ``func``
+        repeat: Number of timed calls
+        trace: Whether to make the extra tracemalloc call
+        **kwargs: Keyword arguments for ``func``
+
+    Returns:
+        Tuple of (measurements, result of the last call). Measurements are
+        ``seconds_min``, ``seconds_median``, ``seconds_max``, ``repeat``,
+        ``peak_rss_bytes`` and ``rss_growth_bytes`` (peak RSS over the
+        timed calls, and how far it rose above the RSS before them) and
+        ``traced_peak_bytes`` (``None`` without ``trace``)
+    """
+    gc.collect()
+    reset_peak_rss()
+    rss_before = peak_rss_bytes()
+
+    timings = []
+    result = None
+    for _ in range(max(1, repeat)):
+        result = None
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+    rss_peak = peak_rss_bytes()
+
+    traced_peak = None
+    if trace:
+        result = None
+        gc.collect()
+        tracemalloc.start()
+        try:
+            result = func(*args, **kwargs)
+            traced_peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "seconds_min": round(min(timings), 6),
+        "seconds_median": round(statistics.median(timings), 6),
+        "seconds_max": round(max(timings), 6),
+        "repeat": len(timings),
+        "peak_rss_bytes": rss_peak,
+        "rss_growth_bytes": max(0, rss_peak - rss_before),
+        "traced_peak_bytes": traced_peak,
+    }, result
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(
+            ["git", *args], capture_output=True, text=True, check=True, timeout=30
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def environment_info() -> Dict[str, Any]:
+    """Commit, interpreter, machine and library versions the results were taken with."""
+    packages = {}
+    for name in PACKAGES:
+        try:
+            packages[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            packages[name] = None
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git("rev-parse", "HEAD") or None,
+        "git_dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "packages": packages,
+    }
@@ -0,0 +1,148 @@
+"""Run the benchmark suite and write the results as JSON.
+
+Usage, from ``backend/``::
+
+    python -m benchmarks.run
+    python -m benchmarks.run --sizes 1000,10000 --cardinality 8,500 --repeat 5
+    python -m benchmarks.run --no-api --output /tmp/before.json
+
+The app runs against a SQLite database and upload/output directories in a
+scratch directory, so benchmarks never touch a real database.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.datasets import make_customers
+
+DEFAULT_SIZES = "1000,10000,100000,500000"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def _int_list(value: str) -> List[int]:
+    try:
+        return [int(item) for item in value.split(",") if item.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated integers, got {value!r}")
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=_int_list, default=_int_list(DEFAULT_SIZES),
+                        help=f"dataset row counts (default {DEFAULT_SIZES})")
+    parser.add_argument("--cardinality", type=_int_list, default=[8],
+                        help="distinct region values per dataset (default 8, as in the sample)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="timed calls per service benchmark (default 3)")
+    parser.add_argument("--n-clusters", type=int, default=5)
+    parser.add_argument("--exact-max-rows", type=int, default=10000,
+                        help="largest dataset to run exact linkage on (default 10000)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-api", action="store_true", help="skip the API flow")
+    parser.add_argument("--no-services", action="store_true",
+                        help="skip the service benchmarks")
+    parser.add_argument("--output", type=Path,
+                        help="results file (default benchmarks/results/<time>_<commit>.json)")
+    parser.add_argument("--keep-workdir", action="store_true",
+                        help="keep the scratch directory with datasets, database and outputs")
+    return parser.parse_args(argv)
+
+
+def configure_environment(workdir: Path) -> None:
+    """Point the app's settings at ``workdir``; must run before ``app`` is imported."""
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{workdir / 'benchmark.db'}"
+    os.environ["UPLOAD_DIR"] = str(workdir / "data")
+    os.environ["OUTPUT_DIR"] = str(workdir / "outputs")
+    os.environ["ORPHAN_SWEEP_ON_STARTUP"] = "false"
+
+
+def create_schema() -> None:
+    import asyncio
+
+    from app.db.base import Base
+    import app.db.models  # noqa: F401  (registers the tables)
+    from app.db.session import engine
+
+    async def create() -> None:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create())
+
+
+def _print_result(result: Dict[str, Any]) -> None:
+    peak = result.get("peak_rss_bytes")
+    print(
+        f"  {result['benchmark']:<34} {result['seconds_min']:>10.4f}s"
+        f"  peak rss {peak / 2**20 if peak else float('nan'):>8.1f} MiB",
+        flush=True,
+    )
+
+
+def main(argv: List[str] = None) -> int:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    workdir = Path(tempfile.mkdtemp(prefix="segmentation-bench-"))
+    configure_environment(workdir)
+    create_schema()
+
+    from app.core.config import settings
+    from benchmarks.harness import environment_info
+    from benchmarks.suites import api_benchmarks, service_benchmarks
+
+    info = environment_info()
+    info["settings"] = settings.model_dump(exclude={"DATABASE_URL", "UPLOAD_DIR", "OUTPUT_DIR"})
+    results = []
+    started = time.perf_counter()
+    try:
+        for cardinality in args.cardinality:
+            for n_rows in args.sizes:
+                print(f"{n_rows} rows, region cardinality {cardinality}", flush=True)
+                df = make_customers(n_rows, cardinality, args.seed)
+                labels = {"n_rows": n_rows, "cardinality": cardinality}
+
+                if not args.no_services:
+                    for result in service_benchmarks(
+                        df, args.n_clusters, args.repeat, args.exact_max_rows
+                    ):
+                        results.append({**labels, **result})
+                        _print_result(result)
+
+                if not args.no_api:
+                    csv_path = workdir / f"customers_{n_rows}_{cardinality}.csv"
+                    df.to_csv(csv_path, index=False)
+                    for result in api_benchmarks(csv_path, args.n_clusters):
+                        results.append({**labels, **result})
+                        _print_result(result)
+                    csv_path.unlink()
+    finally:
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output
+    if output is None:
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        output = RESULTS_DIR / f"{stamp}_{(info['git_commit'] or 'nogit')[:10]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    info["duration_seconds"] = round(time.perf_counter() - started, 1)
+    info["params"] = {
+        "sizes": args.sizes,
+        "cardinality": args.cardinality,
+        "repeat": args.repeat,
+        "n_clusters": args.n_clusters,
+        "exact_max_rows": args.exact_max_rows,
+        "seed": args.seed,
+    }
+    output.write_text(json.dumps({"meta": info, "results": results}, indent=2))
+    print(f"Wrote {len(results)} results to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Benchmarks of the pipeline's service functions and of the API flow.
+
+Settings are read when ``app`` is first imported, so this module is only
+imported once ``run.configure_environment`` has pointed them at a scratch
+directory.
+"""
+import itertools
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.schemas.clustering import ClusteringMode, ClusteringRequest
+from app.services.charts import chart_key, render_chart
+from app.services.clustering import (
+    generate_dendrogram,
+    generate_distribution_chart,
+    generate_scatter_plot,
+    get_flat_clusters,
+    perform_hierarchical_clustering,
+    perform_scalable_clustering,
+)
+from app.services.metrics import calculate_cluster_sizes, compile_metrics
+from app.services.pipeline import feature_dtype, resolve_clustering_mode, resolve_encoding
+from app.services.preprocessing import (
+    apply_preprocessing,
+    build_preprocessor,
+    detect_feature_types,
+)
+from benchmarks.harness import measure
+
+LINKAGE = "ward"
+
+_chart_ids = itertools.count()
+
+
+def _render(chart: str, generate: Callable[..., Any], *args: Any) -> Path:
+    # A fresh key per call, so every call renders instead of hitting the cache.
+    return render_chart(chart_key(0, chart, "benchmark", call=next(_chart_ids)), generate, *args)
+
+
+def service_benchmarks(
+    df: pd.DataFrame,
+    n_clusters: int,
+    repeat: int,
+    exact_max_rows: int,
+) -> List[Dict[str, Any]]:
+    """
+    Time the pipeline's service functions on one dataset.
+
+    Exact linkage needs memory quadratic in the rows, so it only runs up to
+    ``exact_max_rows``; scalable clustering runs whenever it would compress
+    the data. Metrics and charts use the clustering the pipeline itself
+    would pick for a ``mode=auto`` request.
+
+    Returns:
+        One result per benchmark
+    """
+    results = []
+
+    def record(name: str, measurements: Dict[str, Any], **extra: Any) -> None:
+        results.append({"benchmark": name, **extra, **measurements})
+
+    request = ClusteringRequest(dataset_id=0, n_clusters=n_clusters, mode=ClusteringMode.AUTO)
+    numeric_cols, categorical_cols = detect_feature_types(df)
+    max_categories, min_frequency = resolve_encoding(request)
+    dtype = feature_dtype()
+
+    def preprocess():
+        preprocessor = build_preprocessor(
+            numeric_cols, categorical_cols, max_categories, min_frequency, dtype
+        )
+        return apply_preprocessing(df, preprocessor, dtype)
+
+    measurements, data = measure(preprocess, repeat=repeat)
+    record("apply_preprocessing", measurements, n_encoded_features=int(data.shape[1]))
+
+    n_rows = data.shape[0]
+    linkages = {}
+    if n_rows <= exact_max_rows:
+        measurements, linkage_matrix = measure(
+            perform_hierarchical_clustering, data, LINKAGE, repeat=repeat
+        )
+        record("perform_hierarchical_clustering", measurements)
+        linkages[ClusteringMode.EXACT] = (linkage_matrix, None)
+
+    if n_rows > settings.SCALABLE_MICRO_CLUSTERS:
+        measurements, linkage_and_labels = measure(
+            perform_scalable_clustering,
+            data,
+            LINKAGE,
+            settings.SCALABLE_MICRO_CLUSTERS,
+            batch_size=settings.SCALABLE_BATCH_SIZE,
+            repeat=repeat,
+        )
+        record(
+            "perform_scalable_clustering",
+            measurements,
+            n_micro_clusters=settings.SCALABLE_MICRO_CLUSTERS,
+        )
+        linkages[ClusteringMode.SCALABLE] = linkage_and_labels
+
+    mode = resolve_clustering_mode(request, n_rows)
+    if mode not in linkages:
+        return results
+    linkage_matrix, micro_labels = linkages[mode]
+    labels = get_flat_clusters(linkage_matrix, n_clusters, micro_labels)
+
+    measurements, _ = measure(compile_metrics, data, labels, data.shape[1], repeat=repeat)
+    record("compile_metrics", measurements, clustering_mode=mode.value)
+
+    measurements, _ = measure(
+        _render, "dendrogram", generate_dendrogram, linkage_matrix, 0, LINKAGE, repeat=repeat
+    )
+    record("generate_dendrogram", measurements, clustering_mode=mode.value)
+
+    measurements, _ = measure(
+        _render,
+        "scatter",
+        generate_scatter_plot,
+        df["age"].to_numpy(),
+        df["annual_income"].to_numpy(),
+        labels,
+        "age",
+        "annual_income",
+        0,
+        repeat=repeat,
+    )
+    record("generate_scatter_plot", measurements)
+
+    # Sizes as stored in the run's JSON metrics, with string keys.
+    cluster_sizes = {str(k): v for k, v in calculate_cluster_sizes(labels).items()}
+    measurements, _ = measure(
+        _render, "distribution", generate_distribution_chart, cluster_sizes, 0, repeat=repeat
+    )
+    record("generate_distribution_chart", measurements)
+
+    return results
+
+
+def api_benchmarks(csv_path: Path, n_clusters: int) -> List[Dict[str, Any]]:
+    """
+    Time one pass through the API: upload, train, charts, segments, predict, delete.
+
+    Each step runs once, since the flow creates state and later calls of
+    the chart endpoints would be served from the chart cache. Training runs
+    in the worker pool, so its memory peak is the worker's, taken from the
+    run's ``metrics.peak_rss_bytes``; the other peaks are the API process's.
+
+    Returns:
+        One result per step, named ``api.<step>``
+    """
+    results = []
+
+    with TestClient(app) as client:
+
+        def step(name: str, method: str, url: str, expected: int = 200, **kwargs: Any):
+            measurements, response = measure(
+                client.request, method, url, repeat=1, trace=False, **kwargs
+            )
+            if response.status_code != expected:
+                raise RuntimeError(
+                    f"{method} {url} returned {response.status_code}: {response.text[:500]}"
+                )
+            results.append({"benchmark": f"api.{name}", **measurements})
+            return response
+
+        with open(csv_path, "rb") as f:
+            dataset = step(
+                "upload", "POST", "/api/v1/datasets/upload", expected=201,
+                files={"file": (csv_path.name, f, "text/csv")},
+            ).json()
+
+        run = step(
+            "train", "POST", "/api/v1/clustering/train", expected=201,
+            json={"dataset_id": dataset["id"], "n_clusters": n_clusters, "mode": "auto"},
+        ).json()
+        results[-1].update(
+            peak_rss_bytes=run["metrics"].get("peak_rss_bytes"),
+            rss_growth_bytes=None,
+            clustering_mode=run["metrics"].get("clustering_mode"),
+            stage_seconds=run["metrics"].get("stage_seconds"),
+        )
+
+        run_id = run["id"]
+        step("dendrogram", "GET", f"/api/v1/clustering/dendrogram/{run_id}")
+        step("scatter", "GET", f"/api/v1/clustering/scatter/{run_id}")
+        step("distribution", "GET", f"/api/v1/clustering/distribution/{run_id}")
+        step("segments_page", "GET", f"/api/v1/clustering/segments/{run_id}")
+
+        records = pd.read_csv(csv_path, nrows=1000).to_dict(orient="records")
+        step(
+            "predict", "POST", f"/api/v1/clustering/runs/{run_id}/predict",
+            json={"records": records},
+        )
+        step("delete_dataset", "DELETE", f"/api/v1/datasets/{dataset['id']}")
+
+    return results
@@ -0,0 +1,96 @@
+"""Test configuration.
+
+Settings are read when ``app`` is first imported, so they are pointed at a
+scratch directory here, before any test module imports the app. The tests
+never touch a real database or the ``data/`` and ``outputs/`` directories.
+"""
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+_WORKDIR = Path(tempfile.mkdtemp(prefix="segmentation-tests-"))
+
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_WORKDIR / 'test.db'}"
+os.environ["UPLOAD_DIR"] = str(_WORKDIR / "data")
+os.environ["OUTPUT_DIR"] = str(_WORKDIR / "outputs")
+os.environ["ORPHAN_SWEEP_ON_STARTUP"] = "false"
+os.environ["CLUSTERING_MAX_WORKERS"] = "1"
+os.environ["RENDER_MAX_WORKERS"] = "1"
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_WORKDIR, ignore_errors=True)
+
+
+async def _create_schema() -> None:
+    from app.db.base import Base
+    from app.db.session import engine
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    # The test client runs the app on its own event loop.
+    await engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def client():
+    """API client with the worker pools running, on an empty scratch database."""
+    from fastapi.testclient import TestClient
+
+    import app.db.models  # noqa: F401
+    from app.main import app
+
+    asyncio.run(_create_schema())
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def upload(client):
+    """Upload a DataFrame as a CSV dataset and return the dataset JSON."""
+
+    def _upload(frame, name="customers.csv"):
+        response = client.post(
+            "/api/v1/datasets/upload",
+            files={"file": (name, io.BytesIO(frame.to_csv(index=False).encode()), "text/csv")},
+        )
+        assert response.status_code in (200, 201), response.text
+        return response.json()
+
+    return _upload
+
+
+@pytest.fixture(scope="session")
+def train(client):
+    """Fit a clustering run through the API and return the run JSON."""
+
+    def _train(dataset_id, **params):
+        response = client.post(
+            "/api/v1/clustering/train", json={"dataset_id": dataset_id, **params}
+        )
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return _train
+
+
+@pytest.fixture(scope="session")
+def wait_for_job(client):
+    """Poll a background job until it finishes and return its final state."""
+
+    def _wait(job_id, timeout=60.0):
+        deadline = time.monotonic() + timeout
+        while True:
+            job = client.get(f"/api/v1/clustering/jobs/{job_id}").json()
+            if job["status"] in ("succeeded", "failed"):
+                return job
+            assert time.monotonic() < deadline, f"job {job_id} still {job['status']}"
+            time.sleep(0.05)
+
+    return _wait
@@ -0,0 +1,179 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+from sklearn.decomposition import PCA
+
+from app.core.config import settings
+from app.services.artifacts import (
+    MODEL_ARTIFACT_VERSION,
+    ModelRegistry,
+    RunModel,
+    load_model,
+    save_model,
+)
+from app.services.metrics import cluster_centroids
+from app.services.preprocessing import build_preprocessor
+
+NUMERIC = ["age", "income"]
+CATEGORICAL = ["region", "segment"]
+
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _customers(n_rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "age": rng.integers(18, 80, size=n_rows).astype(float),
+        "income": rng.lognormal(10, 0.5, size=n_rows),
+        "region": rng.choice(["north", "south", "east", "west", "islands"], size=n_rows,
+                             p=[0.4, 0.3, 0.15, 0.1, 0.05]),
+        "segment": rng.choice(["a", "b", "c"], size=n_rows),
+    })
+
+
+def _artifact(df: pd.DataFrame, use_pca: bool, max_categories=None) -> dict:
+    preprocessor = build_preprocessor(NUMERIC, CATEGORICAL, max_categories=max_categories)
+    data = preprocessor.fit_transform(df)
+    data = data.toarray() if sparse.issparse(data) else np.asarray(data)
+    pca = None
+    if use_pca:
+        pca = PCA(n_components=3, random_state=0).fit(data)
+        data = pca.transform(data)
+
+    labels = np.random.default_rng(1).integers(4, size=len(df))
+    cluster_labels, centroids = cluster_centroids(data, labels)
+    return {
+        "version": MODEL_ARTIFACT_VERSION,
+        "preprocessor": preprocessor,
+        "pca": pca,
+        "numeric_cols": NUMERIC,
+        "categorical_cols": CATEGORICAL,
+        "linkage": "ward",
+        "n_clusters": 4,
+        "cluster_labels": cluster_labels.astype(np.int32),
+        "centroids": centroids,
+    }
+
+
+def _reference_predict(artifact: dict, frame: pd.DataFrame):
+    data = artifact["preprocessor"].transform(frame)
+    data = data.toarray() if sparse.issparse(data) else np.asarray(data)
+    if artifact["pca"] is not None:
+        data = artifact["pca"].transform(data)
+    distances = np.linalg.norm(data[:, None, :] - artifact["centroids"][None, :, :], axis=2)
+    nearest = distances.argmin(axis=1)
+    return artifact["cluster_labels"][nearest], distances[np.arange(len(data)), nearest]
+
+
+def _new_records() -> pd.DataFrame:
+    records = _customers(50, seed=2)
+    # Values the preprocessor never saw while fitting.
+    records.loc[0, "region"] = "atlantis"
+    records.loc[1, "segment"] = "z"
+    records.loc[2, ["region", "segment"]] = ["mars", "q"]
+    return records
+
+
+@pytest.mark.parametrize("use_pca", [False, True])
+@pytest.mark.parametrize("max_categories", [None, 3])
+def test_predict_matches_pipeline_and_nearest_centroid(use_pca, max_categories):
+    artifact = _artifact(_customers(300, seed=0), use_pca, max_categories)
+    records = _new_records()
+
+    model = RunModel(artifact)
+    labels, distances = model.predict(records)
+
+    assert model.compiled
+    expected_labels, expected_distances = _reference_predict(artifact, records)
+    np.testing.assert_array_equal(labels, expected_labels)
+    np.testing.assert_allclose(distances, expected_distances, atol=1e-8)
+
+
+def test_unseen_category_encodes_as_zeros_without_grouping():
+    artifact = _artifact(_customers(300, seed=0), use_pca=False)
+    model = RunModel(artifact)
+    records = _new_records().iloc[:2]
+
+    data = model.transform(records)
+
+    # Scaled numeric columns come first, then the region one-hot columns.
+    region_columns = data[0, len(NUMERIC):len(NUMERIC) + 5]
+    np.testing.assert_array_equal(region_columns, np.zeros(5))
+
+
+def test_uncompiled_transform_matches_compiled():
+    artifact = _artifact(_customers(300, seed=0), use_pca=True)
+    records = _new_records()
+
+    compiled = RunModel(artifact)
+    fallback = RunModel(artifact)
+    fallback.compiled = False
+
+    np.testing.assert_allclose(
+        fallback.transform(records), compiled.transform(records), atol=1e-8
+    )
+    np.testing.assert_array_equal(fallback.predict(records)[0], compiled.predict(records)[0])
+
+
+def test_transform_rejects_missing_columns_and_values():
+    model = RunModel(_artifact(_customers(100, seed=0), use_pca=False))
+    records = _new_records()
+
+    with pytest.raises(ValueError, match="Missing feature columns: income"):
+        model.transform(records.drop(columns=["income"]))
+
+    records.loc[3, "age"] = np.nan
+    with pytest.raises(ValueError, match="finite"):
+        model.transform(records)
+
+
+def test_saved_model_loads_back(output_dir):
+    artifact = _artifact(_customers(100, seed=0), use_pca=False)
+
+    path = save_model(7, artifact)
+
+    assert path.endswith("run_7.joblib")
+    loaded = load_model(path)
+    np.testing.assert_array_equal(loaded["centroids"], artifact["centroids"])
+    records = _new_records()
+    np.testing.assert_array_equal(
+        RunModel(loaded).predict(records)[0], RunModel(artifact).predict(records)[0]
+    )
+
+
+def test_old_artifact_versions_are_rejected(output_dir):
+    artifact = _artifact(_customers(100, seed=0), use_pca=False)
+    path = save_model(7, {**artifact, "version": MODEL_ARTIFACT_VERSION - 1})
+
+    with pytest.raises(ValueError, match="Unsupported model artifact version"):
+        load_model(path)
+    with pytest.raises(FileNotFoundError):
+        load_model(str(output_dir / "gone.joblib"))
+
+
+def test_registry_reuses_loaded_models_until_the_file_changes(output_dir):
+    artifact = _artifact(_customers(100, seed=0), use_pca=False)
+    first, second = save_model(1, artifact), save_model(2, artifact)
+    registry = ModelRegistry(max_models=1)
+
+    model = registry.get(first)
+    assert registry.get(first) is model
+
+    registry.get(second)
+    assert registry.get(first) is not model
+
+    model = registry.get(first)
+    stat = os.stat(first)
+    os.utime(first, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert registry.get(first) is not model
+
+    os.remove(first)
+    with pytest.raises(FileNotFoundError):
+        registry.get(first)
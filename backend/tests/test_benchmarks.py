@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from benchmarks import compare
+from benchmarks.datasets import make_customers, region_names
+from benchmarks.harness import environment_info, measure
+
+
+def _row(name, seconds, peak_rss=1000, n_rows=1000, cardinality=8):
+    return {
+        "benchmark": name,
+        "n_rows": n_rows,
+        "cardinality": cardinality,
+        "seconds_min": seconds,
+        "seconds_median": seconds,
+        "seconds_max": seconds,
+        "peak_rss_bytes": peak_rss,
+    }
+
+
+def _write(path, rows):
+    meta = {"git_commit": "abc", "created_at": "2026-01-01T00:00:00+00:00",
+            "packages": {"numpy": "1", "scipy": "1", "scikit-learn": "1"}}
+    path.write_text(json.dumps({"meta": meta, "results": rows}))
+    return path
+
+
+def _results(*rows):
+    return {(row["benchmark"], row["n_rows"], row["cardinality"]): row for row in rows}
+
+
+def test_compare_flags_only_slowdowns_above_threshold():
+    baseline = _results(_row("fit", 1.0), _row("cut", 1.0), _row("plot", 1.0))
+    current = _results(_row("fit", 1.25), _row("cut", 1.1), _row("plot", 0.5))
+
+    rows, regressions = compare.compare(baseline, current, "seconds_min", 0.2, memory=False)
+
+    assert regressions == 1
+    assert [(row[0], row[5], row[-1]) for row in rows] == [
+        ("cut", "+10.0%", ""),
+        ("fit", "+25.0%", "REGRESSION"),
+        ("plot", "-50.0%", ""),
+    ]
+
+
+def test_memory_growth_counts_only_when_asked():
+    baseline = _results(_row("fit", 1.0, peak_rss=1000))
+    current = _results(_row("fit", 1.0, peak_rss=2000))
+
+    assert compare.compare(baseline, current, "seconds_min", 0.2, memory=False)[1] == 0
+    assert compare.compare(baseline, current, "seconds_min", 0.2, memory=True)[1] == 1
+
+
+def test_benchmarks_in_one_file_only_are_skipped():
+    baseline = _results(_row("fit", 1.0), _row("fit", 1.0, n_rows=5000))
+    current = _results(_row("fit", 1.0), _row("sweep", 9.0))
+
+    rows, regressions = compare.compare(baseline, current, "seconds_min", 0.2, memory=False)
+
+    assert [row[:2] for row in rows] == [["fit", "1000"]]
+    assert regressions == 0
+
+
+def test_main_exit_status_gates_on_regressions(tmp_path, capsys):
+    baseline = _write(tmp_path / "before.json", [_row("fit", 1.0)])
+    slower = _write(tmp_path / "slower.json", [_row("fit", 2.0)])
+    same = _write(tmp_path / "same.json", [_row("fit", 1.05)])
+
+    assert compare.main([str(baseline), str(slower)]) == 1
+    assert "1 regressions above 20%" in capsys.readouterr().out
+    assert compare.main([str(baseline), str(same)]) == 0
+    assert compare.main([str(baseline), str(slower), "--threshold", "1.5"]) == 0
+
+
+def test_measure_times_every_call_and_traces_one_more():
+    calls = []
+
+    measurements, result = measure(lambda n: calls.append(n) or n * 2, 21, repeat=4)
+
+    assert result == 42
+    assert len(calls) == 5
+    assert measurements["repeat"] == 4
+    assert 0 <= measurements["seconds_min"] <= measurements["seconds_median"]
+    assert measurements["seconds_median"] <= measurements["seconds_max"]
+    assert measurements["traced_peak_bytes"] is not None
+
+
+def test_measure_without_trace():
+    measurements, _ = measure(lambda: None, repeat=2, trace=False)
+
+    assert measurements["repeat"] == 2
+    assert measurements["traced_peak_bytes"] is None
+
+
+def test_environment_info_lists_packages():
+    info = environment_info()
+
+    assert info["packages"]["numpy"]
+    assert set(info) >= {"created_at", "git_commit", "python", "cpu_count"}
+
+
+@pytest.mark.parametrize("cardinality", [3, 8, 40])
+def test_customers_are_reproducible(cardinality):
+    first = make_customers(500, cardinality=cardinality, seed=3)
+
+    assert first.equals(make_customers(500, cardinality=cardinality, seed=3))
+    assert not first.equals(make_customers(500, cardinality=cardinality, seed=4))
+    assert set(first["region"]) <= set(region_names(cardinality))
+    assert len(region_names(cardinality)) == cardinality
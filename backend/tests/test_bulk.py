@@ -0,0 +1,74 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+from app.db.bulk import bulk_insert_assignments
+from app.db.models import ClusterAssignment, ClusteringRun, Dataset
+
+N_ROWS = 23
+
+
+def _insert(tmp_path, labels, frame=None, chunk_size=None):
+    async def _run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'bulk.db'}")
+        try:
+            async with engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                dataset = Dataset(name="d.csv", file_path="d.csv")
+                db.add(dataset)
+                await db.flush()
+                run = ClusteringRun(dataset_id=dataset.id, linkage="ward", n_clusters=3)
+                db.add(run)
+                await db.flush()
+
+                written = await bulk_insert_assignments(db, run.id, labels, frame, chunk_size)
+                await db.commit()
+
+                result = await db.execute(
+                    select(ClusterAssignment).order_by(ClusterAssignment.row_index)
+                )
+                return written, run.id, result.scalars().all()
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(_run())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, N_ROWS, 1000])
+def test_every_row_is_written_once_in_order(tmp_path, chunk_size):
+    labels = np.random.default_rng(0).integers(3, size=N_ROWS)
+
+    written, run_id, rows = _insert(tmp_path, labels, chunk_size=chunk_size)
+
+    assert written == N_ROWS
+    assert [row.row_index for row in rows] == list(range(N_ROWS))
+    assert [row.cluster_label for row in rows] == labels.tolist()
+    assert {row.run_id for row in rows} == {run_id}
+    assert all(row.payload is None for row in rows)
+
+
+def test_payloads_come_from_the_frame(tmp_path):
+    frame = pd.DataFrame({
+        "age": np.arange(N_ROWS, dtype=float),
+        "region": [f"r{i % 4}" for i in range(N_ROWS)],
+    })
+    frame.loc[3, "age"] = np.nan
+
+    _, _, rows = _insert(tmp_path, np.zeros(N_ROWS, dtype=int), frame, chunk_size=5)
+
+    assert rows[0].payload == {"age": 0.0, "region": "r0"}
+    assert rows[3].payload == {"age": None, "region": "r3"}
+    assert rows[-1].payload == {"age": float(N_ROWS - 1), "region": f"r{(N_ROWS - 1) % 4}"}
+
+
+def test_nothing_to_write(tmp_path):
+    written, _, rows = _insert(tmp_path, np.array([], dtype=int))
+
+    assert written == 0
+    assert rows == []
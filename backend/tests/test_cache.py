@@ -0,0 +1,131 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.schemas.clustering import ClusteringRequest
+from app.services import pipeline
+from app.services.cache import DiskCache, content_key
+from benchmarks.datasets import make_customers, write_customers_csv
+
+
+def _put(cache, key, size):
+    return cache.put(key, lambda path: path.write_bytes(b"x" * size))
+
+
+def test_content_key_is_stable_and_order_sensitive():
+    assert content_key("a", 1, {"b": 2, "c": 3}) == content_key("a", 1, {"c": 3, "b": 2})
+    assert content_key("a", 1) != content_key(1, "a")
+
+
+def test_least_recently_read_entries_are_evicted(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=250, suffix=".bin")
+    for i, key in enumerate(["a", "b"]):
+        path = _put(cache, key, 100)
+        os.utime(path, (time.time() - 100 + i, path.stat().st_mtime))
+    cache.get("a")
+
+    _put(cache, "c", 100)
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert cache.size() == 200
+
+
+def test_failed_write_leaves_no_entry(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=1000, suffix=".bin")
+
+    def write(path):
+        path.write_bytes(b"partial")
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        cache.put("a", write)
+
+    assert cache.get("a") is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_discard_prefix(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=1000, suffix=".png")
+    for key in ["run_1_a", "run_1_b", "run_12_a"]:
+        _put(cache, key, 1)
+
+    cache.discard_prefix("run_1_")
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["run_12_a.png"]
+
+
+@pytest.fixture
+def dataset_csv(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", str(tmp_path / "outputs"))
+    return str(write_customers_csv(tmp_path / "customers.csv", 400, seed=41))
+
+
+def test_linkage_key_ignores_only_the_cluster_count(dataset_csv):
+    base = ClusteringRequest(dataset_id=1, n_clusters=3)
+    key = pipeline.linkage_cache_key(dataset_csv, base)
+
+    def changed(**params):
+        request = ClusteringRequest(**{**base.model_dump(), **params})
+        return pipeline.linkage_cache_key(dataset_csv, request)
+
+    assert changed(n_clusters=7) == key
+    assert changed(linkage="average") != key
+    assert changed(use_pca=True, pca_components=3) != key
+    assert changed(mode="scalable") != key
+    assert changed(max_categories=4) != key
+    assert changed(out_of_core=True) != key
+    assert pipeline.linkage_cache_key(dataset_csv, base, content_hash="abc") != key
+
+
+def test_second_fit_loads_the_cached_tree(dataset_csv):
+    request = ClusteringRequest(dataset_id=1, n_clusters=3)
+
+    fitted, hit = pipeline.load_or_fit_linkage(dataset_csv, request)
+    cached, cached_hit = pipeline.load_or_fit_linkage(
+        dataset_csv, ClusteringRequest(dataset_id=1, n_clusters=5)
+    )
+
+    assert (hit, cached_hit) == (False, True)
+    np.testing.assert_array_equal(cached["linkage_matrix"], fitted["linkage_matrix"])
+    assert cached["numeric_cols"] == fitted["numeric_cols"]
+
+
+def test_corrupt_cache_entry_is_refitted(dataset_csv):
+    request = ClusteringRequest(dataset_id=1, n_clusters=3)
+    pipeline.load_or_fit_linkage(dataset_csv, request)
+    key = pipeline.linkage_cache_key(dataset_csv, request)
+    pipeline.linkage_cache().path_for(key).write_bytes(b"not a joblib file")
+
+    fitted, hit = pipeline.load_or_fit_linkage(dataset_csv, request)
+
+    assert hit is False
+    assert fitted["linkage_matrix"].shape == (399, 4)
+    assert pipeline.load_or_fit_linkage(dataset_csv, request)[1] is True
+
+
+def test_recut_reuses_the_tree(client, upload, train):
+    dataset = upload(make_customers(300, seed=42), "recut.csv")
+    run = train(dataset["id"], n_clusters=3, linkage="complete")
+
+    response = client.post(
+        f"/api/v1/clustering/runs/{run['id']}/recut", json={"n_clusters": 6}
+    )
+
+    assert response.status_code == 201
+    recut = response.json()
+    assert recut["id"] != run["id"]
+    assert recut["n_clusters"] == 6
+    assert recut["linkage"] == "complete"
+    assert recut["metrics"]["linkage_cache_hit"] is True
+    assert len(recut["metrics"]["cluster_sizes"]) == 6
+
+
+def test_recut_of_unknown_run(client):
+    response = client.post("/api/v1/clustering/runs/999999/recut", json={"n_clusters": 3})
+
+    assert response.status_code == 404
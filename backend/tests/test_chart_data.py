@@ -0,0 +1,122 @@
+import base64
+
+import numpy as np
+import pytest
+from scipy.cluster.hierarchy import dendrogram, linkage
+
+from app.services.chart_data import dendrogram_data, distribution_data, quantize, scatter_data
+from benchmarks.datasets import make_customers
+
+
+def _decode(encoded, lower, upper):
+    steps = np.frombuffer(base64.b64decode(encoded), dtype="<u2")
+    return lower + steps / np.iinfo(np.uint16).max * (upper - lower)
+
+
+def test_quantized_values_round_trip_within_one_step():
+    values = np.random.default_rng(0).uniform(-50, 250, size=1000)
+
+    decoded = _decode(quantize(values, -50.0, 250.0), -50.0, 250.0)
+
+    np.testing.assert_allclose(decoded, values, atol=300 / 65535)
+
+
+def test_constant_values_quantize_to_zero():
+    assert _decode(quantize(np.full(3, 7.0), 7.0, 7.0), 7.0, 7.0).tolist() == [7.0] * 3
+
+
+def test_scatter_data_groups_points_by_cluster():
+    x = np.array([1.0, 2.0, np.nan, 4.0, 5.0])
+    y = np.array([10.0, 20.0, 30.0, 40.0, 50.0])
+
+    data = scatter_data(x, y, np.array([0, 1, 0, 1, 1]), max_points=100)
+
+    assert data["encoding"] == "json"
+    assert data["x_range"] == [1.0, 5.0]
+    assert (data["n_points"], data["n_shown"]) == (4, 4)
+    assert data["clusters"] == [
+        {"label": 0, "count": 1, "x": [1.0], "y": [10.0]},
+        {"label": 1, "count": 3, "x": [2.0, 4.0, 5.0], "y": [20.0, 40.0, 50.0]},
+    ]
+
+
+def test_scatter_data_respects_the_point_budget():
+    rng = np.random.default_rng(1)
+    x, y = rng.normal(size=(2, 20000))
+    labels = rng.integers(4, size=20000)
+
+    data = scatter_data(x, y, labels, max_points=1000, quantized=True)
+
+    assert data["encoding"] == "uint16"
+    assert data["n_shown"] <= 1000
+    assert sum(cluster["count"] for cluster in data["clusters"]) == 20000
+    decoded = [len(base64.b64decode(cluster["x"])) // 2 for cluster in data["clusters"]]
+    assert sum(decoded) == data["n_shown"]
+
+
+def test_scatter_data_without_numeric_rows():
+    with pytest.raises(ValueError, match="No rows with numeric values"):
+        scatter_data(np.full(2, np.nan), np.ones(2), np.zeros(2), 10)
+
+
+@pytest.mark.parametrize("n_leaves,max_leaves,truncated", [(20, 50, False), (200, 30, True)])
+def test_dendrogram_data_matches_scipy(n_leaves, max_leaves, truncated):
+    data = np.random.default_rng(2).normal(size=(n_leaves, 3))
+    linkage_matrix = linkage(data, "ward")
+
+    result = dendrogram_data(linkage_matrix, max_leaves)
+
+    expected = dendrogram(linkage_matrix, no_plot=True, p=max_leaves, show_contracted=True,
+                          truncate_mode="lastp" if truncated else None,
+                          color_threshold=0.7 * linkage_matrix[:, 2].max())
+    assert result["truncated"] is truncated
+    assert result["n_leaves"] == n_leaves
+    assert result["icoord"] == expected["icoord"]
+    assert len(result["leaf_labels"]) == min(n_leaves, max_leaves)
+
+
+def test_distribution_data_shares():
+    data = distribution_data({"0": 30, "2": 10, "1": 60})
+
+    assert data["n_samples"] == 100
+    assert [(c["label"], c["fraction"]) for c in data["clusters"]] == [
+        (0, 0.3), (1, 0.6), (2, 0.1)
+    ]
+
+
+@pytest.fixture(scope="module")
+def data_run(upload, train):
+    dataset = upload(make_customers(400, seed=81), "chart_data.csv")
+    return train(dataset["id"], n_clusters=3)
+
+
+def test_chart_data_endpoints(client, data_run):
+    base = "/api/v1/clustering"
+    run_id = data_run["id"]
+
+    tree = client.get(f"{base}/dendrogram/{run_id}/data", params={"max_leaves": 10}).json()
+    scatter = client.get(f"{base}/scatter/{run_id}/data",
+                         params={"x_feature": "age", "y_feature": "annual_income"}).json()
+    shares = client.get(f"{base}/distribution/{run_id}/data").json()
+
+    assert tree["truncated"] is True
+    assert len(tree["leaf_labels"]) == 10
+    assert (scatter["x_feature"], scatter["y_feature"]) == ("age", "annual_income")
+    assert scatter["n_points"] == 400
+    assert shares["n_samples"] == 400
+    sizes = data_run["metrics"]["cluster_sizes"]
+    assert {str(c["label"]): c["count"] for c in shares["clusters"]} == sizes
+
+
+def test_scatter_data_rejects_unknown_features(client, data_run):
+    response = client.get(f"/api/v1/clustering/scatter/{data_run['id']}/data",
+                          params={"x_feature": "region"})
+
+    assert response.status_code == 400
+
+
+def test_scatter_data_is_gzipped(client, data_run):
+    response = client.get(f"/api/v1/clustering/scatter/{data_run['id']}/data",
+                          headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
@@ -0,0 +1,154 @@
+from datetime import datetime
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+
+from app.api import routes
+from app.services.charts import (
+    chart_cache,
+    chart_etag,
+    chart_key,
+    get_cached_chart,
+    purge_run_charts,
+    run_version,
+)
+from benchmarks.datasets import make_customers
+
+
+def _run(created_at="2026-01-01 10:00:00", labels_path="a.csv.run_1.labels.npy"):
+    return SimpleNamespace(created_at=created_at, labels_path=labels_path)
+
+
+def test_chart_key_depends_on_run_chart_and_params():
+    version = run_version(_run())
+    key = chart_key(1, "scatter", version, x_feature="age")
+
+    assert key.startswith("run_1_scatter_")
+    assert chart_key(1, "scatter", version, x_feature="age") == key
+    assert chart_key(1, "scatter", version, x_feature="income") != key
+    assert chart_key(1, "distribution", version) != chart_key(2, "distribution", version)
+    assert chart_etag(key) == f'"{key.rsplit("_", 1)[-1]}"'
+
+
+@pytest.mark.parametrize("other", [
+    _run(created_at="2026-01-01 10:00:01"),
+    _run(labels_path="b.csv.run_1.labels.npy"),
+    _run(created_at=datetime(2026, 1, 1, 10), labels_path=None),
+])
+def test_reused_run_id_gets_a_new_key(other):
+    old = chart_key(1, "distribution", run_version(_run()))
+    new = chart_key(1, "distribution", run_version(other))
+
+    assert new != old
+    assert chart_etag(new) != chart_etag(old)
+
+
+def test_purge_removes_only_that_runs_charts():
+    cache = chart_cache()
+    keys = [chart_key(run_id, "distribution", "v") for run_id in (1, 11)]
+    for key in keys:
+        cache.put(key, lambda path: path.write_bytes(b"png"))
+
+    purge_run_charts(1)
+
+    assert get_cached_chart(keys[0]) is None
+    assert get_cached_chart(keys[1]) is not None
+
+
+@pytest.fixture(scope="module")
+def chart_run(upload, train):
+    dataset = upload(make_customers(300, seed=71), "charts.csv")
+    return train(dataset["id"], n_clusters=3)
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    calls = []
+    render = routes.render
+
+    async def spy(key, *args, **kwargs):
+        calls.append(key)
+        return await render(key, *args, **kwargs)
+
+    monkeypatch.setattr(routes, "render", spy)
+    return calls
+
+
+@pytest.mark.parametrize("chart", ["distribution", "scatter", "dendrogram"])
+def test_chart_is_rendered_once_and_revalidated(client, chart_run, renders, chart):
+    url = f"/api/v1/clustering/{chart}/{chart_run['id']}"
+
+    first = client.get(url)
+    second = client.get(url)
+
+    assert first.status_code == second.status_code == 200
+    assert first.headers["content-type"] == "image/png"
+    assert first.content == second.content
+    assert len(renders) <= 1
+    etag = first.headers["etag"]
+    assert second.headers["etag"] == etag
+    assert second.headers["cache-control"] == "no-cache"
+
+    not_modified = client.get(url, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+    assert not_modified.content == b""
+
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_if_modified_since(client, chart_run):
+    url = f"/api/v1/clustering/distribution/{chart_run['id']}"
+    client.get(url)
+
+    later = formatdate(usegmt=True)
+    earlier = formatdate(0, usegmt=True)
+
+    assert client.get(url, headers={"If-Modified-Since": later}).status_code == 304
+    assert client.get(url, headers={"If-Modified-Since": earlier}).status_code == 200
+
+
+def test_chart_parameters_get_their_own_etag(client, chart_run):
+    url = f"/api/v1/clustering/scatter/{chart_run['id']}"
+
+    default = client.get(url)
+    binned = client.get(url, params={"mode": "binned"})
+
+    assert binned.status_code == 200
+    assert binned.headers["etag"] != default.headers["etag"]
+
+
+def test_unknown_run_has_no_chart(client):
+    assert client.get("/api/v1/clustering/distribution/999999").status_code == 404
+
+
+def test_recreated_run_gets_a_fresh_etag(client, upload, train):
+    old_dataset = upload(make_customers(200, seed=72), "reused_old.csv")
+    old_run = train(old_dataset["id"], n_clusters=3)
+    url = f"/api/v1/clustering/distribution/{old_run['id']}"
+    old_etag = client.get(url).headers["etag"]
+
+    assert client.delete(f"/api/v1/datasets/{old_dataset['id']}").status_code == 200
+    new_dataset = upload(make_customers(200, seed=73), "reused_new.csv")
+    new_run = train(new_dataset["id"], n_clusters=4)
+
+    # SQLite hands the deleted run's id to the next run.
+    assert new_run["id"] == old_run["id"]
+    response = client.get(url, headers={"If-None-Match": old_etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != old_etag
+
+
+def test_dendrogram_is_rendered_on_first_request(client, upload, train):
+    dataset = upload(make_customers(150, seed=74), "lazy.csv")
+    run = train(dataset["id"], n_clusters=3)
+
+    def rendered():
+        return list(chart_cache().directory.glob(f"run_{run['id']}_dendrogram_*.png"))
+
+    assert run["dendrogram_path"] is None
+    assert rendered() == []
+
+    assert client.get(f"/api/v1/clustering/dendrogram/{run['id']}").status_code == 200
+    assert len(rendered()) == 1
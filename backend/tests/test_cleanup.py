@@ -0,0 +1,164 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.services import cleanup
+from app.services.cleanup import (
+    _CHART,
+    _LEGACY_CHART,
+    _MODEL,
+    _SCORES,
+    _SCORES_PARTIAL,
+    _SIDECAR,
+    _orphaned,
+    _sweep,
+)
+from app.services.io import parquet_path_for
+from benchmarks.datasets import make_customers
+
+LIVE_RUNS = {12}
+
+
+def _touch(directory, name, age_seconds=3600.0):
+    path = directory / name
+    path.write_bytes(b"")
+    mtime = time.time() - age_seconds
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def _orphan_names(tmp_path, pattern, names, run_ids=LIVE_RUNS):
+    paths = [_touch(tmp_path, name) for name in names]
+    cutoff = time.time() - cleanup.ORPHAN_MIN_AGE_SECONDS
+    return sorted(path.name for path in _orphaned(paths, pattern, run_ids, cutoff))
+
+
+def test_sidecar_run_id_comes_from_the_suffix(tmp_path):
+    names = [
+        # User-chosen dataset names that contain "run_<n>" themselves.
+        "ab12_run_5_export.csv.run_12.labels.npy",
+        "run_7.csv.run_12.linkage.npy",
+        "x.run_12.labels.npy.run_3.labels.npy",
+        "ab12_run_12_export.csv.run_5.labels.npy",
+        "plain.csv.run_9.linkage.npy",
+    ]
+
+    assert _orphan_names(tmp_path, _SIDECAR, names) == [
+        "ab12_run_12_export.csv.run_5.labels.npy",
+        "plain.csv.run_9.linkage.npy",
+        "x.run_12.labels.npy.run_3.labels.npy",
+    ]
+
+
+def test_sidecar_pattern_ignores_other_files(tmp_path):
+    names = [
+        "data.csv",
+        "data.parquet",
+        "data.csv.run_5.labels.npy.bak",
+        "data.csv.run_5.scores.npy",
+        "data.csv.run_x.labels.npy",
+    ]
+
+    assert _orphan_names(tmp_path, _SIDECAR, names) == []
+
+
+@pytest.mark.parametrize("pattern,orphans,kept", [
+    (
+        _MODEL,
+        ["run_5.joblib"],
+        ["run_12.joblib", "run_5.joblib.bak", "old_run_5.joblib", "run_5a.joblib"],
+    ),
+    (
+        _SCORES,
+        ["run_5_0a1b2c.parquet"],
+        ["run_12_0a1b2c.parquet", "run_5_0a1b2c.parquet.tmp", "xrun_5_0a1b.parquet",
+         "run_5_XYZ.parquet"],
+    ),
+    (
+        _SCORES_PARTIAL,
+        [".run_5_0a1b.part0.parquet", ".run_5_0a1b.parquet.tmp"],
+        [".run_12_0a1b.part3.parquet", "run_5_0a1b.part0.parquet", ".run_5_0a1b.parquet"],
+    ),
+    (
+        _CHART,
+        ["run_5_scatter_3f2a.png"],
+        ["run_12_dendrogram_aa.png", "scatter_run_5.png", "run_5_scatter.png.tmp"],
+    ),
+    (
+        _LEGACY_CHART,
+        ["dendrogram_run_5.png", "scatter_plot_run_5.png", "distribution_run_5.png"],
+        ["dendrogram_run_12.png", "my_scatter_plot_run_5.png", "dendrogram_run_5.png.bak",
+         "heatmap_run_5.png"],
+    ),
+])
+def test_patterns_match_only_their_own_files(tmp_path, pattern, orphans, kept):
+    assert _orphan_names(tmp_path, pattern, orphans + kept) == sorted(orphans)
+
+
+def test_recent_files_are_kept(tmp_path):
+    fresh = _touch(tmp_path, "run_5.joblib", age_seconds=10)
+    stale = _touch(tmp_path, "run_6.joblib")
+    cutoff = time.time() - cleanup.ORPHAN_MIN_AGE_SECONDS
+
+    assert _orphaned([fresh, stale], _MODEL, set(), cutoff) == [stale]
+
+
+def test_vanished_files_are_skipped(tmp_path):
+    gone = tmp_path / "run_5.joblib"
+
+    assert _orphaned([gone], _MODEL, set(), time.time()) == []
+
+
+def test_sweep_removes_only_orphans(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(settings, "OUTPUT_DIR", str(tmp_path / "outputs"))
+    directories = {
+        name: settings.output_path / name for name in ("models", "scores", "chart_cache")
+    }
+    for directory in directories.values():
+        directory.mkdir()
+    orphans = [
+        _touch(directories["models"], "run_5.joblib"),
+        _touch(directories["scores"], "run_5_0a1b.parquet"),
+        _touch(directories["chart_cache"], "run_5_scatter_3f2a.png"),
+        _touch(settings.output_path, "dendrogram_run_5.png"),
+        _touch(settings.upload_path, "data.csv.run_5.labels.npy"),
+    ]
+    kept = [
+        _touch(directories["models"], "run_12.joblib"),
+        _touch(directories["models"], "run_6.joblib", age_seconds=10),
+        _touch(settings.upload_path, "data.csv"),
+        _touch(settings.upload_path, "data.csv.run_12.labels.npy"),
+    ]
+
+    assert _sweep(LIVE_RUNS) == len(orphans)
+    assert not any(path.exists() for path in orphans)
+    assert all(path.exists() for path in kept)
+
+
+def test_deleting_a_dataset_removes_its_runs_and_files(client, upload, train):
+    dataset = upload(make_customers(200, seed=101), "deleted.csv")
+    run = train(dataset["id"], n_clusters=3)
+    assert client.get(f"/api/v1/clustering/dendrogram/{run['id']}").status_code == 200
+    charts = list((settings.output_path / "chart_cache").glob(f"run_{run['id']}_*.png"))
+    files = [
+        Path(dataset["file_path"]),
+        parquet_path_for(dataset["file_path"]),
+        Path(run["model_path"]),
+        *Path(dataset["file_path"]).parent.glob(Path(dataset["file_path"]).name + ".run_*"),
+        *charts,
+    ]
+    assert charts and all(path.exists() for path in files)
+
+    response = client.delete(f"/api/v1/datasets/{dataset['id']}")
+
+    assert response.status_code == 200
+    assert not any(path.exists() for path in files)
+    datasets = client.get("/api/v1/datasets").json()["datasets"]
+    assert dataset["id"] not in [item["id"] for item in datasets]
+    assert client.get(f"/api/v1/clustering/runs/{dataset['id']}").status_code == 404
+    assert client.get(f"/api/v1/clustering/dendrogram/{run['id']}").status_code == 404
+    assert client.delete(f"/api/v1/datasets/{dataset['id']}").status_code == 404
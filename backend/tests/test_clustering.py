@@ -0,0 +1,174 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from sklearn.metrics import adjusted_rand_score
+
+from app.core.config import settings
+from app.schemas.clustering import ClusteringMode, ClusteringRequest
+from app.services.clustering import (
+    downsample_per_cluster,
+    generate_scatter_plot,
+    get_flat_clusters,
+    perform_hierarchical_clustering,
+    perform_scalable_clustering,
+    resolve_scatter_mode,
+)
+from app.services.pipeline import resolve_clustering_mode
+from benchmarks.datasets import make_customers
+
+
+def _blobs(n_samples: int, n_clusters: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(scale=10.0, size=(n_clusters, 4))
+    truth = rng.integers(n_clusters, size=n_samples)
+    return centers[truth] + rng.normal(size=(n_samples, 4)), truth
+
+
+def test_scalable_clustering_labels_every_row():
+    data, truth = _blobs(5000, 4)
+
+    linkage_matrix, micro_labels = perform_scalable_clustering(data, "ward", 64)
+    labels = get_flat_clusters(linkage_matrix, 4, micro_labels)
+
+    assert linkage_matrix.shape == (micro_labels.max(), 4)
+    assert micro_labels.shape == (5000,)
+    assert labels.shape == (5000,)
+    assert set(labels) == {0, 1, 2, 3}
+    assert adjusted_rand_score(truth, labels) > 0.95
+
+
+def test_scalable_clustering_matches_exact_on_separated_data():
+    data, _ = _blobs(800, 3, seed=1)
+
+    exact = get_flat_clusters(perform_hierarchical_clustering(data, "ward"), 3)
+    linkage_matrix, micro_labels = perform_scalable_clustering(data, "ward", 32)
+    scalable = get_flat_clusters(linkage_matrix, 3, micro_labels)
+
+    assert adjusted_rand_score(exact, scalable) == 1.0
+
+
+def test_empty_micro_clusters_are_dropped():
+    # Only 20 distinct rows, so most of the 40 centroids get no rows.
+    data = np.repeat(np.arange(20, dtype=float)[:, None], 10, axis=0)
+
+    linkage_matrix, micro_labels = perform_scalable_clustering(data, "average", 40)
+
+    n_used = linkage_matrix.shape[0] + 1
+    assert n_used <= 20
+    assert sorted(set(micro_labels)) == list(range(n_used))
+
+
+def test_scalable_clustering_accepts_sparse_input():
+    data, truth = _blobs(1000, 3, seed=2)
+
+    linkage_matrix, micro_labels = perform_scalable_clustering(
+        sparse.csr_matrix(data), "ward", 32
+    )
+
+    labels = get_flat_clusters(linkage_matrix, 3, micro_labels)
+    assert adjusted_rand_score(truth, labels) > 0.95
+
+
+@pytest.mark.parametrize("mode,n_samples,n_micro,expected", [
+    ("exact", 10**6, None, "exact"),
+    ("scalable", 50000, None, "scalable"),
+    ("scalable", 500, None, "exact"),
+    ("scalable", 500, 100, "scalable"),
+    ("auto", 10000, None, "exact"),
+    ("auto", 10001, None, "scalable"),
+])
+def test_resolve_clustering_mode(monkeypatch, mode, n_samples, n_micro, expected):
+    monkeypatch.setattr(settings, "SCALABLE_AUTO_THRESHOLD", 10000)
+    monkeypatch.setattr(settings, "SCALABLE_MICRO_CLUSTERS", 1000)
+    request = ClusteringRequest(dataset_id=1, mode=mode, n_micro_clusters=n_micro)
+
+    assert resolve_clustering_mode(request, n_samples) == ClusteringMode(expected)
+
+
+def test_scalable_run_through_the_api(upload, train):
+    dataset = upload(make_customers(3000, seed=31), "scalable.csv")
+
+    run = train(dataset["id"], n_clusters=5, mode="scalable", n_micro_clusters=200)
+
+    assert run["metrics"]["clustering_mode"] == "scalable"
+    assert run["metrics"]["n_micro_clusters"] <= 200
+    assert sum(run["metrics"]["cluster_sizes"].values()) == 3000
+    assert len(run["metrics"]["cluster_sizes"]) == 5
+
+
+def _skewed_labels(seed: int = 0) -> np.ndarray:
+    sizes = {0: 50000, 1: 8000, 2: 40}
+    labels = np.concatenate([np.full(n, label) for label, n in sizes.items()])
+    return np.random.default_rng(seed).permutation(labels)
+
+
+def test_small_inputs_are_not_downsampled():
+    assert downsample_per_cluster(np.array([0, 1, 1, 2]), 10).tolist() == [0, 1, 2, 3]
+
+
+def test_downsample_keeps_proportions_and_small_clusters():
+    labels = _skewed_labels()
+
+    keep = downsample_per_cluster(labels, 2000)
+
+    assert len(keep) <= 2000
+    assert np.all(np.diff(keep) > 0)
+    kept = {label: int(np.sum(labels[keep] == label)) for label in (0, 1, 2)}
+    # The 40-row cluster keeps every row instead of its 1.4 proportional share;
+    # beyond the 50-row floors, the rest of the budget follows cluster size.
+    assert kept[2] == 40
+    assert (kept[0] - 50) / (kept[1] - 50) == pytest.approx(49950 / 7950, rel=0.01)
+
+
+def test_downsample_is_reproducible():
+    labels = _skewed_labels()
+
+    np.testing.assert_array_equal(
+        downsample_per_cluster(labels, 500), downsample_per_cluster(labels, 500)
+    )
+    assert not np.array_equal(
+        downsample_per_cluster(labels, 500), downsample_per_cluster(labels, 500, random_state=1)
+    )
+
+
+@pytest.mark.parametrize("mode,n_points,expected", [
+    ("points", 10**7, "points"),
+    ("binned", 10, "binned"),
+    ("auto", 1000, "points"),
+    ("auto", 1001, "binned"),
+])
+def test_resolve_scatter_mode(monkeypatch, mode, n_points, expected):
+    monkeypatch.setattr(settings, "SCATTER_BINNED_THRESHOLD", 1000)
+
+    assert resolve_scatter_mode(mode, n_points) == expected
+
+
+def _scatter(mode, n_points=5000, max_points=None):
+    rng = np.random.default_rng(0)
+    x, y = rng.normal(size=(2, n_points))
+    x[:10] = np.nan
+    labels = rng.integers(3, size=n_points)
+    return generate_scatter_plot(x, y, labels, "age", "income", 1, mode=mode,
+                                 max_points=max_points)
+
+
+def test_points_mode_draws_the_marker_budget():
+    ax = _scatter("points", max_points=1000).axes[0]
+
+    assert len(ax.collections[0].get_offsets()) <= 1000
+    assert "of 4,990 points" in ax.get_title()
+
+
+def test_binned_mode_draws_one_image(monkeypatch):
+    monkeypatch.setattr(settings, "SCATTER_BINS", 50)
+
+    ax = _scatter("binned").axes[0]
+
+    assert not ax.collections
+    assert ax.images[0].get_array().shape == (50, 50, 4)
+    assert "4,990 points, binned" in ax.get_title()
+
+
+def test_scatter_without_numeric_values_is_rejected():
+    with pytest.raises(ValueError, match="not numeric"):
+        generate_scatter_plot(np.full(3, np.nan), np.ones(3), np.zeros(3), "a", "b", 1)
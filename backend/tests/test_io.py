@@ -0,0 +1,302 @@
+import hashlib
+import io
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services import io as io_service
+from app.core.config import settings
+from app.services.io import (
+    CsvProfiler,
+    FileTooLargeError,
+    FrameCache,
+    convert_to_parquet,
+    file_digest,
+    load_frame,
+    save_uploaded_file,
+)
+from benchmarks.datasets import make_customers
+
+CUSTOMERS = pd.DataFrame({
+    "id": [1, 2, 3, 4],
+    "name": ["Abebe", None, "Chaltu", "Dawit"],
+    "score": [3.5, np.nan, 7.0, 2.0],
+    "visits": [1, 2, None, 4],
+    "active": [True, False, True, True],
+})
+CSV = (
+    b"id,name,score,active,joined\n"
+    b"1,Abebe,3.5,true,2024-01-02\n"
+    b'2,"Kebede, Jr.",,false,2024-02-03\n'
+    b'3,"line\nbreak",7,,2024-03-04\n'
+    b"4,,2,true,\n"
+)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "customers.csv"
+    CUSTOMERS.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    calls = []
+    read_frame = io_service._read_frame
+
+    def spy(path, columns):
+        calls.append((Path(path).suffix, columns))
+        return read_frame(path, columns)
+
+    monkeypatch.setattr(io_service, "_read_frame", spy)
+    io_service.frame_cache.clear()
+    yield calls
+    io_service.frame_cache.clear()
+
+
+def test_parquet_copy_reads_back_like_the_csv(csv_path):
+    parquet_path, column_schema = convert_to_parquet(csv_path)
+
+    assert parquet_path.endswith("customers.parquet")
+    assert column_schema == {
+        "id": "int64", "name": "string", "score": "double", "visits": "double", "active": "bool",
+    }
+    pd.testing.assert_frame_equal(load_frame(parquet_path), pd.read_csv(csv_path))
+
+
+def test_unparseable_csv_is_a_value_error(tmp_path):
+    path = tmp_path / "bad.csv"
+    path.write_text("a,b\n1,2\n3,4,5\n")
+
+    with pytest.raises(ValueError, match="CSV"):
+        convert_to_parquet(str(path))
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_frames_are_read_once(csv_path, reads):
+    parquet_path, _ = convert_to_parquet(csv_path)
+
+    first = load_frame(parquet_path)
+    again = load_frame(parquet_path)
+    subset = load_frame(parquet_path, columns=["score", "id"])
+
+    assert reads == [(".parquet", None)]
+    pd.testing.assert_frame_equal(first, again)
+    assert list(subset.columns) == ["score", "id"]
+
+
+def test_column_subsets_are_cached_separately(csv_path, reads):
+    load_frame(csv_path, columns=["id"])
+    load_frame(csv_path, columns=["id"])
+    load_frame(csv_path, columns=["name"])
+
+    assert reads == [(".csv", ["id"]), (".csv", ["name"])]
+
+
+def test_changed_file_is_read_again(csv_path, reads):
+    load_frame(csv_path)
+    pd.concat([CUSTOMERS, CUSTOMERS]).to_csv(csv_path, index=False)
+
+    assert len(load_frame(csv_path)) == 8
+    assert len(reads) == 2
+
+
+def test_callers_get_their_own_frame(csv_path, reads):
+    frame = load_frame(csv_path)
+    frame["extra"] = 1
+    frame.drop(columns=["name"], inplace=True)
+
+    assert list(load_frame(csv_path).columns) == list(CUSTOMERS.columns)
+
+
+def test_missing_dataset_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_frame(str(tmp_path / "gone.parquet"))
+
+
+def test_frame_cache_evicts_least_recently_used():
+    frames = {key: pd.DataFrame({"x": np.zeros(100)}) for key in "abc"}
+    size = int(frames["a"].memory_usage(deep=True).sum())
+    cache = FrameCache(max_bytes=2 * size)
+
+    cache.put("a", frames["a"])
+    cache.put("b", frames["b"])
+    cache.get("a")
+    cache.put("c", frames["c"])
+
+    assert cache.get("a") is frames["a"]
+    assert cache.get("b") is None
+    assert cache.nbytes == 2 * size
+
+    cache.put("huge", pd.DataFrame({"x": np.zeros(1000)}))
+    assert cache.get("huge") is None
+
+
+def test_file_digest_follows_the_content(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_bytes(b"a,b\n1,2\n")
+    assert file_digest(str(path)) == hashlib.sha256(b"a,b\n1,2\n").hexdigest()
+
+    path.write_bytes(b"a,b\n1,2\n3,4\n")
+    assert file_digest(str(path)) == hashlib.sha256(b"a,b\n1,2\n3,4\n").hexdigest()
+
+
+def test_upload_stores_a_typed_parquet_copy(upload):
+    frame = make_customers(120, seed=61)
+
+    dataset = upload(frame, "typed.csv")
+
+    parquet_path = io_service.parquet_path_for(dataset["file_path"])
+    assert parquet_path.exists()
+    assert dataset["column_schema"]["age"] == "int64"
+    assert dataset["column_schema"]["region"] == "string"
+    pd.testing.assert_frame_equal(load_frame(str(parquet_path)), frame)
+
+
+def _profile(data: bytes, chunk_size: int, block_size: int) -> CsvProfiler:
+    profiler = CsvProfiler(block_size=block_size)
+    for start in range(0, len(data), chunk_size):
+        profiler.feed(data[start:start + chunk_size])
+    return profiler.finish()
+
+
+@pytest.mark.parametrize("chunk_size,block_size", [(len(CSV), 1 << 20), (7, 16), (1, 1)])
+def test_profile_counts_and_types(chunk_size, block_size):
+    profile = _profile(CSV, chunk_size, block_size).profile()
+
+    assert profile["n_rows"] == 4
+    assert profile["n_columns"] == 5
+    assert profile["size_bytes"] == len(CSV)
+    assert profile["columns"] == {
+        "id": {"dtype": "int64", "null_count": 0},
+        "name": {"dtype": "string", "null_count": 1},
+        "score": {"dtype": "double", "null_count": 1},
+        "active": {"dtype": "bool", "null_count": 1},
+        "joined": {"dtype": "string", "null_count": 1},
+    }
+
+
+def test_profile_matches_pandas_on_random_data():
+    rng = np.random.default_rng(0)
+    n_rows = 5000
+    frame = pd.DataFrame({
+        "count": rng.integers(0, 100, size=n_rows),
+        "amount": rng.normal(size=n_rows),
+        "city": rng.choice(["Addis Ababa", "Hawassa", "Bahir Dar", None], size=n_rows),
+    })
+    frame.loc[rng.choice(n_rows, 40, replace=False), "amount"] = np.nan
+    data = frame.to_csv(index=False).encode()
+
+    profile = _profile(data, 4096, 8192).profile()
+
+    expected = pd.read_csv(io.BytesIO(data))
+    assert profile["n_rows"] == len(expected)
+    for col in expected.columns:
+        assert profile["columns"][col]["null_count"] == expected[col].isna().sum()
+    assert profile["columns"]["count"]["dtype"] == "int64"
+    assert profile["columns"]["amount"]["dtype"] == "double"
+
+
+def test_empty_column_profiles_as_float():
+    profile = _profile(b"a,b\n1,\n2,\n", 3, 4).profile()
+
+    assert profile["columns"]["b"] == {"dtype": "double", "null_count": 2}
+
+
+def test_header_only_file_has_no_rows():
+    profile = _profile(b"a,b\n", 1, 1).profile()
+
+    assert profile["n_rows"] == 0
+    assert profile["n_columns"] == 2
+
+
+def test_file_without_header_is_rejected():
+    with pytest.raises(ValueError, match="no header"):
+        CsvProfiler().finish()
+
+
+def test_malformed_record_is_rejected():
+    with pytest.raises(ValueError, match="Invalid CSV"):
+        _profile(b"a,b\n1,2\n3,4,5\n", 1 << 20, 1 << 20)
+
+
+def test_saved_upload_hash_and_profile(monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 5)
+
+    path, content_hash, profiler = save_uploaded_file(io.BytesIO(CSV), "customers.csv")
+
+    with open(path, "rb") as f:
+        assert f.read() == CSV
+    assert content_hash == hashlib.sha256(CSV).hexdigest()
+    assert profiler.n_rows == 4
+    assert profiler.size_bytes == len(CSV)
+
+
+def test_oversized_upload_is_removed():
+    before = set(settings.upload_path.iterdir())
+
+    with pytest.raises(FileTooLargeError):
+        save_uploaded_file(io.BytesIO(CSV), "customers.csv", max_bytes=len(CSV) - 1)
+
+    assert set(settings.upload_path.iterdir()) == before
+
+
+def test_binary_upload_is_rejected():
+    with pytest.raises(ValueError, match="not a text CSV"):
+        save_uploaded_file(io.BytesIO(b"a,b\n1,\x002\n"), "customers.csv")
+
+
+def _post(client, name, data, **headers):
+    return client.post(
+        "/api/v1/datasets/upload",
+        files={"file": (name, io.BytesIO(data), "text/csv")},
+        headers=headers,
+    )
+
+
+def test_upload_returns_the_profile(client):
+    response = _post(client, "profiled.csv", CSV)
+
+    assert response.status_code == 201
+    profile = response.json()["profile"]
+    assert profile["n_rows"] == 4
+    assert profile["columns"]["score"] == {"dtype": "double", "null_count": 1}
+
+
+def test_identical_upload_returns_the_existing_dataset(client):
+    data = make_customers(50, seed=62).to_csv(index=False).encode()
+
+    first = _post(client, "first.csv", data)
+    second = _post(client, "second.csv", data)
+
+    assert (first.status_code, second.status_code) == (201, 200)
+    assert second.json()["id"] == first.json()["id"]
+
+
+@pytest.mark.parametrize("name,data,expected", [
+    ("customers.txt", CSV, "Only CSV files are allowed"),
+    ("binary.csv", b"a,b\n1,\x002\n", "File is not a text CSV file"),
+    ("ragged.csv", b"a,b\n1,2\n3,4,5\n", "Invalid CSV"),
+])
+def test_bad_uploads_are_rejected(client, name, data, expected):
+    response = _post(client, name, data)
+
+    assert response.status_code == 400
+    assert expected in response.json()["detail"]
+
+
+def test_oversized_upload_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", len(CSV) - 1)
+
+    assert _post(client, "big.csv", CSV).status_code == 413
+
+
+def test_malformed_content_length_is_ignored(client):
+    data = make_customers(20, seed=63).to_csv(index=False).encode()
+
+    response = _post(client, "length.csv", data, **{"content-length": "abc"})
+
+    assert response.status_code == 201
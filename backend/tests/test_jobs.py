@@ -0,0 +1,87 @@
+import pytest
+
+from app.core.config import settings
+from app.services import jobs
+from benchmarks.datasets import make_customers
+
+
+@pytest.fixture(scope="module")
+def dataset(upload):
+    return upload(make_customers(300, seed=11), "jobs.csv")
+
+
+def test_background_training_runs_as_a_job(client, dataset, wait_for_job):
+    response = client.post(
+        "/api/v1/clustering/train?background=true",
+        json={"dataset_id": dataset["id"], "n_clusters": 4},
+    )
+
+    assert response.status_code == 202
+    queued = response.json()
+    assert queued["kind"] == "training"
+    assert queued["status"] in ("queued", "running")
+
+    job = wait_for_job(queued["job_id"])
+    assert job["status"] == "succeeded", job["error"]
+    assert job["stage"] == "done"
+    assert job["progress"] == 1.0
+
+    runs = client.get(f"/api/v1/clustering/runs/{dataset['id']}").json()["runs"]
+    run = next(run for run in runs if run["id"] == job["run_id"])
+    assert run["n_clusters"] == 4
+    assert sum(run["metrics"]["cluster_sizes"].values()) == 300
+
+
+def test_failed_job_records_the_error(client, upload, wait_for_job):
+    tiny = upload(make_customers(5, seed=12), "tiny.csv")
+
+    response = client.post(
+        "/api/v1/clustering/train?background=true",
+        json={"dataset_id": tiny["id"], "n_clusters": 10},
+    )
+    job = wait_for_job(response.json()["job_id"])
+
+    assert job["status"] == "failed"
+    assert "must be >= n_clusters (10)" in job["error"]
+    assert job["run_id"] is None
+
+
+def test_unknown_dataset_is_rejected_before_queueing(client):
+    response = client.post(
+        "/api/v1/clustering/train?background=true",
+        json={"dataset_id": 10**6, "n_clusters": 3},
+    )
+
+    assert response.status_code == 404
+
+
+def test_foreground_training_returns_the_run(client, dataset, train):
+    run = train(dataset["id"], n_clusters=3, linkage="average")
+
+    assert run["linkage"] == "average"
+    assert run["params"]["n_clusters"] == 3
+    assert "fit" not in run["metrics"]["stage_seconds"]
+    assert run["metrics"]["stage_seconds"]["persist"] >= 0
+
+
+def test_job_listing_and_unknown_job(client, dataset, wait_for_job):
+    job_id = client.post(
+        "/api/v1/clustering/train?background=true",
+        json={"dataset_id": dataset["id"], "n_clusters": 2},
+    ).json()["job_id"]
+    wait_for_job(job_id)
+
+    listed = client.get("/api/v1/clustering/jobs").json()
+    assert listed["jobs"][0]["job_id"] == job_id
+    assert listed["total"] == len(listed["jobs"])
+    assert client.get("/api/v1/clustering/jobs/nope").status_code == 404
+
+
+def test_threads_are_split_between_workers(monkeypatch):
+    monkeypatch.setattr(settings, "CLUSTERING_THREADS_PER_WORKER", 0)
+    monkeypatch.setattr(settings, "CLUSTERING_MAX_WORKERS", 2)
+    monkeypatch.setattr("os.cpu_count", lambda: 8)
+    assert jobs._threads_per_worker() == 4
+
+    monkeypatch.setattr(settings, "CLUSTERING_THREADS_PER_WORKER", 3)
+    assert jobs._threads_per_worker() == 3
@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from sklearn import metrics as sk_metrics
+
+from app.core.config import settings
+from app.services.metrics import compile_metrics, estimate_silhouette, silhouette_values
+
+
+def _blobs(n_samples: int, n_features: int, n_clusters: int, seed: int):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(scale=5.0, size=(n_clusters, n_features))
+    labels = rng.integers(n_clusters, size=n_samples)
+    data = centers[labels] + rng.normal(size=(n_samples, n_features))
+    return data, labels
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_silhouette_values_match_sklearn(seed):
+    data, labels = _blobs(400, 6, 4, seed)
+
+    expected = sk_metrics.silhouette_samples(data, labels)
+
+    np.testing.assert_allclose(silhouette_values(data, labels), expected, atol=1e-10)
+
+
+def test_silhouette_values_in_small_blocks():
+    data, labels = _blobs(2000, 4, 3, 3)
+
+    # 1 MiB holds 65 rows of distances to 2000 samples, so 31 blocks.
+    values = silhouette_values(data, labels, working_memory_mb=1)
+
+    np.testing.assert_allclose(values, sk_metrics.silhouette_samples(data, labels), atol=1e-10)
+
+
+def test_silhouette_values_for_several_label_sets():
+    data, labels = _blobs(300, 4, 3, 4)
+    other = np.random.default_rng(4).integers(5, size=len(labels))
+
+    values = silhouette_values(data, np.column_stack([labels, other]))
+
+    np.testing.assert_allclose(
+        values[:, 0], sk_metrics.silhouette_samples(data, labels), atol=1e-10
+    )
+    np.testing.assert_allclose(
+        values[:, 1], sk_metrics.silhouette_samples(data, other), atol=1e-10
+    )
+
+
+def test_silhouette_of_singleton_cluster_is_zero():
+    data, labels = _blobs(50, 3, 3, 5)
+    labels[0] = 99
+
+    values = silhouette_values(data, labels)
+
+    assert values[0] == 0.0
+    np.testing.assert_allclose(values, sk_metrics.silhouette_samples(data, labels), atol=1e-10)
+
+
+def test_exact_silhouette_score_matches_sklearn():
+    data, labels = _blobs(500, 5, 4, 6)
+
+    result = estimate_silhouette(data, labels, method="exact")
+
+    assert result["method"] == "exact"
+    assert result["score"] == pytest.approx(sk_metrics.silhouette_score(data, labels), abs=1e-10)
+
+
+def test_sampled_silhouette_interval_covers_exact_score():
+    data, labels = _blobs(3000, 5, 4, 7)
+
+    result = estimate_silhouette(data, labels, method="sampled", sample_size=600, random_state=0)
+
+    low, high = result["ci"]
+    assert result["method"] == "sampled"
+    assert low <= sk_metrics.silhouette_score(data, labels) <= high
+
+
+def test_silhouette_values_on_sparse_data():
+    data, labels = _blobs(300, 8, 3, 10)
+    data[np.abs(data) < 2.0] = 0.0
+
+    values = silhouette_values(sparse.csr_matrix(data), labels)
+
+    np.testing.assert_allclose(values, sk_metrics.silhouette_samples(data, labels), atol=1e-10)
+
+
+def test_sampled_silhouette_is_reproducible():
+    data, labels = _blobs(2000, 4, 3, 11)
+
+    first = estimate_silhouette(data, labels, method="sampled", sample_size=300, random_state=5)
+    again = estimate_silhouette(data, labels, method="sampled", sample_size=300, random_state=5)
+
+    assert first == again
+    assert 300 <= first["sample_size"] <= 310
+
+
+def test_sample_as_large_as_the_data_is_exact():
+    data, labels = _blobs(200, 3, 3, 12)
+
+    result = estimate_silhouette(data, labels, method="sampled", sample_size=500)
+
+    assert result["method"] == "exact"
+    assert result["ci"] is None
+
+
+@pytest.mark.parametrize("n_samples,expected", [(400, "exact"), (401, "sampled")])
+def test_auto_method_switches_on_row_count(monkeypatch, n_samples, expected):
+    monkeypatch.setattr(settings, "SILHOUETTE_EXACT_MAX_ROWS", 400)
+    monkeypatch.setattr(settings, "SILHOUETTE_SAMPLE_SIZE", 200)
+    data, labels = _blobs(n_samples, 3, 3, 13)
+
+    assert estimate_silhouette(data, labels, method="auto")["method"] == expected
+
+
+def test_metrics_report_how_the_silhouette_was_computed(monkeypatch):
+    monkeypatch.setattr(settings, "SILHOUETTE_METHOD", "sampled")
+    monkeypatch.setattr(settings, "SILHOUETTE_SAMPLE_SIZE", 200)
+    data, labels = _blobs(1000, 3, 3, 14)
+
+    metrics = compile_metrics(data, labels, n_encoded_features=3)
+
+    assert metrics["silhouette_method"] == "sampled"
+    assert metrics["silhouette_ci"][0] <= metrics["silhouette_score"] <= metrics["silhouette_ci"][1]
+
+
+def test_single_cluster_has_no_silhouette():
+    data, _ = _blobs(50, 3, 1, 15)
+
+    metrics = compile_metrics(data, np.zeros(50, dtype=int), n_encoded_features=3)
+
+    assert metrics["silhouette_score"] is None
+    assert "silhouette_method" not in metrics
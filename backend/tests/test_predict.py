@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.artifacts import RunModel, load_model
+from benchmarks.datasets import make_customers
+
+
+@pytest.fixture(scope="module")
+def fitted(upload, train):
+    frame = make_customers(300, seed=71)
+    dataset = upload(frame, "predict.csv")
+    run = train(dataset["id"], n_clusters=4)
+    return frame, run
+
+
+def _predict(client, run_id, records):
+    return client.post(f"/api/v1/clustering/runs/{run_id}/predict", json={"records": records})
+
+
+def test_predict_matches_the_stored_model(client, fitted):
+    frame, run = fitted
+    records = frame.head(25).to_dict("records")
+
+    response = _predict(client, run["id"], records)
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["run_id"] == run["id"]
+    assert body["n_records"] == 25
+    labels, distances = RunModel(load_model(run["model_path"])).predict(frame.head(25))
+    assert body["cluster_labels"] == labels.tolist()
+    np.testing.assert_allclose(body["distances"], distances)
+
+
+def test_unseen_category_still_gets_a_cluster(client, fitted):
+    frame, run = fitted
+    record = {**frame.iloc[0].to_dict(), "region": "Atlantis"}
+
+    response = _predict(client, run["id"], [record])
+
+    assert response.status_code == 200
+    assert response.json()["cluster_labels"][0] in range(4)
+
+
+def test_predict_unknown_run(client):
+    assert _predict(client, 999999, [{"age": 30}]).status_code == 404
+
+
+def test_predict_rejects_missing_columns(client, fitted):
+    frame, run = fitted
+    record = frame.iloc[0].to_dict()
+    del record["annual_income"]
+
+    response = _predict(client, run["id"], [record])
+
+    assert response.status_code == 400
+    assert "annual_income" in response.json()["detail"]
+
+
+def test_predict_rejects_empty_and_oversized_batches(client, fitted, monkeypatch):
+    frame, run = fitted
+    monkeypatch.setattr(settings, "PREDICT_MAX_BATCH", 2)
+
+    assert _predict(client, run["id"], []).status_code == 422
+    records = frame.head(3).to_dict("records")
+    assert _predict(client, run["id"], records).status_code == 413
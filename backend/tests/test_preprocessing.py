@@ -0,0 +1,231 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from app.core.config import settings
+from app.schemas.clustering import ClusteringRequest
+from app.services.pipeline import preprocess_in_memory, preprocess_out_of_core
+from app.services.preprocessing import (
+    apply_pca,
+    apply_preprocessing,
+    build_preprocessor,
+    categorical_encoding_info,
+    encoded_matrix_info,
+    fit_incremental_pca,
+    fit_preprocessor_incremental,
+    transform_chunks,
+)
+from benchmarks.datasets import make_customers
+
+NUMERIC = ["age", "annual_income"]
+CATEGORICAL = ["region", "membership_tier"]
+
+
+@pytest.fixture(scope="module")
+def customers():
+    return make_customers(2000, cardinality=40, seed=91)
+
+
+def _encode(frame, dtype=np.float64, **limits):
+    preprocessor = build_preprocessor(NUMERIC, CATEGORICAL, dtype=dtype, **limits)
+    return preprocessor, apply_preprocessing(frame, preprocessor, dtype)
+
+
+def test_high_cardinality_output_stays_sparse(customers):
+    _, data = _encode(customers, np.float32)
+
+    assert sparse.isspmatrix_csr(data)
+    assert data.dtype == np.float32
+    info = encoded_matrix_info(data)
+    assert info["format"] == "sparse"
+    assert info["dtype"] == "float32"
+    assert info["nbytes"] < info["dense_nbytes"]
+    assert info["shape"] == [2000, data.shape[1]]
+
+
+def test_encoding_matches_dense_one_hot(customers):
+    _, data = _encode(customers)
+
+    expected = pd.get_dummies(customers[CATEGORICAL].astype(str), dtype=float).to_numpy()
+    np.testing.assert_array_equal(data.toarray()[:, len(NUMERIC):], expected)
+
+
+def test_small_dense_matrix_is_reported_as_dense():
+    info = encoded_matrix_info(np.ones((4, 3), dtype=np.float32))
+
+    assert info == {
+        "format": "dense", "dtype": "float32", "shape": [4, 3],
+        "nbytes": 48, "dense_nbytes": 48, "density": 1.0,
+    }
+
+
+def test_every_category_is_kept_without_limits(customers):
+    preprocessor, data = _encode(customers)
+
+    info = categorical_encoding_info(preprocessor, CATEGORICAL)
+
+    n_regions = customers["region"].nunique()
+    assert info["region"] == {
+        "n_categories": n_regions, "n_infrequent": 0, "encoded_columns": n_regions,
+    }
+    assert data.shape[1] == len(NUMERIC) + sum(col["encoded_columns"] for col in info.values())
+
+
+def test_max_categories_groups_the_rarest(customers):
+    preprocessor, data = _encode(customers, max_categories=5)
+
+    info = categorical_encoding_info(preprocessor, CATEGORICAL)["region"]
+
+    assert info["encoded_columns"] == 5
+    assert info["n_infrequent"] == customers["region"].nunique() - 4
+    assert data.shape[1] == len(NUMERIC) + sum(
+        col["encoded_columns"]
+        for col in categorical_encoding_info(preprocessor, CATEGORICAL).values()
+    )
+
+
+def test_min_frequency_groups_rare_categories_and_unseen_values(customers):
+    preprocessor, _ = _encode(customers, min_frequency=0.05)
+    shares = customers["region"].value_counts(normalize=True)
+
+    info = categorical_encoding_info(preprocessor, CATEGORICAL)["region"]
+
+    assert info["n_infrequent"] == (shares < 0.05).sum()
+    grouped = customers[customers["region"].isin(shares[shares < 0.05].index)].head(1)
+    unseen = grouped.assign(region="Atlantis")
+    encoded = preprocessor.transform(pd.concat([unseen, grouped]))
+    encoded = encoded.toarray() if sparse.issparse(encoded) else encoded
+    np.testing.assert_array_equal(encoded[0, len(NUMERIC):], encoded[1, len(NUMERIC):])
+
+
+def test_sparse_pca_matches_dense_pca(customers):
+    _, data = _encode(customers, np.float32)
+
+    projected, variance, _ = apply_pca(data, 5)
+    dense_projected, dense_variance, _ = apply_pca(data.toarray(), 5)
+
+    assert projected.dtype == np.float32
+    assert variance == pytest.approx(dense_variance, rel=1e-4)
+    # Components are defined up to sign.
+    signs = np.sign((projected * dense_projected).sum(axis=0))
+    np.testing.assert_allclose(projected * signs, dense_projected, atol=1e-3)
+
+
+@pytest.mark.parametrize("float32,dtype", [(True, np.float32), (False, np.float64)])
+def test_pipeline_reports_the_encoded_matrix(tmp_path, customers, monkeypatch, float32, dtype):
+    monkeypatch.setattr(settings, "PREPROCESS_FLOAT32", float32)
+    path = tmp_path / "customers.csv"
+    customers.to_csv(path, index=False)
+    request = ClusteringRequest(dataset_id=1, max_categories=6)
+
+    features = preprocess_in_memory(str(path), request)
+
+    assert features["data"].dtype == dtype
+    encoding = features["encoding"]
+    assert encoding["max_categories"] == 6
+    assert encoding["categorical_encoding"]["region"]["encoded_columns"] == 6
+    assert encoding["encoded_matrix"]["dtype"] == np.dtype(dtype).name
+    assert encoding["encoded_matrix"]["shape"] == list(features["data"].shape)
+
+
+def test_run_feature_config_records_the_encoding(upload, train):
+    dataset = upload(make_customers(300, cardinality=40, seed=92), "encoding.csv")
+
+    run = train(dataset["id"], n_clusters=3, max_categories=4, min_category_frequency=0.01)
+
+    config = run["feature_config"]
+    assert config["max_categories"] == 4
+    assert config["min_category_frequency"] == 0.01
+    assert config["categorical_encoding"]["region"]["encoded_columns"] <= 4
+    assert config["encoded_matrix"]["dtype"] == "float32"
+
+
+def _dense(data):
+    return data.toarray() if sparse.issparse(data) else np.asarray(data)
+
+
+def _chunks(frame, size):
+    return (frame.iloc[start:start + size] for start in range(0, len(frame), size))
+
+
+@pytest.mark.parametrize("limits", [{}, {"max_categories": 5}, {"min_frequency": 0.03}])
+def test_incremental_fit_matches_the_in_memory_fit(customers, limits):
+    expected, expected_data = _encode(customers, **limits)
+
+    preprocessor, encoding, n_rows = fit_preprocessor_incremental(
+        _chunks(customers, 300), NUMERIC, CATEGORICAL, **limits
+    )
+
+    assert n_rows == len(customers)
+    assert encoding == categorical_encoding_info(expected, CATEGORICAL)
+    data = sparse.vstack(list(transform_chunks(_chunks(customers, 300), preprocessor)))
+    np.testing.assert_allclose(_dense(data), _dense(expected_data), atol=1e-9)
+
+
+def test_incremental_fit_of_no_rows_fails():
+    with pytest.raises(ValueError, match="empty"):
+        fit_preprocessor_incremental(iter([]), NUMERIC, CATEGORICAL)
+
+
+def test_incremental_pca_merges_short_batches():
+    rng = np.random.default_rng(0)
+    batches = [rng.normal(size=(n_rows, 6)) for n_rows in (10, 2, 10, 3)]
+
+    pca = fit_incremental_pca(iter(batches), n_components=4)
+
+    assert pca.n_samples_seen_ == 25
+    with pytest.raises(ValueError, match="at least 4 rows"):
+        fit_incremental_pca(iter(batches[1:2]), n_components=4)
+
+
+@pytest.fixture
+def chunked(monkeypatch):
+    monkeypatch.setattr(settings, "PREPROCESS_CHUNK_SIZE", 100)
+
+
+def _preprocess_both(tmp_path, frame, **params):
+    path = tmp_path / "customers.csv"
+    frame.to_csv(path, index=False)
+    request = ClusteringRequest(dataset_id=1, **params)
+    return preprocess_in_memory(str(path), request), preprocess_out_of_core(str(path), request)
+
+
+@pytest.mark.parametrize("params", [{}, {"max_categories": 4}])
+def test_out_of_core_matches_in_memory(tmp_path, chunked, params):
+    in_memory, out_of_core = _preprocess_both(tmp_path, make_customers(300, seed=93), **params)
+
+    assert out_of_core["numeric_cols"] == in_memory["numeric_cols"]
+    assert out_of_core["categorical_cols"] == in_memory["categorical_cols"]
+    np.testing.assert_allclose(
+        _dense(out_of_core["data"]), _dense(in_memory["data"]), rtol=1e-4, atol=1e-5
+    )
+    assert out_of_core["encoding"]["out_of_core"] == {"chunk_size": 100}
+
+
+def test_out_of_core_pca_is_close_to_exact_pca(tmp_path, chunked):
+    in_memory, out_of_core = _preprocess_both(
+        tmp_path, make_customers(300, seed=94), use_pca=True, pca_components=3
+    )
+
+    assert out_of_core["data"].shape == in_memory["data"].shape == (300, 3)
+    # IncrementalPCA keeps only the leading components between batches.
+    assert 0.8 * in_memory["pca_variance"] < out_of_core["pca_variance"]
+    assert out_of_core["pca_variance"] <= in_memory["pca_variance"] + 1e-6
+
+
+def test_out_of_core_types_columns_from_every_chunk(tmp_path, chunked):
+    # Numbers in the first two chunks, text in the last one.
+    frame = make_customers(300, seed=95)
+    frame["age"] = frame["age"].astype(object)
+    frame.loc[250, "age"] = "unknown"
+
+    in_memory, out_of_core = _preprocess_both(tmp_path, frame)
+
+    assert "age" in out_of_core["categorical_cols"]
+    assert out_of_core["numeric_cols"] == in_memory["numeric_cols"]
+    assert out_of_core["categorical_cols"] == in_memory["categorical_cols"]
+    assert out_of_core["data"].shape == in_memory["data"].shape
+    np.testing.assert_allclose(
+        _dense(out_of_core["data"]), _dense(in_memory["data"]), rtol=1e-4, atol=1e-5
+    )
@@ -0,0 +1,141 @@
+import json
+import time
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core import profiling
+from app.core.config import settings
+from app.core.profiling import (
+    ProfileCapture,
+    ProfilingMiddleware,
+    profile_call,
+    sign_request,
+    verify_signature,
+)
+
+SECRET = "s3cret"
+
+
+@pytest.fixture
+def secret(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILING_SECRET", SECRET)
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", False)
+    return SECRET
+
+
+def _work(request):
+    return PlainTextResponse(str(sum(i * i for i in range(10000))))
+
+
+@pytest.fixture
+def profiled_app(secret):
+    app = Starlette(routes=[Route("/work", _work), Route("/metrics", _work)])
+    return TestClient(ProfilingMiddleware(app))
+
+
+def test_signature_is_bound_to_method_path_and_time(secret):
+    value = sign_request(secret, "post", "/api/v1/clustering/train")
+
+    assert verify_signature(value, "POST", "/api/v1/clustering/train")
+    assert not verify_signature(value, "GET", "/api/v1/clustering/train")
+    assert not verify_signature(value, "POST", "/api/v1/clustering/sweep")
+    assert not verify_signature(sign_request("other", "POST", "/x"), "POST", "/x")
+    assert not verify_signature("not-a-signature", "POST", "/x")
+
+    expired = sign_request(secret, "POST", "/x", timestamp=int(time.time()) - 3600)
+    assert not verify_signature(expired, "POST", "/x")
+
+
+def test_nothing_verifies_without_a_secret(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_SECRET", "")
+
+    assert not verify_signature(sign_request("", "GET", "/x"), "GET", "/x")
+
+
+def test_signed_request_is_profiled(profiled_app, secret):
+    headers = {"X-Profile": sign_request(secret, "GET", "/work")}
+
+    response = profiled_app.get("/work", headers=headers)
+
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+    profile = profiling.get_profile(profile_id)
+    assert profile["path"] == "/work"
+    assert profile["status_code"] == 200
+    assert {"profile.prof", "profile.txt", "allocations.txt"} <= set(profile["files"])
+    assert "_work" in (profiling.profiles_dir() / profile_id / "profile.txt").read_text()
+
+
+def test_unsigned_and_excluded_requests_are_not_profiled(profiled_app, secret):
+    assert "x-profile-id" not in profiled_app.get("/work").headers
+    assert "x-profile-id" not in profiled_app.get(
+        "/work", headers={"X-Profile": sign_request(secret, "GET", "/other")}
+    ).headers
+    assert "x-profile-id" not in profiled_app.get(
+        "/metrics", headers={"X-Profile": sign_request(secret, "GET", "/metrics")}
+    ).headers
+    assert profiling.list_profiles() == []
+
+
+def test_worker_stats_are_saved_with_the_capture(secret):
+    capture = ProfileCapture("POST", "/api/v1/clustering/train")
+    capture.start()
+    result, stats = profile_call(lambda: sum(range(1000)))
+    capture.add_worker_stats(stats)
+    capture.stop()
+
+    directory = capture.save(201)
+
+    assert result == 499500
+    assert (directory / "worker-1.txt").exists()
+    assert json.loads((directory / "meta.json").read_text())["worker_profiles"] == 1
+
+
+def test_oldest_profiles_are_pruned(secret, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_MAX_PROFILES", 2)
+    ids = []
+    for _ in range(3):
+        capture = ProfileCapture("GET", "/work")
+        capture.start()
+        capture.stop()
+        capture.save(200)
+        ids.append(capture.id)
+        time.sleep(0.01)
+
+    assert [meta["id"] for meta in profiling.list_profiles()] == ids[:0:-1]
+
+
+def test_admin_endpoints_are_hidden_when_profiling_is_off(client, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_SECRET", "")
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", False)
+
+    assert client.get("/api/v1/admin/profiles").status_code == 404
+
+
+def test_admin_endpoints_need_the_secret(client, secret):
+    capture = ProfileCapture("GET", "/work")
+    capture.start()
+    capture.stop()
+    capture.save(200)
+    auth = {"Authorization": f"Bearer {secret}"}
+
+    assert client.get("/api/v1/admin/profiles").status_code == 401
+    wrong = client.get("/api/v1/admin/profiles", headers={"Authorization": "Bearer nope"})
+    assert wrong.status_code == 401
+
+    listing = client.get("/api/v1/admin/profiles", headers=auth).json()
+    assert [meta["id"] for meta in listing["profiles"]] == [capture.id]
+    detail = client.get(f"/api/v1/admin/profiles/{capture.id}", headers=auth)
+    assert "profile.txt" in detail.json()["files"]
+    download = client.get(f"/api/v1/admin/profiles/{capture.id}/profile.txt", headers=auth)
+    assert download.status_code == 200
+    assert download.headers["content-type"].startswith("text/plain")
+
+    assert client.get("/api/v1/admin/profiles/not-an-id", headers=auth).status_code == 404
+    missing = client.get(f"/api/v1/admin/profiles/{capture.id}/meta.json", headers=auth)
+    assert missing.status_code == 404
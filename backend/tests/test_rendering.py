@@ -0,0 +1,115 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from matplotlib.figure import Figure
+
+from app.api import routes
+from app.core.config import settings
+from app.services import rendering
+from app.services.charts import chart_key, get_cached_chart
+from app.services.rendering import RenderQueueFull, render
+from benchmarks.datasets import make_customers
+
+calls = []
+release = threading.Event()
+
+
+def generate_blank(name):
+    calls.append(name)
+    release.wait(5)
+    return Figure(figsize=(1, 1))
+
+
+def generate_broken():
+    raise ValueError("no data to draw")
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    # Threads instead of spawned processes, so the test can count calls.
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(rendering, "get_executor", lambda: executor)
+    monkeypatch.setattr(settings, "RENDER_MAX_WORKERS", 1)
+    monkeypatch.setattr(settings, "RENDER_MAX_QUEUE", 1)
+    calls.clear()
+    release.clear()
+    yield
+    release.set()
+    executor.shutdown(wait=True)
+
+
+def _key(name):
+    return chart_key(0, name, "test")
+
+
+def test_concurrent_requests_share_one_render(pool):
+    async def scenario():
+        key = _key("shared")
+        first = asyncio.ensure_future(render(key, generate_blank, "shared"))
+        second = asyncio.ensure_future(render(key, generate_blank, "shared"))
+        await asyncio.sleep(0.05)
+        release.set()
+        return key, await first, await second
+
+    key, first, second = asyncio.run(scenario())
+
+    assert calls == ["shared"]
+    assert first == second == get_cached_chart(key)
+
+
+def test_full_queue_is_rejected(pool):
+    rejected_before = rendering.render_stats()["rejected"]
+
+    async def scenario():
+        running = [
+            asyncio.ensure_future(render(_key(name), generate_blank, name))
+            for name in ("a", "b")
+        ]
+        await asyncio.sleep(0.05)
+        try:
+            with pytest.raises(RenderQueueFull):
+                await render(_key("c"), generate_blank, "c")
+            stats = rendering.render_stats()
+        finally:
+            release.set()
+        await asyncio.gather(*running)
+        return stats
+
+    stats = asyncio.run(scenario())
+
+    assert stats["in_flight"] == 2
+    assert stats["queued"] == 1
+    assert stats["rejected"] == rejected_before + 1
+    assert rendering.render_stats()["in_flight"] == 0
+
+
+def test_failed_render_is_counted_and_released(pool):
+    failed_before = rendering.render_stats()["failed"]
+
+    with pytest.raises(ValueError, match="no data"):
+        asyncio.run(render(_key("broken"), generate_broken))
+
+    assert rendering.render_stats()["failed"] == failed_before + 1
+    assert rendering.render_stats()["in_flight"] == 0
+
+
+def test_busy_pool_answers_429(client, upload, train, monkeypatch):
+    run = train(upload(make_customers(100, seed=91), "busy.csv")["id"], n_clusters=3)
+
+    async def busy(*args, **kwargs):
+        raise RenderQueueFull("Chart rendering is busy, retry shortly")
+
+    monkeypatch.setattr(routes, "render", busy)
+    response = client.get(f"/api/v1/clustering/distribution/{run['id']}")
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+
+
+def test_render_health(client):
+    body = client.get("/api/v1/health/render").json()
+
+    assert body["workers"] == settings.RENDER_MAX_WORKERS
+    assert {"in_flight", "queued", "completed", "rejected"} <= set(body)
@@ -0,0 +1,268 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.core.config import settings
+from app.services.io import frame_cache, parquet_path_for
+from app.services.results import (
+    StaleRunResultsError,
+    check_run_files,
+    iter_run_results,
+    labels_path_for,
+    load_labels,
+    read_run_results,
+    read_segment_page,
+    save_labels,
+)
+from benchmarks.datasets import make_customers
+
+N_ROWS = 1000
+
+
+def test_labels_sidecar_round_trip(tmp_path):
+    labels = np.array([2, 0, 1, 1, 0])
+
+    path = save_labels(str(tmp_path / "customers.parquet"), 7, labels)
+
+    assert path == str(tmp_path / "customers.parquet.run_7.labels.npy")
+    assert path == str(labels_path_for(str(tmp_path / "customers.parquet"), 7))
+    stored = load_labels(path)
+    assert stored.dtype == np.int32
+    np.testing.assert_array_equal(stored, labels)
+
+
+def test_missing_sidecar_is_not_found(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_labels(str(tmp_path / "gone.labels.npy"))
+
+
+def test_run_results_join_labels_with_rows(tmp_path):
+    frame = pd.DataFrame({"age": [30, 40, 50], "region": ["a", "b", "c"]})
+    dataset_path = tmp_path / "customers.csv"
+    frame.to_csv(dataset_path, index=False)
+    labels_path = save_labels(str(dataset_path), 1, np.array([1, 0, 1]))
+
+    labels, rows = read_run_results(str(dataset_path), labels_path, columns=["region"])
+
+    assert labels.tolist() == [1, 0, 1]
+    assert rows.to_dict("list") == {"region": ["a", "b", "c"]}
+
+
+@pytest.mark.parametrize("n_rows", [9, 11])
+def test_changed_dataset_is_stale(tmp_path, n_rows):
+    dataset_path = tmp_path / "customers.parquet"
+    labels_path = save_labels(str(dataset_path), 1, np.zeros(10))
+    pq.write_table(pa.table({"age": np.arange(n_rows)}), dataset_path)
+
+    with pytest.raises(StaleRunResultsError, match="no longer matches"):
+        read_run_results(str(dataset_path), labels_path)
+    with pytest.raises(StaleRunResultsError):
+        list(iter_run_results(str(dataset_path), labels_path))
+
+
+def test_stale_scatter_is_a_conflict(client, upload, train):
+    dataset = upload(make_customers(200, seed=21), "stale.csv")
+    run = train(dataset["id"], n_clusters=3)
+    parquet_path = parquet_path_for(dataset["file_path"])
+    table = pq.read_table(parquet_path)
+    pq.write_table(table.slice(0, 150), parquet_path)
+    frame_cache.clear()
+
+    for url in (f"/api/v1/clustering/scatter/{run['id']}",
+                f"/api/v1/clustering/scatter/{run['id']}/data"):
+        response = client.get(url)
+        assert response.status_code == 409, url
+        assert response.json()["detail"] == "Dataset file no longer matches the stored run labels"
+
+
+@pytest.fixture
+def labels():
+    return np.random.default_rng(0).integers(4, size=N_ROWS).astype(np.int32)
+
+
+@pytest.fixture(params=["parquet", "csv"])
+def run_files(request, tmp_path, labels, monkeypatch):
+    # Chunks smaller than the row groups, so pages span both boundaries.
+    monkeypatch.setattr(settings, "SEGMENT_CHUNK_SIZE", 24)
+    frame = pd.DataFrame({
+        "row": np.arange(N_ROWS),
+        "name": [f"customer-{i}" for i in range(N_ROWS)],
+    })
+    if request.param == "parquet":
+        dataset_path = tmp_path / "customers.parquet"
+        pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), dataset_path,
+                       row_group_size=100)
+    else:
+        dataset_path = tmp_path / "customers.csv"
+        frame.to_csv(dataset_path, index=False)
+    return str(dataset_path), save_labels(str(dataset_path), 1, labels)
+
+
+def _matching(labels, cluster_label):
+    if cluster_label is None:
+        return np.arange(N_ROWS)
+    return np.flatnonzero(labels == cluster_label)
+
+
+@pytest.mark.parametrize("cluster_label", [None, 2])
+@pytest.mark.parametrize("after", [None, -1, 0, 99, 100, 512, 998, 999])
+@pytest.mark.parametrize("limit", [1, 37, 250, 5000])
+def test_page_matches_keyset_semantics(run_files, labels, after, limit, cluster_label):
+    rows, total, next_cursor = read_segment_page(*run_files, after, limit, cluster_label)
+
+    matching = _matching(labels, cluster_label)
+    start = 0 if after is None else int(np.searchsorted(matching, after, side="right"))
+    expected = matching[start:start + limit]
+    assert [row["row_index"] for row in rows] == expected.tolist()
+    assert total == len(matching)
+    assert next_cursor == (expected[-1] if start + limit < len(matching) else None)
+    for row in rows:
+        assert row["cluster_label"] == labels[row["row_index"]]
+        assert row["payload"] == {
+            "row": row["row_index"],
+            "name": f"customer-{row['row_index']}",
+        }
+
+
+@pytest.mark.parametrize("cluster_label", [None, 1])
+def test_following_cursors_visits_every_row_once(run_files, labels, cluster_label):
+    seen = []
+    after = None
+    while True:
+        rows, _, after = read_segment_page(*run_files, after, 64, cluster_label)
+        seen.extend(row["row_index"] for row in rows)
+        if after is None:
+            break
+
+    assert seen == _matching(labels, cluster_label).tolist()
+
+
+def test_columns_limit_the_payload(run_files):
+    rows, _, _ = read_segment_page(*run_files, 10, 3, columns=["name"])
+
+    assert [row["payload"] for row in rows] == [
+        {"name": "customer-11"}, {"name": "customer-12"}, {"name": "customer-13"}
+    ]
+
+
+def test_unknown_cluster_gives_empty_page(run_files):
+    assert read_segment_page(*run_files, None, 10, cluster_label=42) == ([], 0, None)
+
+
+def test_parquet_page_skips_earlier_row_groups(run_files, monkeypatch):
+    dataset_path, labels_path = run_files
+    if not dataset_path.endswith(".parquet"):
+        pytest.skip("CSV files have no row groups")
+
+    requested = []
+    iter_batches = pq.ParquetFile.iter_batches
+
+    def spy(self, *args, **kwargs):
+        requested.append(list(kwargs["row_groups"]))
+        return iter_batches(self, *args, **kwargs)
+
+    monkeypatch.setattr(pq.ParquetFile, "iter_batches", spy)
+    rows, _, _ = read_segment_page(dataset_path, labels_path, 849, 10)
+
+    assert [row["row_index"] for row in rows] == list(range(850, 860))
+    assert requested == [[8, 9]]
+
+
+def test_mismatched_dataset_is_rejected(run_files, tmp_path):
+    _, labels_path = run_files
+    short = tmp_path / "short.parquet"
+    pq.write_table(pa.table({"row": np.arange(10)}), short)
+
+    with pytest.raises(StaleRunResultsError, match="no longer matches"):
+        read_segment_page(str(short), labels_path, None, 5)
+    with pytest.raises(StaleRunResultsError):
+        check_run_files(str(short), labels_path)
+
+
+def test_check_run_files(run_files, tmp_path):
+    dataset_path, labels_path = run_files
+    check_run_files(dataset_path, labels_path)
+
+    with pytest.raises(FileNotFoundError, match="gone.labels.npy"):
+        check_run_files(dataset_path, str(tmp_path / "gone.labels.npy"))
+
+
+@pytest.fixture(scope="module")
+def segments_run(upload, train):
+    dataset = upload(make_customers(300, seed=22), "segments.csv")
+    return dataset, train(dataset["id"], n_clusters=3)
+
+
+def test_segment_pages_follow_the_cursor(client, segments_run):
+    _, run = segments_run
+    url = f"/api/v1/clustering/segments/{run['id']}"
+
+    seen = []
+    params = {"limit": 64, "columns": "customer_id,region"}
+    while True:
+        page = client.get(url, params=params).json()
+        assert page["total"] == 300
+        seen.extend(row["row_index"] for row in page["assignments"])
+        if page["next_cursor"] is None:
+            break
+        params["after"] = page["next_cursor"]
+
+    assert seen == list(range(300))
+    assert set(page["assignments"][0]["payload"]) == {"customer_id", "region"}
+
+
+def test_ndjson_streams_one_row_per_line(client, segments_run):
+    _, run = segments_run
+
+    response = client.get(
+        f"/api/v1/clustering/segments/{run['id']}",
+        params={"format": "ndjson", "cluster_label": 1, "after": 99},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows
+    assert all(row["cluster_label"] == 1 and row["row_index"] > 99 for row in rows)
+
+
+def test_unknown_segment_columns_are_rejected(client, segments_run):
+    _, run = segments_run
+
+    response = client.get(
+        f"/api/v1/clustering/segments/{run['id']}", params={"columns": "age,shoe_size"}
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown columns: shoe_size"
+
+
+def test_stale_segments_are_a_conflict(client, upload, train):
+    dataset = upload(make_customers(200, seed=23), "stale_segments.csv")
+    run = train(dataset["id"], n_clusters=3)
+    parquet_path = parquet_path_for(dataset["file_path"])
+    pq.write_table(pq.read_table(parquet_path).slice(0, 150), parquet_path)
+
+    url = f"/api/v1/clustering/segments/{run['id']}"
+    for params in ({}, {"format": "ndjson"}):
+        response = client.get(url, params=params)
+        assert response.status_code == 409, params
+        assert response.json()["detail"] == "Dataset file no longer matches the stored run labels"
+
+
+def test_missing_sidecar_is_not_found_before_streaming(client, upload, train):
+    dataset = upload(make_customers(200, seed=24), "gone_segments.csv")
+    run = train(dataset["id"], n_clusters=3)
+    Path(labels_path_for(dataset["file_path"], run["id"])).unlink()
+
+    response = client.get(
+        f"/api/v1/clustering/segments/{run['id']}", params={"format": "ndjson"}
+    )
+
+    assert response.status_code == 404
+    assert response.json()["detail"].startswith("Run results file not found")
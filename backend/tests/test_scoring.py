@@ -0,0 +1,120 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.services import jobs
+from app.services.artifacts import RunModel, load_model
+from app.services.scoring import (
+    DISTANCE_COLUMN,
+    LABEL_COLUMN,
+    merge_parts,
+    output_schema,
+    plan_partitions,
+    score_partition,
+)
+from benchmarks.datasets import make_customers
+
+
+@pytest.fixture(scope="module")
+def fitted(upload, train):
+    dataset = upload(make_customers(300, seed=81), "scoring-train.csv")
+    return train(dataset["id"], n_clusters=4)
+
+
+def _parquet(path, frame, row_group_size):
+    pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), path,
+                   row_group_size=row_group_size)
+    return str(path)
+
+
+def test_partitions_group_whole_row_groups(tmp_path):
+    path = _parquet(tmp_path / "rows.parquet", pd.DataFrame({"x": np.arange(100)}), 10)
+
+    assert plan_partitions(path, 25) == [(0, 3), (3, 6), (6, 9), (9, 10)]
+    assert plan_partitions(path, 1000) == [(0, 10)]
+
+
+def test_output_schema_replaces_existing_label_columns():
+    schema = output_schema(pa.schema([("age", pa.int64()), (LABEL_COLUMN, pa.string())]))
+
+    assert schema.names == ["age", LABEL_COLUMN, DISTANCE_COLUMN]
+    assert schema.field(LABEL_COLUMN).type == pa.int32()
+
+
+def test_partitions_score_like_the_model(tmp_path, fitted):
+    frame = make_customers(120, seed=82)
+    frame["age"] = frame["age"].astype(float)
+    frame.loc[5, "age"] = np.nan
+    path = _parquet(tmp_path / "new.parquet", frame, 30)
+    parts = [str(tmp_path / "part0.parquet"), str(tmp_path / "part1.parquet")]
+
+    first = score_partition(fitted["model_path"], path, (0, 2), parts[0], chunk_size=7)
+    second = score_partition(fitted["model_path"], path, (2, 4), parts[1], chunk_size=7)
+    merge_parts(parts, str(tmp_path / "scores.parquet"))
+
+    scores = pq.read_table(tmp_path / "scores.parquet").to_pandas()
+    assert first["n_rows"] + second["n_rows"] == len(scores) == 120
+    pd.testing.assert_frame_equal(scores[list(frame.columns)], frame)
+    assert scores.loc[5, LABEL_COLUMN] == -1
+    assert np.isnan(scores.loc[5, DISTANCE_COLUMN])
+
+    valid = frame.drop(index=5)
+    labels, distances = RunModel(load_model(fitted["model_path"])).predict(valid)
+    np.testing.assert_array_equal(scores[LABEL_COLUMN].drop(index=5), labels)
+    np.testing.assert_allclose(scores[DISTANCE_COLUMN].drop(index=5), distances)
+
+
+def test_partition_without_feature_columns_fails(tmp_path, fitted):
+    path = _parquet(tmp_path / "bad.parquet", pd.DataFrame({"x": [1.0, 2.0]}), 10)
+
+    with pytest.raises(ValueError, match="Missing feature columns"):
+        score_partition(fitted["model_path"], path, (0, 1), str(tmp_path / "part.parquet"), 10)
+
+
+def test_scoring_job_writes_a_labelled_parquet_file(client, upload, fitted, wait_for_job):
+    frame = make_customers(200, seed=83)
+    dataset = upload(frame, "scoring-input.csv")
+
+    response = client.post(
+        f"/api/v1/clustering/runs/{fitted['id']}/score", json={"dataset_id": dataset["id"]}
+    )
+    assert response.status_code == 202
+    job = wait_for_job(response.json()["job_id"])
+    assert job["status"] == "succeeded", job["error"]
+    assert job["result"]["n_rows"] == 200
+    assert sum(job["result"]["cluster_sizes"].values()) == 200
+
+    result = client.get(f"/api/v1/clustering/jobs/{job['job_id']}/result")
+
+    assert result.status_code == 200
+    assert result.headers["content-type"] == "application/vnd.apache.parquet"
+    scores = pq.read_table(io.BytesIO(result.content)).to_pandas()
+    labels, _ = RunModel(load_model(fitted["model_path"])).predict(frame)
+    np.testing.assert_array_equal(scores[LABEL_COLUMN], labels)
+    assert DISTANCE_COLUMN in scores
+
+
+def test_score_request_errors(client, upload, fitted):
+    dataset = upload(pd.DataFrame({"x": [1, 2, 3]}), "scoring-unrelated.csv")
+    url = f"/api/v1/clustering/runs/{fitted['id']}/score"
+
+    assert client.post(url, json={"dataset_id": 999999}).status_code == 404
+    assert client.post(
+        "/api/v1/clustering/runs/999999/score", json={"dataset_id": dataset["id"]}
+    ).status_code == 404
+    response = client.post(url, json={"dataset_id": dataset["id"]})
+    assert response.status_code == 400
+    assert "missing feature columns" in response.json()["detail"]
+
+
+def test_job_result_without_output_is_a_conflict(client):
+    job = jobs.create_job("scoring")
+
+    response = client.get(f"/api/v1/clustering/jobs/{job['job_id']}/result")
+
+    assert response.status_code == 409
+    assert client.get("/api/v1/clustering/jobs/unknown/result").status_code == 404
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event, exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.db import session
+from app.db.session import InstrumentedPool, _engine_options, pool_stats
+
+
+def test_file_databases_get_the_configured_pool(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 3)
+    monkeypatch.setattr(settings, "DB_POOL_TIMEOUT", 2.5)
+
+    options = _engine_options("sqlite+aiosqlite:///./segmentation.db")
+
+    assert options["poolclass"] is InstrumentedPool
+    assert options["pool_size"] == 3
+    assert options["pool_timeout"] == 2.5
+    assert "connect_args" not in options
+
+
+def test_in_memory_sqlite_keeps_the_default_pool():
+    options = _engine_options("sqlite+aiosqlite:///:memory:")
+
+    assert "poolclass" not in options
+    assert options["pool_pre_ping"] == settings.DB_POOL_PRE_PING
+
+
+def test_asyncpg_gets_a_statement_cache(monkeypatch):
+    monkeypatch.setattr(settings, "DB_STATEMENT_CACHE_SIZE", 50)
+
+    options = _engine_options("postgresql+asyncpg://user:secret@db/segments")
+
+    assert options["connect_args"] == {"prepared_statement_cache_size": 50}
+
+
+def _counters():
+    return dict(session._pool_counters)
+
+
+def test_pool_records_waits_and_timeouts(tmp_path):
+    async def _run():
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+            poolclass=InstrumentedPool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.2,
+        )
+        # Marks new connections, so opening one is not counted as waiting.
+        event.listen(engine.sync_engine, "connect", session._on_connect)
+        try:
+            # Open the pool's one connection so later checkouts reuse it.
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+            before = _counters()
+
+            async with engine.connect():
+                with pytest.raises(exc.TimeoutError):
+                    async with engine.connect():
+                        pass
+            timed_out = _counters()
+
+            holder = await engine.connect()
+
+            async def release():
+                await asyncio.sleep(0.05)
+                await holder.close()
+
+            releasing = asyncio.create_task(release())
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+            await releasing
+            return before, timed_out, _counters()
+        finally:
+            await engine.dispose()
+
+    before, timed_out, after = asyncio.run(_run())
+
+    assert timed_out["timeouts"] == before["timeouts"] + 1
+    assert timed_out["waited_checkouts"] == before["waited_checkouts"] + 1
+    assert after["waited_checkouts"] == timed_out["waited_checkouts"] + 1
+    assert after["max_wait_seconds"] >= 0.04
+
+
+def test_db_health_reports_latency_and_pool_counters(client):
+    before = pool_stats()
+
+    response = client.get("/api/v1/health/db")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ok"
+    assert body["latency_ms"] >= 0
+    assert body["dialect"] == "sqlite"
+    assert body["pool"] == "InstrumentedPool"
+    assert body["checkouts"] > before["checkouts"]
+    assert body["in_use"] + body["idle"] >= 1
+    assert body["size"] == settings.DB_POOL_SIZE
+
+
+def test_sqlite_connections_use_wal(client):
+    async def _journal_mode():
+        async with session.engine.connect() as connection:
+            return (await connection.execute(text("PRAGMA journal_mode"))).scalar()
+
+    assert client.portal.call(_journal_mode) == "wal"
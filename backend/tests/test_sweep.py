@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+from pydantic import ValidationError
+from scipy import sparse
+from sklearn import metrics as sk_metrics
+
+from app.schemas.clustering import ClusteringRequest, SweepRequest
+from app.services.clustering import get_flat_clusters
+from app.services.metrics import cluster_centroids, cluster_dispersion_scores
+from app.services.pipeline import load_or_fit_linkage, run_sweep
+from benchmarks.datasets import make_customers, write_customers_csv
+
+
+def _blobs(n_samples: int, n_features: int, n_clusters: int, seed: int):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(scale=5.0, size=(n_clusters, n_features))
+    labels = rng.integers(n_clusters, size=n_samples)
+    data = centers[labels] + rng.normal(size=(n_samples, n_features))
+    return data, labels
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_dispersion_scores_match_sklearn(seed):
+    data, labels = _blobs(500, 6, 5, seed)
+
+    scores = cluster_dispersion_scores(data, labels)
+
+    assert scores["calinski_harabasz"] == pytest.approx(
+        sk_metrics.calinski_harabasz_score(data, labels), rel=1e-9
+    )
+    assert scores["davies_bouldin"] == pytest.approx(
+        sk_metrics.davies_bouldin_score(data, labels), rel=1e-9
+    )
+    _, centroids = cluster_centroids(data, labels)
+    expected_inertia = ((data - centroids[np.unique(labels, return_inverse=True)[1]]) ** 2).sum()
+    assert scores["inertia"] == pytest.approx(expected_inertia, rel=1e-9)
+
+
+def test_dispersion_scores_on_sparse_data():
+    data, labels = _blobs(300, 8, 3, 8)
+    data[np.abs(data) < 2.0] = 0.0
+
+    dense = cluster_dispersion_scores(data, labels)
+    sparse_scores = cluster_dispersion_scores(sparse.csr_matrix(data), labels)
+
+    for name in ("calinski_harabasz", "davies_bouldin", "inertia"):
+        assert sparse_scores[name] == pytest.approx(dense[name], rel=1e-9)
+    assert dense["calinski_harabasz"] == pytest.approx(
+        sk_metrics.calinski_harabasz_score(data, labels), rel=1e-9
+    )
+
+
+def test_dispersion_scores_undefined_for_one_cluster():
+    data, _ = _blobs(50, 3, 1, 9)
+
+    scores = cluster_dispersion_scores(data, np.zeros(len(data), dtype=int))
+
+    assert scores["calinski_harabasz"] is None
+    assert scores["davies_bouldin"] is None
+
+
+def test_sweep_request_shares_the_tree_parameters():
+    shared = {"dataset_id": 1, "linkage": "average", "use_pca": True, "pca_components": 3,
+              "mode": "scalable", "n_micro_clusters": 64, "max_categories": 5,
+              "min_category_frequency": 0.01, "out_of_core": True}
+
+    sweep = SweepRequest(**shared, k_min=3, k_max=6)
+
+    assert sweep.model_dump(exclude={"k_min", "k_max"}) == ClusteringRequest(
+        **shared
+    ).model_dump(exclude={"n_clusters"})
+    assert "n_clusters" not in SweepRequest.model_fields
+    with pytest.raises(ValidationError, match="k_min must be <= k_max"):
+        SweepRequest(dataset_id=1, k_min=5, k_max=4)
+
+
+def test_sweep_scores_every_cut_of_one_tree(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.core.config.settings.OUTPUT_DIR", str(tmp_path / "outputs"))
+    csv_path = str(write_customers_csv(tmp_path / "customers.csv", 500, seed=51))
+    request = SweepRequest(dataset_id=1, k_min=2, k_max=6)
+
+    result = run_sweep(csv_path, request)
+
+    fitted, hit = load_or_fit_linkage(csv_path, ClusteringRequest(dataset_id=1, n_clusters=4))
+    assert hit is True
+    assert result["linkage_cache_hit"] is False
+    assert [row["n_clusters"] for row in result["results"]] == [2, 3, 4, 5, 6]
+    for row in result["results"]:
+        labels = get_flat_clusters(np.array(fitted["linkage_matrix"]), row["n_clusters"])
+        assert row["cluster_sizes"] == {
+            int(label): int(count) for label, count in zip(*np.unique(labels, return_counts=True))
+        }
+        assert row["silhouette_score"] == pytest.approx(
+            sk_metrics.silhouette_score(fitted["data"], labels), abs=1e-6
+        )
+    best = max(result["results"], key=lambda row: row["silhouette_score"])
+    assert result["best_k"] == best["n_clusters"]
+
+
+def test_sweep_endpoint(client, upload):
+    dataset = upload(make_customers(300, seed=52), "sweep.csv")
+
+    response = client.post(
+        "/api/v1/clustering/sweep",
+        json={"dataset_id": dataset["id"], "k_min": 3, "k_max": 5, "linkage": "complete"},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["linkage"] == "complete"
+    assert body["n_samples"] == 300
+    assert [row["n_clusters"] for row in body["results"]] == [3, 4, 5]
+    merge_heights = [row["merge_height"] for row in body["results"]]
+    assert merge_heights == sorted(merge_heights, reverse=True)
+
+
+def test_sweep_rejects_an_inverted_range(client):
+    response = client.post(
+        "/api/v1/clustering/sweep", json={"dataset_id": 1, "k_min": 6, "k_max": 3}
+    )
+
+    assert response.status_code == 422
@@ -0,0 +1,107 @@
+import asyncio
+
+from app.core import telemetry
+from app.core.telemetry import (
+    Counter,
+    Histogram,
+    MetricsMiddleware,
+    collect_stages,
+    peak_rss_bytes,
+    stage,
+)
+from benchmarks.datasets import make_customers
+
+
+def test_counter_samples_escape_label_values():
+    counter = Counter("requests_total", "Requests.", ("route",))
+
+    counter.inc(route='/a"b')
+    counter.inc(2, route='/a"b')
+    counter.inc(route="/c\n")
+
+    assert counter.header() == ["# HELP requests_total Requests.", "# TYPE requests_total counter"]
+    assert counter.samples() == [
+        'requests_total{route="/a\\"b"} 3.0',
+        'requests_total{route="/c\\n"} 1.0',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value)
+
+    assert histogram.samples() == [
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 4.25",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_stages_add_up_inside_a_collection_only():
+    with stage("ignored"):
+        pass
+
+    with collect_stages() as timings:
+        with stage("load"):
+            pass
+        for _ in range(3):
+            with stage("encode"):
+                pass
+
+    assert set(timings) == {"load", "encode"}
+    assert all(seconds >= 0 for seconds in timings.values())
+    assert peak_rss_bytes() > 0
+
+
+def test_middleware_labels_requests_by_route_template():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 418, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    class Route:
+        path = "/teapots/{teapot_id}"
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "route": Route()}
+    before = telemetry.HTTP_REQUESTS._values.get(("GET", "/teapots/{teapot_id}", "418"), 0)
+
+    asyncio.run(MetricsMiddleware(app)(scope, None, send))
+
+    after = telemetry.HTTP_REQUESTS._values[("GET", "/teapots/{teapot_id}", "418")]
+    assert after == before + 1
+
+
+def test_metrics_endpoint_exposes_requests_and_pools(client):
+    assert client.get("/api/v1/clustering/jobs/unknown").status_code == 404
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert "# TYPE http_requests_total counter" in text
+    assert (
+        'http_requests_total{method="GET",route="/api/v1/clustering/jobs/{job_id}",'
+        'status="404"}'
+    ) in text
+    assert 'segmentation_pool_state{pool="db",field="checkouts"}' in text
+    assert 'segmentation_jobs{status="running"}' in text
+
+
+def test_runs_report_stage_timings(client, upload, train):
+    dataset = upload(make_customers(200, seed=111), "telemetry.csv")
+
+    run = train(dataset["id"], n_clusters=3)
+
+    metrics = run["metrics"]
+    assert {"load", "preprocess", "linkage"} <= set(metrics["stage_seconds"])
+    assert metrics["peak_rss_bytes"] > 0
+    text = client.get("/metrics").text
+    assert 'train_stage_duration_seconds_count{stage="linkage"}' in text
+    assert "train_runs_total{" in text
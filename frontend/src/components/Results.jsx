@@ -2,7 +2,7 @@ import { useState, useEffect } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { BarChart3, Target, Layers, TrendingUp, Image, Users, Table, Download, Sparkles, ScatterChart as ScatterIcon } from 'lucide-react';
 import { PieChart, Pie, Cell, ResponsiveContainer, Tooltip, BarChart, Bar, XAxis, YAxis, CartesianGrid, ScatterChart, Scatter, ZAxis, Legend } from 'recharts';
-import { getDendrogramUrl, getSegments } from '../services/api';
+import { getDendrogramUrl, getScatterData } from '../services/api';
 import styles from './Results.module.css';
 
 const CLUSTER_COLORS = [
@@ -10,6 +10,8 @@ const CLUSTER_COLORS = [
   '#c4a052', '#22d3d8', '#f472b6', '#84cc16', '#e879f9',
 ];
 
+const SCATTER_POINT_LIMIT = 5000;
+
 const TABS = [
   { id: 'overview', label: 'Overview', icon: BarChart3 },
   { id: 'scatter', label: 'Scatter Plot', icon: ScatterIcon },
@@ -23,38 +25,47 @@ export default function Results({ run }) {
   const [loading, setLoading] = useState(false);
   const [axisFeatures, setAxisFeatures] = useState({ x: null, y: null });
 
-  // Fetch segment data for scatter plot
+  // Default the axes to the first two numeric features of the run
+  useEffect(() => {
+    const numericFeatures = run?.feature_config?.numeric_features || [];
+    setAxisFeatures({
+      x: numericFeatures[0] || null,
+      y: numericFeatures[1] || numericFeatures[0] || null,
+    });
+  }, [run?.id, run?.feature_config?.numeric_features]);
+
+  // Fetch per-cluster sampled points for the selected axes
   useEffect(() => {
-    if (!run?.id) return;
-    
-    const fetchSegments = async () => {
+    if (!run?.id || !axisFeatures.x || !axisFeatures.y) return;
+
+    const fetchScatterData = async () => {
       setLoading(true);
       try {
-        const data = await getSegments(run.id);
-        if (data?.assignments) {
-          // Get numeric features for axis selection
-          const numericFeatures = run.feature_config?.numeric_features || [];
-          const xFeature = numericFeatures[0] || null;
-          const yFeature = numericFeatures[1] || numericFeatures[0] || null;
-          setAxisFeatures({ x: xFeature, y: yFeature });
-          
-          // Transform assignments to scatter data
-          const transformed = data.assignments.map((a) => ({
-            ...a.payload,
-            cluster: a.cluster_label,
-            clusterName: `Cluster ${a.cluster_label + 1}`,
-          }));
-          setScatterData(transformed);
-        }
+        const data = await getScatterData(run.id, {
+          x_feature: axisFeatures.x,
+          y_feature: axisFeatures.y,
+          max_points: SCATTER_POINT_LIMIT,
+        });
+        // Round away quantization noise for the tooltip
+        const round = (v) => Number(v.toPrecision(6));
+        const transformed = data.clusters.flatMap((c) =>
+          c.x.map((x, i) => ({
+            [axisFeatures.x]: round(x),
+            [axisFeatures.y]: round(c.y[i]),
+            cluster: c.label,
+            clusterName: `Cluster ${c.label + 1}`,
+          }))
+        );
+        setScatterData(transformed);
       } catch (err) {
-        console.error('Failed to fetch segments:', err);
+        console.error('Failed to fetch scatter data:', err);
       } finally {
         setLoading(false);
       }
     };
-    
-    fetchSegments();
-  }, [run?.id, run?.feature_config?.numeric_features]);
+
+    fetchScatterData();
+  }, [run?.id, axisFeatures.x, axisFeatures.y]);
 
   if (!run) return null;
 
@@ -38,13 +38,68 @@ export const trainClustering = async (params) => {
   return response.data;
 };
 
+export const trainClusteringInBackground = async (params) => {
+  const response = await api.post('/clustering/train', params, {
+    params: { background: true },
+  });
+  return response.data;
+};
+
+export const sweepClustering = async (params) => {
+  const response = await api.post('/clustering/sweep', params);
+  return response.data;
+};
+
+export const getJob = async (jobId) => {
+  const response = await api.get(`/clustering/jobs/${jobId}`);
+  return response.data;
+};
+
 export const getClusteringRuns = async (datasetId) => {
   const response = await api.get(`/clustering/runs/${datasetId}`);
   return response.data;
 };
 
-export const getSegments = async (runId) => {
-  const response = await api.get(`/clustering/segments/${runId}`);
+export const getSegments = async (runId, params = {}) => {
+  const response = await api.get(`/clustering/segments/${runId}`, { params });
+  return response.data;
+};
+
+// Decode base64 little-endian uint16 steps back into values within [lo, hi].
+const decodeQuantized = (encoded, [lo, hi]) => {
+  const bytes = Uint8Array.from(atob(encoded), (c) => c.charCodeAt(0));
+  const view = new DataView(bytes.buffer);
+  const values = new Array(bytes.length / 2);
+  for (let i = 0; i < values.length; i += 1) {
+    values[i] = lo + (view.getUint16(i * 2, true) / 65535) * (hi - lo);
+  }
+  return values;
+};
+
+export const getScatterData = async (runId, params = {}) => {
+  const response = await api.get(`/clustering/scatter/${runId}/data`, {
+    params: { encoding: 'uint16', ...params },
+  });
+  const data = response.data;
+  if (data.encoding !== 'uint16') return data;
+
+  return {
+    ...data,
+    clusters: data.clusters.map((cluster) => ({
+      ...cluster,
+      x: decodeQuantized(cluster.x, data.x_range),
+      y: decodeQuantized(cluster.y, data.y_range),
+    })),
+  };
+};
+
+export const getDendrogramData = async (runId, params = {}) => {
+  const response = await api.get(`/clustering/dendrogram/${runId}/data`, { params });
+  return response.data;
+};
+
+export const getDistributionData = async (runId) => {
+  const response = await api.get(`/clustering/distribution/${runId}/data`);
   return response.data;
 };
 